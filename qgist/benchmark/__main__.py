@@ -0,0 +1,145 @@
+# -*- coding: utf-8 -*-
+
+"""
+
+QGIST PLUGIN MANAGER
+QGIS Plugin for Managing QGIS Plugins
+https://github.com/qgist/pluginmanager
+
+    qgist/benchmark/__main__.py: Command line interface
+
+    Copyright (C) 2017-2020 QGIST project <info@qgist.org>
+
+<LICENSE_BLOCK>
+The contents of this file are subject to the GNU General Public License
+Version 2 ("GPL" or "License"). You may not use this file except in
+compliance with the License. You may obtain a copy of the License at
+https://www.gnu.org/licenses/old-licenses/gpl-2.0.txt
+https://github.com/qgist/pluginmanager/blob/master/LICENSE
+
+Software distributed under the License is distributed on an "AS IS" basis,
+WITHOUT WARRANTY OF ANY KIND, either express or implied. See the License for the
+specific language governing rights and limitations under the License.
+</LICENSE_BLOCK>
+
+"""
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# IMPORT (Python Standard Library)
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+import argparse
+import json
+import sys
+import time
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# IMPORT (Internal)
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+from .const import (
+    BENCHMARK_REPEAT,
+    BENCHMARK_SIZES,
+    DATASET_PLUGINS,
+    DATASET_SEED,
+    DATASET_VERSIONS,
+    DATASET_ZIP_PADDING,
+    FIXTURE_HOST,
+    )
+from .dtype_dataset import dtype_dataset_class
+from .dtype_fixture import dtype_fixture_class
+from .dtype_recording import dtype_recording_class
+from .suite import (
+    BENCHMARKS,
+    run,
+    )
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# ROUTINES
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+def main(argv = None):
+    """
+    Entry point, run from the folder containing the plugin (as package `pluginmanager`):
+
+        python3 -m pluginmanager.qgist.benchmark run --sizes 1000 50000 --output baseline.json
+        python3 -m pluginmanager.qgist.benchmark fixture --plugins 10000 --latency 0.05 --error-rate 0.01
+        python3 -m pluginmanager.qgist.benchmark record https://plugins.qgis.org/plugins/plugins.xml recording/
+    """
+
+    parser = argparse.ArgumentParser(prog = 'pluginmanager.qgist.benchmark')
+    commands = parser.add_subparsers(dest = 'command')
+    commands.required = True
+
+    bench = commands.add_parser('run', help = 'run benchmarks, print or write JSON results')
+    bench.add_argument('--sizes', type = int, nargs = '+', default = list(BENCHMARK_SIZES), help = 'releases')
+    bench.add_argument('--benchmarks', type = str, nargs = '+', default = sorted(BENCHMARKS.keys()), choices = sorted(BENCHMARKS.keys()))
+    bench.add_argument('--repeat', type = int, default = BENCHMARK_REPEAT)
+    bench.add_argument('--seed', type = int, default = DATASET_SEED)
+    bench.add_argument('--output', type = str, default = None, help = 'JSON file, default: stdout')
+
+    fixture = commands.add_parser('fixture', help = 'serve a synthetic or recorded repository')
+    fixture.add_argument('--plugins', type = int, default = DATASET_PLUGINS)
+    fixture.add_argument('--versions', type = int, default = DATASET_VERSIONS)
+    fixture.add_argument('--seed', type = int, default = DATASET_SEED)
+    fixture.add_argument('--zip-padding', type = int, default = DATASET_ZIP_PADDING)
+    fixture.add_argument('--recording', type = str, default = None, help = 'folder of recorded repository')
+    fixture.add_argument('--host', type = str, default = FIXTURE_HOST)
+    fixture.add_argument('--port', type = int, default = 8765)
+    fixture.add_argument('--latency', type = float, nargs = '+', default = [0.0], help = 'seconds, or min and max')
+    fixture.add_argument('--error-rate', type = float, default = 0.0)
+
+    record = commands.add_parser('record', help = 'record a real repository into a folder')
+    record.add_argument('url', type = str)
+    record.add_argument('path', type = str)
+    record.add_argument('--qgis', type = str, default = '3.16')
+    record.add_argument('--packages', type = str, nargs = '*', default = [])
+    record.add_argument('--downloads', action = 'store_true')
+
+    args = parser.parse_args(argv)
+
+    if args.command == 'run':
+        results = run(sizes = args.sizes, names = args.benchmarks, repeat = args.repeat, seed = args.seed)
+        if args.output is None:
+            json.dump(results, sys.stdout, indent = 2)
+            return
+        with open(args.output, 'w', encoding = 'utf-8') as f:
+            json.dump(results, f, indent = 2)
+        return
+
+    if args.command == 'record':
+        recording = dtype_recording_class.record(
+            args.url, args.path, args.qgis, packages = args.packages, downloads = args.downloads,
+            )
+        print(recording)
+        return
+
+    if args.recording is not None:
+        dataset = dtype_recording_class(args.recording, zip_padding = args.zip_padding)
+    else:
+        dataset = dtype_dataset_class(
+            plugins = args.plugins, versions = args.versions, seed = args.seed, zip_padding = args.zip_padding,
+            )
+
+    with dtype_fixture_class(
+        dataset,
+        host = args.host,
+        port = args.port,
+        latency = args.latency[0] if len(args.latency) == 1 else tuple(args.latency[:2]),
+        error_rate = args.error_rate,
+        seed = args.seed,
+        ) as server:
+        print(dataset)
+        print(server.url)
+        try:
+            while True:
+                time.sleep(1.0)
+        except KeyboardInterrupt:
+            pass
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# ENTRY POINT
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,61 @@
+# -*- coding: utf-8 -*-
+
+"""
+
+QGIST PLUGIN MANAGER
+QGIS Plugin for Managing QGIS Plugins
+https://github.com/qgist/pluginmanager
+
+    qgist/benchmark/const.py: Benchmark constants
+
+    Copyright (C) 2017-2020 QGIST project <info@qgist.org>
+
+<LICENSE_BLOCK>
+The contents of this file are subject to the GNU General Public License
+Version 2 ("GPL" or "License"). You may not use this file except in
+compliance with the License. You may obtain a copy of the License at
+https://www.gnu.org/licenses/old-licenses/gpl-2.0.txt
+https://github.com/qgist/pluginmanager/blob/master/LICENSE
+
+Software distributed under the License is distributed on an "AS IS" basis,
+WITHOUT WARRANTY OF ANY KIND, either express or implied. See the License for the
+specific language governing rights and limitations under the License.
+</LICENSE_BLOCK>
+
+"""
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# BENCHMARK
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+BENCHMARK_CACHE_RATIO = 100 # releases per ZIP-file in cache extraction benchmark
+BENCHMARK_REPEAT = 5
+BENCHMARK_REPO_ID = 'qgist-benchmark'
+BENCHMARK_SIZES = (1000, 5000, 10000, 50000) # releases
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# DATASET
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+DATASET_PLUGINS = 1000
+DATASET_SEED = 0
+DATASET_VERSIONS = 3 # releases per plugin
+DATASET_ZIP_PADDING = 64 * 1024 # bytes of incompressible payload per plugin ZIP-file
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# FIXTURE
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+FIXTURE_ERROR_STATUS = 503
+FIXTURE_HOST = '127.0.0.1'
+FIXTURE_INDEX_PATH = '/plugins/plugins.xml' # mirrors layout of plugins.qgis.org
+FIXTURE_DOWNLOAD_PATH = '/plugins/download/'
+FIXTURE_PORT = 0 # pick a free port
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# RECORDING
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+RECORDING_DOWNLOADS_FLD = 'downloads'
+RECORDING_INDEX_FN = 'plugins.xml'
+RECORDING_PACKAGES_FLD = 'packages'
@@ -0,0 +1,321 @@
+# -*- coding: utf-8 -*-
+
+"""
+
+QGIST PLUGIN MANAGER
+QGIS Plugin for Managing QGIS Plugins
+https://github.com/qgist/pluginmanager
+
+    qgist/benchmark/dtype_dataset.py: Synthetic plugin repository
+
+    Copyright (C) 2017-2020 QGIST project <info@qgist.org>
+
+<LICENSE_BLOCK>
+The contents of this file are subject to the GNU General Public License
+Version 2 ("GPL" or "License"). You may not use this file except in
+compliance with the License. You may obtain a copy of the License at
+https://www.gnu.org/licenses/old-licenses/gpl-2.0.txt
+https://github.com/qgist/pluginmanager/blob/master/LICENSE
+
+Software distributed under the License is distributed on an "AS IS" basis,
+WITHOUT WARRANTY OF ANY KIND, either express or implied. See the License for the
+specific language governing rights and limitations under the License.
+</LICENSE_BLOCK>
+
+"""
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# IMPORT (Python Standard Library)
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+import io
+import random
+import threading
+from xml.sax.saxutils import escape, quoteattr
+import zipfile
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# IMPORT (Internal)
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+from .abc import dataset_abc
+from .const import (
+    DATASET_PLUGINS,
+    DATASET_SEED,
+    DATASET_VERSIONS,
+    DATASET_ZIP_PADDING,
+    )
+
+from ..error import (
+    QgistTypeError,
+    QgistValueError,
+    )
+from ..util import tr
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# CLASS
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+class dtype_dataset_class(dataset_abc):
+    """
+    Synthetic plugin repository: plugins, their releases, `plugins.xml` documents and plugin ZIP-files
+
+    Everything is derived from a seed, i.e. identical parameters produce identical documents
+    and ZIP-files. Version strings, flags and compatibility ranges vary like on plugins.qgis.org.
+
+    Mutable.
+    """
+
+    def __init__(self,
+        plugins = DATASET_PLUGINS, versions = DATASET_VERSIONS, seed = DATASET_SEED,
+        zip_padding = DATASET_ZIP_PADDING, zip_modules = 8,
+        ):
+
+        for name, value, minimum in (
+            ('plugins', plugins, 1),
+            ('versions', versions, 1),
+            ('zip_padding', zip_padding, 0),
+            ('zip_modules', zip_modules, 0),
+            ):
+            if not isinstance(value, int):
+                raise QgistTypeError(tr('"{NAME:s}" must be an int').format(NAME = name))
+            if value < minimum:
+                raise QgistValueError(tr('"{NAME:s}" must not be smaller than {MINIMUM:d}').format(NAME = name, MINIMUM = minimum))
+        if not isinstance(seed, int):
+            raise QgistTypeError(tr('"seed" must be an int'))
+
+        self._seed = seed
+        self._zip_padding = zip_padding
+        self._zip_modules = zip_modules
+
+        self._lock = threading.Lock() # documents are served from fixture threads
+        self._rng = random.Random(seed)
+        self._releases = { # by plugin id: list of releases, oldest first
+            self._get_plugin_id(index): [self._new_release(index, number) for number in range(versions)]
+            for index in range(plugins)
+            }
+
+    def __repr__(self):
+
+        return f'<dataset plugins={len(self._releases):d} releases={len(self):d} seed={self._seed:d}>'
+
+    def __len__(self):
+
+        return sum((len(releases) for releases in self._releases.values()))
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# PROPERTIES
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+    @property
+    def plugin_ids(self):
+        return tuple(self._releases.keys())
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# API
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+    def get_index(self, base_url, qgis_version):
+        "`plugins.xml` with latest compatible release per plugin (`?qgis=`) - download URLs start with `base_url`"
+
+        with self._lock:
+            return self._get_document(base_url, (
+                self._get_latest(releases, qgis_version)
+                for releases in self._releases.values()
+                ))
+
+    def get_package(self, base_url, plugin_id, qgis_version):
+        "`plugins.xml` with all compatible releases of one plugin (`?package_name=`) - None if unknown"
+
+        with self._lock:
+            if plugin_id not in self._releases.keys():
+                return None
+            return self._get_document(base_url, (
+                release for release in self._releases[plugin_id]
+                if _is_compatible(release, qgis_version)
+                ))
+
+    def get_metadatatxt(self, file_name):
+        "Content of `metadata.txt` in plugin ZIP-file - None if unknown"
+
+        with self._lock:
+            release = self._get_release_by_file_name(file_name)
+        if release is None:
+            return None
+
+        return self._get_metadatatxt(release)
+
+    def get_download(self, file_name):
+        "Plugin ZIP-file as bytes - None if unknown"
+
+        with self._lock:
+            release = self._get_release_by_file_name(file_name)
+        if release is None:
+            return None
+
+        return make_zipfile(
+            plugin_id = release['id'],
+            metadatatxt = self._get_metadatatxt(release),
+            server = release['server'],
+            padding = self._zip_padding,
+            modules = self._zip_modules,
+            seed = f'{self._seed:d}:{file_name:s}',
+            )
+
+    def publish(self, fraction = 0.1):
+        "Publish one new release for a random fraction of plugins (upstream changes) - returns their ids"
+
+        if not isinstance(fraction, float):
+            raise QgistTypeError(tr('"fraction" must be a float'))
+        if not 0.0 <= fraction <= 1.0:
+            raise QgistValueError(tr('"fraction" must be within [0.0, 1.0]'))
+
+        with self._lock:
+            plugin_ids = self._rng.sample(list(self._releases.keys()), round(fraction * len(self._releases)))
+            for plugin_id in plugin_ids:
+                releases = self._releases[plugin_id]
+                releases.append(self._new_release(releases[0]['index'], len(releases)))
+
+        return plugin_ids
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# HELPER
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+    def _get_document(self, base_url, releases):
+
+        return (
+            '<?xml version="1.0" encoding="UTF-8"?>\n<plugins>\n'
+            + ''.join((self._get_element(base_url, release) for release in releases if release is not None))
+            + '</plugins>\n'
+            ).encode('utf-8')
+
+    def _get_element(self, base_url, release):
+
+        return (
+            f'<pyqgis_plugin name={quoteattr(release["name"]):s} version="{release["version"]:s}" plugin_id="{release["index"]:d}">\n'
+            f'  <description><![CDATA[{release["description"]:s}]]></description>\n'
+            f'  <about><![CDATA[{release["about"]:s}]]></about>\n'
+            f'  <version>{release["version"]:s}</version>\n'
+            '  <trusted>False</trusted>\n'
+            f'  <qgis_minimum_version>{release["qgis_minimum_version"]:s}</qgis_minimum_version>\n'
+            f'  <qgis_maximum_version>{release["qgis_maximum_version"]:s}</qgis_maximum_version>\n'
+            f'  <homepage>https://example.com/{release["id"]:s}</homepage>\n'
+            f'  <file_name>{release["file_name"]:s}</file_name>\n'
+            '  <icon></icon>\n'
+            f'  <author_name>{escape(release["author"]):s}</author_name>\n'
+            f'  <download_url>{base_url:s}{release["file_name"]:s}</download_url>\n'
+            f'  <uploaded_by>{escape(release["author"]):s}</uploaded_by>\n'
+            f'  <experimental>{release["experimental"]!s}</experimental>\n'
+            f'  <deprecated>{release["deprecated"]!s}</deprecated>\n'
+            f'  <tags>{escape(release["tags"]):s}</tags>\n'
+            f'  <server>{release["server"]!s}</server>\n'
+            '</pyqgis_plugin>\n'
+            )
+
+    def _get_latest(self, releases, qgis_version):
+
+        for release in reversed(releases):
+            if _is_compatible(release, qgis_version):
+                return release
+        return None
+
+    def _get_metadatatxt(self, release):
+
+        return (
+            '[general]\n'
+            f'name={release["name"]:s}\n'
+            f'description={release["description"]:s}\n'
+            f'about={release["about"]:s}\n'
+            f'version={release["version"]:s}\n'
+            f'qgisMinimumVersion={release["qgis_minimum_version"]:s}\n'
+            f'qgisMaximumVersion={release["qgis_maximum_version"]:s}\n'
+            f'author={release["author"]:s}\n'
+            f'email={release["id"]:s}@example.com\n'
+            f'tags={release["tags"]:s}\n'
+            f'experimental={release["experimental"]!s}\n'
+            f'deprecated={release["deprecated"]!s}\n'
+            f'server={release["server"]!s}\n'
+            f'plugin_dependencies={release["plugin_dependencies"]:s}\n'
+            )
+
+    def _get_release_by_file_name(self, file_name):
+
+        plugin_id = file_name.split('.', 1)[0]
+        for release in self._releases.get(plugin_id, tuple()):
+            if release['file_name'] == file_name:
+                return release
+        return None
+
+    @staticmethod
+    def _get_plugin_id(index):
+
+        return f'plugin{index:05d}'
+
+    def _new_release(self, index, number):
+
+        rng = self._rng
+        plugin_id = self._get_plugin_id(index)
+
+        version = f'{number // 4 + 1:d}.{number % 4:d}.{rng.randrange(10):d}'
+        experimental = rng.random() < 0.1
+        if experimental:
+            version += rng.choice(('-beta', 'rc1', '-alpha2', 'dev'))
+        if rng.random() < 0.05:
+            version = 'v' + version # prefixes are stripped by the version parser
+
+        return {
+            'index': index,
+            'id': plugin_id,
+            'name': f'Plugin {index:d} & Co',
+            'description': f'Synthetic plugin number {index:d}',
+            'about': f'Synthetic plugin number {index:d}, release number {number:d}',
+            'author': f'Author {index % 97:d} & Sons',
+            'tags': ','.join(rng.sample(('vector', 'raster', 'processing', 'web', 'database', 'analysis'), 2)),
+            'version': version,
+            'file_name': f'{plugin_id:s}.{version:s}.zip',
+            'qgis_minimum_version': rng.choice(('3.0', '3.0', '3.4', '3.10', '3.16')),
+            'qgis_maximum_version': '3.99',
+            'experimental': experimental,
+            'deprecated': rng.random() < 0.02,
+            'server': rng.random() < 0.05,
+            'plugin_dependencies': self._get_plugin_id(rng.randrange(index)) if index > 0 and rng.random() < 0.05 else '',
+            }
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# ROUTINES
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+def make_zipfile(plugin_id, metadatatxt, server = False, padding = DATASET_ZIP_PADDING, modules = 8, seed = None):
+    "Builds a plugin ZIP-file (bytes) - with `modules` Python modules and `padding` bytes of random payload"
+
+    rng = random.Random(seed)
+    buffer = io.BytesIO()
+
+    with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as f:
+        f.writestr(f'{plugin_id:s}/', b'')
+        f.writestr(f'{plugin_id:s}/metadata.txt', metadatatxt)
+        f.writestr(f'{plugin_id:s}/__init__.py', (
+            'def classFactory(iface):\n    from .plugin import plugin\n    return plugin(iface)\n'
+            + ('\ndef serverClassFactory(serverIface):\n    return None\n' if server else '')
+            ))
+        for number in range(modules):
+            f.writestr(f'{plugin_id:s}/module{number:03d}.py', f'VALUE = {rng.random()!r}\n' * 64)
+        if padding > 0:
+            f.writestr(f'{plugin_id:s}/data.bin', rng.getrandbits(8 * padding).to_bytes(padding, 'little'))
+
+    return buffer.getvalue()
+
+def _is_compatible(release, qgis_version):
+
+    if qgis_version is None:
+        return True
+    return (
+        _get_version_tuple(release['qgis_minimum_version'])
+        <= _get_version_tuple(qgis_version)
+        <= _get_version_tuple(release['qgis_maximum_version'])
+        )
+
+def _get_version_tuple(version):
+
+    return tuple((int(item) for item in version.split('.')[:2]))
@@ -0,0 +1,347 @@
+# -*- coding: utf-8 -*-
+
+"""
+
+QGIST PLUGIN MANAGER
+QGIS Plugin for Managing QGIS Plugins
+https://github.com/qgist/pluginmanager
+
+    qgist/benchmark/dtype_fixture.py: Local HTTP stand-in for a plugin repository
+
+    Copyright (C) 2017-2020 QGIST project <info@qgist.org>
+
+<LICENSE_BLOCK>
+The contents of this file are subject to the GNU General Public License
+Version 2 ("GPL" or "License"). You may not use this file except in
+compliance with the License. You may obtain a copy of the License at
+https://www.gnu.org/licenses/old-licenses/gpl-2.0.txt
+https://github.com/qgist/pluginmanager/blob/master/LICENSE
+
+Software distributed under the License is distributed on an "AS IS" basis,
+WITHOUT WARRANTY OF ANY KIND, either express or implied. See the License for the
+specific language governing rights and limitations under the License.
+</LICENSE_BLOCK>
+
+"""
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# IMPORT (Python Standard Library)
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+import gzip
+import hashlib
+import http.server
+import random
+import socketserver
+import threading
+import time
+import urllib.parse
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# IMPORT (Internal)
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+from .abc import (
+    dataset_abc,
+    fixture_abc,
+    )
+from .const import (
+    FIXTURE_DOWNLOAD_PATH,
+    FIXTURE_ERROR_STATUS,
+    FIXTURE_HOST,
+    FIXTURE_INDEX_PATH,
+    FIXTURE_PORT,
+    )
+
+from ..error import (
+    QgistTypeError,
+    QgistValueError,
+    )
+from ..util import tr
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# CLASS
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+class dtype_fixture_class(fixture_abc):
+    """
+    Serves a dataset (synthetic or recorded) like plugins.qgis.org does, on a local port
+
+    `url` can be used as repository URL. Supports keep-alive, ETag / If-None-Match,
+    Range / If-Range requests and gzip, i.e. everything the plugin manager's HTTP session relies on.
+    Latency (seconds, fixed or (min, max)) and error rate (fraction of failing requests)
+    can be changed while running. Runs in a daemon thread, use as context manager.
+
+    Mutable.
+    """
+
+    def __init__(self, dataset,
+        host = FIXTURE_HOST, port = FIXTURE_PORT, latency = 0.0, error_rate = 0.0, seed = None,
+        ):
+
+        if not isinstance(dataset, dataset_abc):
+            raise QgistTypeError(tr('"dataset" must be a dataset'))
+        if not isinstance(host, str):
+            raise QgistTypeError(tr('"host" must be a str'))
+        if not isinstance(port, int):
+            raise QgistTypeError(tr('"port" must be an int'))
+        self._check_latency(latency)
+        self._check_error_rate(error_rate)
+
+        self._dataset = dataset
+        self._host = host
+        self._port = port
+        self._latency = latency
+        self._error_rate = error_rate
+
+        self._lock = threading.Lock()
+        self._rng = random.Random(seed)
+        self._server = None
+        self._thread = None
+        self._stats = {}
+        self.reset_stats()
+
+    def __repr__(self):
+
+        return f'<fixture url="{self.url:s}" running={"yes" if self.running else "no":s}>'
+
+    def __enter__(self):
+
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+
+        self.stop()
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# PROPERTIES
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+    @property
+    def dataset(self):
+        return self._dataset
+
+    @property
+    def error_rate(self):
+        return self._error_rate
+    @error_rate.setter
+    def error_rate(self, value):
+        self._check_error_rate(value)
+        self._error_rate = value
+
+    @property
+    def latency(self):
+        return self._latency
+    @latency.setter
+    def latency(self, value):
+        self._check_latency(value)
+        self._latency = value
+
+    @property
+    def origin(self):
+        "Scheme, host and (actual) port"
+        port = self._server.server_address[1] if self._server is not None else self._port
+        return f'http://{self._host:s}:{port:d}'
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    @property
+    def stats(self):
+        "Counters since start or last reset: requests, errors (injected), not_modified, partial, bytes"
+        with self._lock:
+            return self._stats.copy()
+
+    @property
+    def url(self):
+        "Repository URL, i.e. URL of `plugins.xml`"
+        return self.origin + FIXTURE_INDEX_PATH
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# API
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+    def reset_stats(self):
+
+        with self._lock:
+            self._stats.update({key: 0 for key in ('requests', 'errors', 'not_modified', 'partial', 'bytes')})
+
+    def start(self):
+        "Start serving - returns once the port is bound"
+
+        if self.running:
+            return
+
+        self._server = _server_class((self._host, self._port), self._get_handler_class())
+        self._thread = threading.Thread(
+            target = self._server.serve_forever,
+            name = 'qgist-benchmark-fixture',
+            daemon = True,
+            )
+        self._thread.start()
+
+    def stop(self):
+
+        if not self.running:
+            return
+
+        self._server.shutdown()
+        self._server.server_close()
+        self._thread.join()
+        self._thread = None
+        self._server = None
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# HELPER
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+    def _count(self, key, value = 1):
+
+        with self._lock:
+            self._stats[key] += value
+
+    def _get_body(self, path, query):
+        "Routes a request to the dataset - returns body (bytes) or None (not found)"
+
+        qgis_version = query.get('qgis', [None])[0]
+
+        if path == FIXTURE_INDEX_PATH and 'package_name' in query.keys():
+            return self._dataset.get_package(self.origin + FIXTURE_DOWNLOAD_PATH, query['package_name'][0], qgis_version)
+        if path == FIXTURE_INDEX_PATH:
+            return self._dataset.get_index(self.origin + FIXTURE_DOWNLOAD_PATH, qgis_version)
+        if path.startswith(FIXTURE_DOWNLOAD_PATH):
+            return self._dataset.get_download(path[len(FIXTURE_DOWNLOAD_PATH):])
+
+        return None
+
+    def _get_delay(self):
+
+        if isinstance(self._latency, tuple):
+            with self._lock:
+                return self._rng.uniform(*self._latency)
+        return self._latency
+
+    def _get_handler_class(self):
+
+        fixture = self
+
+        class handler_class(http.server.BaseHTTPRequestHandler):
+
+            protocol_version = 'HTTP/1.1' # keep-alive
+
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                fixture._handle(self)
+
+        return handler_class
+
+    def _handle(self, handler):
+
+        self._count('requests')
+
+        delay = self._get_delay()
+        if delay > 0.0:
+            time.sleep(delay)
+
+        if self._error_rate > 0.0 and self._is_error():
+            self._count('errors')
+            self._send(handler, FIXTURE_ERROR_STATUS, b'')
+            return
+
+        url = urllib.parse.urlsplit(handler.path)
+        body = self._get_body(url.path, urllib.parse.parse_qs(url.query))
+        if body is None:
+            self._send(handler, 404, b'')
+            return
+
+        etag = f'"{hashlib.sha1(body).hexdigest():s}"'
+        if handler.headers.get('If-None-Match', None) == etag:
+            self._count('not_modified')
+            self._send(handler, 304, b'', {'ETag': etag})
+            return
+
+        byte_range = self._get_range(handler.headers.get('Range', None), len(body))
+        if byte_range is not None and handler.headers.get('If-Range', etag) == etag: # else changed, send entire body
+            start, end = byte_range
+            if start > end:
+                self._send(handler, 416, b'', {'Content-Range': f'bytes */{len(body):d}'})
+                return
+            self._count('partial')
+            self._send(handler, 206, body[start:end + 1], {
+                'Accept-Ranges': 'bytes',
+                'Content-Range': f'bytes {start:d}-{end:d}/{len(body):d}',
+                'ETag': etag,
+                })
+            return
+
+        headers = {'Accept-Ranges': 'bytes', 'ETag': etag}
+        if url.path == FIXTURE_INDEX_PATH and 'gzip' in handler.headers.get('Accept-Encoding', ''):
+            body = gzip.compress(body, compresslevel = 6)
+            headers['Content-Encoding'] = 'gzip'
+        self._send(handler, 200, body, headers)
+
+    def _is_error(self):
+
+        with self._lock:
+            return self._rng.random() < self._error_rate
+
+    def _send(self, handler, status, body, headers = None):
+
+        handler.send_response(status)
+        for key, value in (headers if headers is not None else {}).items():
+            handler.send_header(key, value)
+        handler.send_header('Content-Length', str(len(body)))
+        handler.end_headers()
+        handler.wfile.write(body)
+
+        self._count('bytes', len(body))
+
+    @staticmethod
+    def _get_range(header, length):
+        "Parses single-range `Range` header - returns (start, end) inclusive or None"
+
+        if header is None or not header.startswith('bytes=') or ',' in header:
+            return None
+
+        start, _, end = header[len('bytes='):].strip().partition('-')
+        try:
+            if start == '': # suffix: last n bytes
+                return max(0, length - int(end)), length - 1
+            return int(start), min(int(end), length - 1) if end != '' else length - 1
+        except ValueError:
+            return None
+
+    @staticmethod
+    def _check_error_rate(error_rate):
+
+        if not isinstance(error_rate, float):
+            raise QgistTypeError(tr('"error_rate" must be a float'))
+        if not 0.0 <= error_rate <= 1.0:
+            raise QgistValueError(tr('"error_rate" must be within [0.0, 1.0]'))
+
+    @staticmethod
+    def _check_latency(latency):
+
+        if isinstance(latency, tuple):
+            if len(latency) != 2 or not all((isinstance(item, (int, float)) for item in latency)):
+                raise QgistTypeError(tr('"latency" tuple must contain two numbers (min, max)'))
+            if not 0.0 <= latency[0] <= latency[1]:
+                raise QgistValueError(tr('"latency" tuple must satisfy 0 <= min <= max'))
+            return
+        if not isinstance(latency, (int, float)):
+            raise QgistTypeError(tr('"latency" must be a number or a tuple of two numbers'))
+        if latency < 0.0:
+            raise QgistValueError(tr('"latency" must not be negative'))
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# SERVER
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+class _server_class(socketserver.ThreadingMixIn, http.server.HTTPServer):
+    "One thread per connection (`http.server.ThreadingHTTPServer` requires Python 3.7)"
+
+    daemon_threads = True
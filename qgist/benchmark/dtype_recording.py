@@ -0,0 +1,227 @@
+# -*- coding: utf-8 -*-
+
+"""
+
+QGIST PLUGIN MANAGER
+QGIS Plugin for Managing QGIS Plugins
+https://github.com/qgist/pluginmanager
+
+    qgist/benchmark/dtype_recording.py: Recorded plugin repository
+
+    Copyright (C) 2017-2020 QGIST project <info@qgist.org>
+
+<LICENSE_BLOCK>
+The contents of this file are subject to the GNU General Public License
+Version 2 ("GPL" or "License"). You may not use this file except in
+compliance with the License. You may obtain a copy of the License at
+https://www.gnu.org/licenses/old-licenses/gpl-2.0.txt
+https://github.com/qgist/pluginmanager/blob/master/LICENSE
+
+Software distributed under the License is distributed on an "AS IS" basis,
+WITHOUT WARRANTY OF ANY KIND, either express or implied. See the License for the
+specific language governing rights and limitations under the License.
+</LICENSE_BLOCK>
+
+"""
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# IMPORT (Python Standard Library)
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+import os
+import re
+import urllib.parse
+import urllib.request
+import xml.etree.ElementTree as ElementTree
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# IMPORT (Internal)
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+from .abc import dataset_abc
+from .const import (
+    DATASET_ZIP_PADDING,
+    RECORDING_DOWNLOADS_FLD,
+    RECORDING_INDEX_FN,
+    RECORDING_PACKAGES_FLD,
+    )
+from .dtype_dataset import make_zipfile
+
+from ..error import (
+    QgistTypeError,
+    QgistValueError,
+    )
+from ..util import tr
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# CONST
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+_DOWNLOAD_URL = re.compile(r'<download_url>[^<]*?([^/<]+)</download_url>')
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# CLASS
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+class dtype_recording_class(dataset_abc):
+    """
+    Plugin repository recorded from a real server into a folder
+
+    Layout: `plugins.xml`, `packages/<plugin_id>.xml` (optional) and `downloads/<file_name>` (optional).
+    Download URLs are rewritten to point to the fixture. ZIP-files which were not recorded
+    are synthesized from the recorded meta data.
+
+    Immutable.
+    """
+
+    def __init__(self, path, zip_padding = DATASET_ZIP_PADDING):
+
+        if not isinstance(path, str):
+            raise QgistTypeError(tr('"path" must be a str'))
+        if not os.path.isfile(os.path.join(path, RECORDING_INDEX_FN)):
+            raise QgistValueError(tr('"path" does not contain a recorded repository'))
+        if not isinstance(zip_padding, int):
+            raise QgistTypeError(tr('"zip_padding" must be an int'))
+
+        self._path = os.path.abspath(path)
+        self._zip_padding = zip_padding
+
+        with open(os.path.join(self._path, RECORDING_INDEX_FN), 'rb') as f:
+            self._index = f.read()
+        self._releases = { # by file name
+            element.findtext('file_name'): element
+            for element in ElementTree.fromstring(self._index).iter('pyqgis_plugin')
+            }
+
+    def __repr__(self):
+
+        return f'<recording path="{self._path:s}" releases={len(self):d}>'
+
+    def __len__(self):
+
+        return len(self._releases)
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# PROPERTIES
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+    @property
+    def path(self):
+        return self._path
+
+    @property
+    def plugin_ids(self):
+        return tuple(sorted({_get_plugin_id(file_name) for file_name in self._releases.keys()}))
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# API
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+    def get_index(self, base_url, qgis_version):
+        "Recorded `plugins.xml` - `qgis_version` is ignored, download URLs start with `base_url`"
+
+        return self._rewrite(base_url, self._index)
+
+    def get_package(self, base_url, plugin_id, qgis_version):
+        "Recorded `plugins.xml` of one plugin - None if not recorded"
+
+        path = os.path.join(self._path, RECORDING_PACKAGES_FLD, f'{os.path.basename(plugin_id):s}.xml')
+        if not os.path.isfile(path):
+            return None
+
+        with open(path, 'rb') as f:
+            return self._rewrite(base_url, f.read())
+
+    def get_download(self, file_name):
+        "Recorded plugin ZIP-file or one synthesized from recorded meta data - None if unknown"
+
+        file_name = os.path.basename(file_name)
+
+        path = os.path.join(self._path, RECORDING_DOWNLOADS_FLD, file_name)
+        if os.path.isfile(path):
+            with open(path, 'rb') as f:
+                return f.read()
+
+        element = self._releases.get(file_name, None)
+        if element is None:
+            return None
+
+        return make_zipfile(
+            plugin_id = _get_plugin_id(file_name),
+            metadatatxt = ''.join((
+                '[general]\n',
+                f'name={element.get("name", ""):s}\n',
+                f'version={element.findtext("version", ""):s}\n',
+                f'qgisMinimumVersion={element.findtext("qgis_minimum_version", ""):s}\n',
+                f'description={" ".join(element.findtext("description", "").split()):s}\n',
+                f'author={element.findtext("author_name", ""):s}\n',
+                )),
+            server = element.findtext('server', 'False') == 'True',
+            padding = self._zip_padding,
+            seed = file_name,
+            )
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# HELPER
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+    @staticmethod
+    def _rewrite(base_url, document):
+
+        return _DOWNLOAD_URL.sub(
+            lambda match: f'<download_url>{base_url:s}{match.group(1):s}</download_url>',
+            document.decode('utf-8'),
+            ).encode('utf-8')
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# PRE-CONSTRUCTOR
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+    @classmethod
+    def record(cls, url, path, qgis_version, packages = tuple(), downloads = False):
+        """
+        Record a repository from a real server into a folder (requires network, not QGIS)
+
+        `packages` is an iterable of plugin ids whose full release histories are recorded.
+        If `downloads` is True, the ZIP-files of the latest releases are recorded as well.
+        """
+
+        if not isinstance(url, str):
+            raise QgistTypeError(tr('"url" must be a str'))
+        if not isinstance(path, str):
+            raise QgistTypeError(tr('"path" must be a str'))
+        if not isinstance(qgis_version, str):
+            raise QgistTypeError(tr('"qgis_version" must be a str'))
+        if not isinstance(downloads, bool):
+            raise QgistTypeError(tr('"downloads" must be a bool'))
+
+        for fld in (RECORDING_PACKAGES_FLD, RECORDING_DOWNLOADS_FLD):
+            os.makedirs(os.path.join(path, fld), exist_ok = True)
+
+        index = _request(f'{url:s}?{urllib.parse.urlencode({"qgis": qgis_version}):s}')
+        with open(os.path.join(path, RECORDING_INDEX_FN), 'wb') as f:
+            f.write(index)
+
+        for plugin_id in packages:
+            with open(os.path.join(path, RECORDING_PACKAGES_FLD, f'{os.path.basename(plugin_id):s}.xml'), 'wb') as f:
+                f.write(_request(f'{url:s}?{urllib.parse.urlencode({"package_name": plugin_id, "qgis": qgis_version}):s}'))
+
+        if downloads:
+            for element in ElementTree.fromstring(index).iter('pyqgis_plugin'):
+                with open(os.path.join(path, RECORDING_DOWNLOADS_FLD, os.path.basename(element.findtext('file_name'))), 'wb') as f:
+                    f.write(_request(element.findtext('download_url')))
+
+        return cls(path)
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# ROUTINES
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+def _get_plugin_id(file_name):
+
+    return file_name.split('.', 1)[0]
+
+def _request(url):
+
+    with urllib.request.urlopen(url, timeout = 60) as f:
+        return f.read()
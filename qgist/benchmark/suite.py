@@ -0,0 +1,321 @@
+# -*- coding: utf-8 -*-
+
+"""
+
+QGIST PLUGIN MANAGER
+QGIS Plugin for Managing QGIS Plugins
+https://github.com/qgist/pluginmanager
+
+    qgist/benchmark/suite.py: Benchmarks against synthetic datasets
+
+    Copyright (C) 2017-2020 QGIST project <info@qgist.org>
+
+<LICENSE_BLOCK>
+The contents of this file are subject to the GNU General Public License
+Version 2 ("GPL" or "License"). You may not use this file except in
+compliance with the License. You may obtain a copy of the License at
+https://www.gnu.org/licenses/old-licenses/gpl-2.0.txt
+https://github.com/qgist/pluginmanager/blob/master/LICENSE
+
+Software distributed under the License is distributed on an "AS IS" basis,
+WITHOUT WARRANTY OF ANY KIND, either express or implied. See the License for the
+specific language governing rights and limitations under the License.
+</LICENSE_BLOCK>
+
+"""
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# IMPORT (Python Standard Library)
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+import datetime
+import gc
+import math
+import os
+import platform
+import statistics
+import tempfile
+import time
+import tracemalloc
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# IMPORT (Internal)
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+from .const import (
+    BENCHMARK_CACHE_RATIO,
+    BENCHMARK_REPEAT,
+    BENCHMARK_REPO_ID,
+    BENCHMARK_SIZES,
+    DATASET_SEED,
+    DATASET_VERSIONS,
+    )
+from .dtype_dataset import dtype_dataset_class
+from .dtype_fixture import dtype_fixture_class
+
+from ..config import config_class
+from ..error import (
+    QgistTypeError,
+    QgistValueError,
+    )
+from ..pluginmanager.backends.qgis.dtype_cache import dtype_cache_class
+from ..pluginmanager.backends.qgis.dtype_pluginrelease import dtype_pluginrelease_class
+from ..pluginmanager.backends.qgis.dtype_repository import (
+    _iter_chunks,
+    _iter_xml_release_dicts,
+    )
+from ..pluginmanager.const import (
+    CONFIG_GROUP_QGISLEGACY_REPOS,
+    CONFIG_KEY_ALLOW_DEPRECATED,
+    CONFIG_KEY_ALLOW_EXPERIMENTAL,
+    )
+from ..pluginmanager.dtype_index import dtype_index_class
+from ..pluginmanager.dtype_metadata import dtype_metadata_class
+from ..pluginmanager.dtype_releasefile import dtype_releasefile_class
+from ..pluginmanager.dtype_settings import dtype_settings_class
+from ..pluginmanager.dtype_version import dtype_version_class
+from ..qgis_api import get_qgis_version
+from ..util import tr
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# ROUTINES: API
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+def run(sizes = BENCHMARK_SIZES, names = None, repeat = BENCHMARK_REPEAT, seed = DATASET_SEED):
+    """
+    Runs benchmarks (all or by name) against synthetic datasets of given sizes (releases)
+
+    Returns JSON-serializable dict: meta information and one result per case and size.
+    Settings, configuration and store of all benchmarks are isolated in temporary folders. The index
+    benchmark does still scan the installed plugins of the active QGIS profile.
+    """
+
+    if not isinstance(sizes, (list, tuple)):
+        raise QgistTypeError(tr('"sizes" must be a list or tuple'))
+    if not all((isinstance(size, int) for size in sizes)):
+        raise QgistTypeError(tr('All items in "sizes" must be int'))
+    if any((size < 1 for size in sizes)):
+        raise QgistValueError(tr('All items in "sizes" must be greater than zero'))
+    if names is None:
+        names = tuple(BENCHMARKS.keys())
+    if not isinstance(names, (list, tuple)):
+        raise QgistTypeError(tr('"names" must be a list or tuple or None'))
+    if any((name not in BENCHMARKS.keys() for name in names)):
+        raise QgistValueError(tr('"names" contains unknown benchmarks'))
+    if not isinstance(repeat, int):
+        raise QgistTypeError(tr('"repeat" must be an int'))
+    if repeat < 1:
+        raise QgistValueError(tr('"repeat" must be greater than zero'))
+    if not isinstance(seed, int):
+        raise QgistTypeError(tr('"seed" must be an int'))
+
+    results = []
+
+    for size in sizes:
+        dataset = dtype_dataset_class(
+            plugins = math.ceil(size / DATASET_VERSIONS), versions = DATASET_VERSIONS, seed = seed,
+            )
+        xml_dicts = _get_xml_dicts(dataset)[:size]
+        for name in names:
+            with tempfile.TemporaryDirectory(prefix = 'qgist_benchmark_') as path:
+                for case, measurement in BENCHMARKS[name](dataset, xml_dicts, repeat, path).items():
+                    results.append({'benchmark': name, 'case': case, 'size': size, **measurement})
+
+    return {
+        'meta': {
+            'timestamp': datetime.datetime.now(datetime.timezone.utc).isoformat(),
+            'python': platform.python_version(),
+            'implementation': platform.python_implementation(),
+            'platform': platform.platform(),
+            'qgis': get_qgis_version(),
+            'repeat': repeat,
+            'seed': seed,
+            },
+        'results': results,
+        }
+
+def measure(func, repeat = BENCHMARK_REPEAT, setup = None):
+    """
+    Times `func` `repeat` times, then measures its peak memory in one extra run - setup excluded
+
+    `setup` (optional) is called before every run and returns a tuple of arguments for `func`.
+    Memory is traced in a separate run because tracing distorts timings.
+    """
+
+    if not hasattr(func, '__call__'):
+        raise QgistTypeError(tr('"func" must be callable'))
+    if not hasattr(setup, '__call__') and setup is not None:
+        raise QgistTypeError(tr('"setup" must be callable or None'))
+
+    times = []
+    for _ in range(repeat):
+        args = setup() if setup is not None else tuple()
+        gc.collect()
+        start = time.perf_counter()
+        func(*args)
+        times.append(time.perf_counter() - start)
+
+    args = setup() if setup is not None else tuple()
+    gc.collect()
+    tracemalloc.start()
+    try:
+        func(*args)
+        _, peak_memory = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {
+        'times': times,
+        'min': min(times),
+        'median': statistics.median(times),
+        'mean': statistics.mean(times),
+        'peak_memory': peak_memory, # bytes
+        }
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# ROUTINES: BENCHMARKS
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+def _bench_cache(dataset, xml_dicts, repeat, path):
+    "Extraction of plugin ZIP-files from cache, one ZIP-file per `BENCHMARK_CACHE_RATIO` releases"
+
+    file_names = [xml_dict['file_name'] for xml_dict in xml_dicts[::BENCHMARK_CACHE_RATIO]]
+
+    for file_name in file_names:
+        with open(os.path.join(path, file_name), 'wb') as f:
+            f.write(dataset.get_download(file_name))
+
+    cache = dtype_cache_class(BENCHMARK_REPO_ID, root = os.path.join(path, 'cache')) # own store, not the shared one
+    for file_name in file_names:
+        cache.add_local_file(file_name, os.path.join(path, file_name))
+
+    def _extract(target):
+        for file_name in file_names:
+            cache.extract(file_name, os.path.join(target, file_name[:-len('.zip')]))
+
+    try:
+        return {'cache_extract': {
+            'zipfiles': len(file_names),
+            **measure(_extract, repeat, lambda: (tempfile.mkdtemp(dir = path),)),
+            }}
+    finally:
+        cache.clear()
+
+def _bench_index(dataset, xml_dicts, repeat, path):
+    "Rebuild of index from configuration (incl. release caches) and reconnect of plugins and releases"
+
+    settings = dtype_settings_class( # isolated from QGIS profile
+        config_class(os.path.join(path, 'config.json')), fn = os.path.join(path, 'settings.ini'),
+        )
+    for key in (CONFIG_KEY_ALLOW_DEPRECATED, CONFIG_KEY_ALLOW_EXPERIMENTAL): # fresh settings lack them
+        if settings.get(key, None) is None:
+            settings[key] = settings.bool_to_str(False, style = 'truefalse')
+    repos_group = settings.get_group(CONFIG_GROUP_QGISLEGACY_REPOS)
+
+    try:
+
+        with dtype_fixture_class(dataset) as fixture:
+
+            config_group = repos_group.get_group(BENCHMARK_REPO_ID)
+            config_group['url'] = fixture.url
+            config_group['enabled'] = 'true'
+            config_group['authcfg'] = ''
+            config_group['protected'] = 'false'
+            config_group['lazy_history'] = 'false' # all releases
+
+            index = dtype_index_class(config = settings)
+            repo = index.repos[BENCHMARK_REPO_ID]
+            repo.refresh()
+            if len(repo.refresh_errors) != 0:
+                raise repo.refresh_errors[0].error
+            index.reconnect()
+
+        releases = len(tuple(repo.plugin_releases))
+
+        return {
+            'index_rebuild': {'releases': releases, **measure(index.rebuild, repeat)},
+            'index_reconnect': {'releases': releases, **measure(index.reconnect, repeat)},
+            }
+
+    finally:
+        del repos_group[BENCHMARK_REPO_ID]
+        settings.flush()
+
+def _bench_metadata(dataset, xml_dicts, repeat, path):
+    "Meta data from XML (dicts, as provided by parser) and from `metadata.txt`"
+
+    metadatatxts = [
+        (xml_dict['file_name'].split('.', 1)[0], dataset.get_metadatatxt(xml_dict['file_name']))
+        for xml_dict in xml_dicts
+        ]
+
+    return {
+        'metadata_from_xmldict': measure(
+            lambda: [dtype_metadata_class.from_xmldict(xml_dict) for xml_dict in xml_dicts], repeat,
+            ),
+        'metadata_from_metadatatxt': measure(
+            lambda: [dtype_metadata_class.from_metadatatxt(*item) for item in metadatatxts], repeat,
+            ),
+        }
+
+def _bench_releasefile(dataset, xml_dicts, repeat, path):
+    "Writing and reading of releases file of a repository"
+
+    data = [dtype_pluginrelease_class.from_xmldict(xml_dict).as_config_decompressed() for xml_dict in xml_dicts]
+    releasefile = dtype_releasefile_class(os.path.join(path, 'releases', BENCHMARK_REPO_ID))
+    releasefile.write(data)
+
+    return {
+        'releasefile_write': {'bytes': releasefile.size, **measure(lambda: releasefile.write(data), repeat)},
+        'releasefile_read': {'bytes': releasefile.size, **measure(releasefile.read, repeat)},
+        }
+
+def _bench_settings(dataset, xml_dicts, repeat, path):
+    "Packing of release cache for configuration"
+
+    data = [dtype_pluginrelease_class.from_xmldict(xml_dict).as_config_decompressed() for xml_dict in xml_dicts]
+    packed = dtype_settings_class.dump(data)
+
+    return {
+        'settings_dump': {'bytes': len(packed), **measure(lambda: dtype_settings_class.dump(data), repeat)},
+        'settings_load': {'bytes': len(packed), **measure(lambda: dtype_settings_class.load(packed), repeat)},
+        'settings_load_column': measure(lambda: dtype_settings_class.load_column(packed, ('meta', 'id')), repeat),
+        }
+
+def _bench_version(dataset, xml_dicts, repeat, path):
+    "Parsing, sorting and comparing of plugin versions"
+
+    version_strs = [xml_dict['version'] for xml_dict in xml_dicts]
+    versions = [dtype_version_class.from_pluginversion(version_str) for version_str in version_strs]
+    pairs = list(zip(versions[:-1], versions[1:]))
+
+    return {
+        'version_parse': measure(
+            lambda: [dtype_version_class.from_pluginversion(version_str) for version_str in version_strs], repeat,
+            ),
+        'version_sort': measure(lambda: sorted(versions), repeat),
+        'version_compare': measure(lambda: [a < b for a, b in pairs], repeat),
+        }
+
+BENCHMARKS = {
+    'cache': _bench_cache,
+    'index': _bench_index,
+    'metadata': _bench_metadata,
+    'releasefile': _bench_releasefile,
+    'settings': _bench_settings,
+    'version': _bench_version,
+    }
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# ROUTINES: HELPER
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+def _get_xml_dicts(dataset):
+    "All releases of dataset as dicts, as provided by the streaming `plugins.xml` parser of the qgis backend"
+
+    xml_dicts = []
+
+    for plugin_id in dataset.plugin_ids:
+        xml_dicts.extend(_iter_xml_release_dicts(_iter_chunks(dataset.get_package('', plugin_id, None))))
+
+    return xml_dicts
@@ -28,15 +28,21 @@ specific language governing rights and limitations under the License.
 # IMPORT (Python Standard Library)
 # +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
 
-import copy
+import atexit
+from contextlib import contextmanager
 import json
 import os
+import tempfile
+import threading
+from types import MappingProxyType
+import weakref
 
 # +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
 # IMPORT (Internal)
 # +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
 
 from .const import (
+    CONFIG_WRITE_DELAY,
     QGIS_CONFIG_FLD,
     QGIST_CONFIG_FLD,
     )
@@ -53,6 +59,8 @@ from .util import tr
 # ROUTINES
 # +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
 
+_configs = weakref.WeakSet() # all configurations, for flushing pending changes
+
 def get_config_path():
 
     root_fld = get_qgis_settings_dir_path()
@@ -75,18 +83,47 @@ def get_config_path():
 
     return root_qgis_qgist_fld
 
+def flush_configs():
+    "Writes pending changes of all configurations to disk, e.g. on unload or exit"
+
+    for config in tuple(_configs):
+        config.flush()
+
+atexit.register(flush_configs)
+
 # +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
 # CLASS
 # +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
 
 class config_class:
+    """
+    Configuration, persisted as JSON file
+
+    Changes are written behind: The first change starts a timer, all changes within `delay`
+    seconds are written at once. Changes within a `batch` are written once, on its exit.
+    The file is replaced atomically, i.e. it is never left partially written.
 
-    def __init__(self, fn):
+    Values are frozen when written and handed out as they are, without copying: dicts as
+    read-only mappings, lists as tuples. Use `get_mutable` for a mutable copy.
+
+    Mutable.
+    """
+
+    def __init__(self, fn, delay = CONFIG_WRITE_DELAY):
 
         if not isinstance(fn, str):
             raise QgistTypeError(tr('"fn" must be str.'))
+        if not isinstance(delay, (int, float)):
+            raise QgistTypeError(tr('"delay" must be a number.'))
+        if delay < 0:
+            raise QgistValueError(tr('"delay" must not be negative.'))
 
         self._fn = fn
+        self._delay = delay
+        self._lock = threading.RLock() # writes may come from background threads
+        self._depth = 0 # of nested batches
+        self._dirty = False # changes not yet written
+        self._timer = None # pending write
 
         if not os.path.exists(fn):
             if not os.path.exists(os.path.dirname(fn)):
@@ -101,11 +138,14 @@ class config_class:
             with open(fn, 'r', encoding = 'utf-8') as f:
                 data = f.read()
             try:
-                self._data = json.loads(data)
+                data = json.loads(data)
             except:
                 raise QgistConfigFormatError(tr('Config does not contain valid JSON.'))
-            if not isinstance(self._data, dict):
+            if not isinstance(data, dict):
                 raise QgistTypeError(tr('Configuration data must be a dict.'))
+            self._data = {name: self._freeze(value) for name, value in data.items()}
+
+        _configs.add(self)
 
     def __getitem__(self, name):
 
@@ -114,17 +154,70 @@ class config_class:
         if name not in self._data.keys():
             raise QgistConfigKeyError(tr('Unknown configuration field "name".'))
 
-        return copy.deepcopy(self._data[name])
+        return self._data[name] # frozen, shared - do not copy
 
     def __setitem__(self, name, value):
 
         if not isinstance(name, str):
             raise QgistTypeError(tr('"name" must be str.'))
-        if not self.check_value(value):
-            raise QgistTypeError(tr('"value" contains not allowed types.'))
 
-        self._data[name] = value
-        self._save()
+        value = self._freeze(value) # does check value, copies it once
+
+        with self._lock:
+            self._data[name] = value
+            self._dirty = True
+            if self._depth == 0:
+                self._schedule()
+
+    @contextmanager
+    def batch(self):
+        """
+        Context manager for many changes at once: They are written to disk once, on exit.
+        If an exception is raised within, all of them are discarded. Batches can be nested.
+        Other threads wait for the batch to complete before they can make changes.
+        """
+
+        with self._lock:
+            snapshot = (self._data.copy(), self._dirty) # values are replaced, never modified in place
+            self._depth += 1
+            try:
+                yield self
+            except BaseException:
+                self._data, self._dirty = snapshot
+                raise
+            finally:
+                self._depth -= 1
+            if self._depth == 0:
+                self.flush()
+
+    def flush(self):
+        "Write pending changes to disk now"
+
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            if not self._dirty or self._depth > 0: # batches are written on their exit
+                return
+            self._save()
+            self._dirty = False
+
+    def __delitem__(self, name):
+
+        if not isinstance(name, str):
+            raise QgistTypeError(tr('"name" must be str.'))
+
+        with self._lock:
+            if name not in self._data.keys():
+                raise QgistConfigKeyError(tr('Unknown configuration field "name".'))
+            del self._data[name]
+            self._dirty = True
+            if self._depth == 0:
+                self._schedule()
+
+    @property
+    def fn(self):
+        return self._fn
 
     def get(self, name, default):
 
@@ -133,6 +226,11 @@ class config_class:
         except QgistConfigKeyError:
             return default
 
+    def get_mutable(self, name, default):
+        "Mutable (deep) copy of value - dicts and lists instead of read-only mappings and tuples"
+
+        return self._thaw(self.get(name, default))
+
     def keys(self):
 
         return self._data.keys()
@@ -160,30 +258,71 @@ class config_class:
 
         return True
 
+    @classmethod
+    def _freeze(cls, value):
+        "Immutable (deep) copy of value - dicts become read-only mappings, lists become tuples"
+
+        if value is None or type(value) in (int, float, bool, str):
+            return value
+        if type(value) in (list, tuple):
+            return tuple(cls._freeze(item) for item in value)
+        if type(value) in (dict, MappingProxyType):
+            return MappingProxyType({cls._freeze(k): cls._freeze(v) for k, v in value.items()})
+
+        raise QgistTypeError(tr('"value" contains not allowed types.'))
+
+    @classmethod
+    def _thaw(cls, value):
+        "Mutable (deep) copy of frozen value"
+
+        if isinstance(value, tuple):
+            return [cls._thaw(item) for item in value]
+        if isinstance(value, MappingProxyType):
+            return {k: cls._thaw(v) for k, v in value.items()}
+
+        return value
+
+    def _schedule(self):
+
+        if self._delay == 0:
+            self.flush()
+            return
+        if self._timer is not None: # write pending, will include this change
+            return
+
+        self._timer = threading.Timer(self._delay, self._write_behind)
+        self._timer.daemon = True # pending changes are flushed on exit
+        self._timer.start()
+
+    def _write_behind(self):
+
+        try:
+            self.flush()
+        except QgistValueError:
+            pass # changes remain pending, written by next flush
+
     def _save(self):
+        "Writes temporary file next to configuration, then replaces configuration with it"
 
-        backup_fn = None
-        if os.path.exists(self._fn):
-            backup_fn = self._fn + '.backup'
-            max_attempts = 100
-            attempt = 0
-            attempt_ok = False
-            while attempt < max_attempts:
-                backup_fn_numbered = '{NAME:s}{NUMBER:02d}'.format(NAME = backup_fn, NUMBER = attempt)
-                if not os.path.exists(backup_fn_numbered):
-                    attempt_ok = True
-                    backup_fn = backup_fn_numbered
-                    break
-                attempt += 1
-            if not attempt_ok:
-                raise QgistValueError(tr('Could not backup old configuration before saving new - too many old backups.'))
-            os.rename(self._fn, backup_fn)
-
-        with open(self._fn, 'w', encoding = 'utf-8') as f:
-            f.write(json.dumps(self._data, indent = 4, sort_keys = True))
-
-        if backup_fn is not None:
-            os.unlink(backup_fn)
+        fd, tmp_fn = tempfile.mkstemp(
+            dir = os.path.dirname(self._fn),
+            prefix = os.path.basename(self._fn) + '.',
+            suffix = '.tmp',
+            )
+        try:
+            with os.fdopen(fd, 'w', encoding = 'utf-8') as f:
+                f.write(json.dumps(self._data, indent = 4, sort_keys = True, default = dict)) # dict: read-only mappings
+                f.flush()
+                os.fsync(f.fileno())
+            if os.path.exists(self._fn):
+                os.chmod(tmp_fn, os.stat(self._fn).st_mode & 0o777) # keep permissions
+            os.replace(tmp_fn, self._fn)
+        except OSError as e:
+            try:
+                os.unlink(tmp_fn)
+            except OSError:
+                pass
+            raise QgistValueError(tr('Could not save configuration.'), e)
 
     @staticmethod
     def import_config(fn):
@@ -28,8 +28,19 @@ specific language governing rights and limitations under the License.
 # CONST
 # +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
 
+CONFIG_WRITE_DELAY = 1.0 # seconds changes of configuration are collected before they are written
 DEFAULT_FLD = 'defaults'
 ICON_FLD = 'icons'
 QGIS_CONFIG_FLD = 'QGIS'
 QGIST_CONFIG_FLD = 'qgist'
 TRANSLATION_FLD = 'i18n'
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# HTTP
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+HTTP_BACKOFF_BASE = 0.5 # seconds before first retry, doubled for every further retry
+HTTP_BACKOFF_MAX = 8.0 # maximum seconds between two retries
+HTTP_BREAKER_COOLDOWN = 60.0 # seconds a host is not contacted after its circuit breaker opened
+HTTP_BREAKER_THRESHOLD = 5 # consecutive failures until circuit breaker of a host opens
+HTTP_RETRIES = 2 # retries after first failed attempt of a request
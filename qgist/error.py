@@ -43,6 +43,12 @@ class QgistIndexError(IndexError):
 class QgistRequestError(Exception):
     pass
 
+class QgistCircuitOpenError(QgistRequestError):
+    pass
+
+class QgistTimeoutError(TimeoutError):
+    pass
+
 class QgistTranslationError(Exception):
     pass
 
@@ -34,12 +34,24 @@ import abc
 # ABCs
 # +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
 
+class changeset_abc(abc.ABC):
+    pass
+
+class fetcher_abc(abc.ABC):
+    pass
+
 class imports_abc(abc.ABC):
     pass
 
 class index_abc(abc.ABC):
     pass
 
+class install_summary_abc(abc.ABC):
+    pass
+
+class installer_abc(abc.ABC):
+    pass
+
 class metadata_abc(abc.ABC):
     pass
 
@@ -49,9 +61,18 @@ class plugin_abc(abc.ABC):
 class pluginrelease_abc(abc.ABC):
     pass
 
+class refresh_error_abc(abc.ABC):
+    pass
+
+class releasefile_abc(abc.ABC):
+    pass
+
 class repository_abc(abc.ABC):
     pass
 
+class scheduler_abc(abc.ABC):
+    pass
+
 class settings_abc(abc.ABC):
     pass
 
@@ -38,6 +38,7 @@ from ...const import (
     REPO_BACKEND_QGISLEGACYCPP,
     CONFIG_GROUP_MANAGER_REPOS,
     )
+from ...dtype_changeset import dtype_changeset_class
 from ...dtype_repository_base import dtype_repository_base_class
 from ...dtype_settings import dtype_settings_class
 
@@ -56,10 +57,15 @@ class dtype_repository_class(dtype_repository_base_class):
 # MANAGEMENT & EXPORT
 # +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
 
-    def refresh(self):
-        "Refresh index, i.e. reload metadata from remote source"
+    def fetch(self):
+        "Network part of refresh - must not change the repository, returns result for `apply_fetched`"
 
-        return # there is nothing to refresh
+        return None # there is nothing to refresh
+
+    def apply_fetched(self, fetched):
+        "Local part of refresh - applies result of `fetch`, returns changeset"
+
+        return dtype_changeset_class()
 
     # def remove(self):
     #     "Run cleanup actions e.g. in config before repo is removed"
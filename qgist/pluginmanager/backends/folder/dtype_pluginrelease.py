@@ -0,0 +1,144 @@
+# -*- coding: utf-8 -*-
+
+"""
+
+QGIST PLUGIN MANAGER
+QGIS Plugin for Managing QGIS Plugins
+https://github.com/qgist/pluginmanager
+
+    qgist/pluginmanager/backends/folder/dtype_pluginrelease.py: Plugin release (ZIP-file in folder)
+
+    Copyright (C) 2017-2020 QGIST project <info@qgist.org>
+
+<LICENSE_BLOCK>
+The contents of this file are subject to the GNU General Public License
+Version 2 ("GPL" or "License"). You may not use this file except in
+compliance with the License. You may obtain a copy of the License at
+https://www.gnu.org/licenses/old-licenses/gpl-2.0.txt
+https://github.com/qgist/pluginmanager/blob/master/LICENSE
+
+Software distributed under the License is distributed on an "AS IS" basis,
+WITHOUT WARRANTY OF ANY KIND, either express or implied. See the License for the
+specific language governing rights and limitations under the License.
+</LICENSE_BLOCK>
+
+"""
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# IMPORT (Python Standard Library)
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+import os
+import pathlib
+import urllib.parse
+import urllib.request
+import zipfile
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# IMPORT (Internal)
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+from ..qgis.dtype_pluginrelease import dtype_pluginrelease_class as _qgis_pluginrelease_class
+
+from ...const import REPO_BACKEND_FOLDER
+from ...dtype_metadata import dtype_metadata_class
+
+from ....error import (
+    QgistTypeError,
+    QgistValueError,
+    )
+from ....util import tr
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# CLASS
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+class dtype_pluginrelease_class(_qgis_pluginrelease_class):
+    """
+    Release of a QGIS plugin, ZIP-file in a folder. `download_url` is a `file://` URL.
+    Installation works just like for QGIS plugins - the ZIP-file is copied into the repository's cache first.
+
+    Mutable.
+    """
+
+    _repo_type = REPO_BACKEND_FOLDER
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# HELPER
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+    def _fetch_from_remote_to_cache_file(self):
+
+        if self._is_in_cache():
+            return
+        if not self._meta['download_url'].value_set:
+            raise QgistValueError(tr('"download_url" not set in meta data'))
+
+        url = urllib.parse.urlsplit(self._meta['download_url'].value)
+        if url.scheme != 'file':
+            raise QgistValueError(tr('"download_url" is not a file URL'))
+
+        self._cache.add_local_file(
+            filename = self._meta['file_name'].value,
+            path = urllib.request.url2pathname(
+                url.path if url.netloc in ('', 'localhost') else f'//{url.netloc:s}{url.path:s}' # UNC path
+                ),
+            )
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# PRE-CONSTRUCTOR
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+    @classmethod
+    def from_zipfile(cls, path, file_name = None):
+        """
+        From ZIP-file in folder - only its metadata.txt is read
+
+        `file_name` (optional) is the path of the ZIP-file relative to the repository folder. It names the
+        file in the cache, so ZIP-files of the same name in different sub-folders do not collide.
+        Defaults to the base name of `path`.
+        """
+
+        if not isinstance(path, str):
+            raise QgistTypeError(tr('"path" must be str'))
+        if not os.path.isfile(path):
+            raise QgistValueError(tr('"path" must point to an existing file'))
+        if file_name is None:
+            file_name = os.path.basename(path)
+        if not isinstance(file_name, str):
+            raise QgistTypeError(tr('"file_name" must be str or None'))
+        if not file_name.lower().endswith('.zip'):
+            raise QgistValueError(tr('"file_name" does not refer to a ZIP-file'))
+
+        try:
+            with zipfile.ZipFile(path, 'r') as f:
+                plugin_ids = {name.split('/', 1)[0] for name in f.namelist() if '/' in name}
+                if len(plugin_ids) != 1:
+                    raise QgistValueError(tr('ZIP-file must contain exactly one top-level directory'))
+                plugin_id = plugin_ids.pop()
+                metadatatxt_string = f.read(f'{plugin_id:s}/metadata.txt').decode('utf-8')
+                init_string = f.read(f'{plugin_id:s}/__init__.py').decode('utf-8') # TODO encoding from file?
+        except QgistValueError:
+            raise
+        except Exception as e:
+            raise QgistValueError(tr('failed to read metadata.txt or __init__.py from ZIP-file'), e)
+
+        meta = dtype_metadata_class.from_metadatatxt(plugin_id, metadatatxt_string)
+        if not meta['version'].value_set:
+            raise QgistValueError(tr('"version" not set in metadata.txt'))
+        if not meta['server'].value_set:
+            meta['server'].value = cls._is_func_present(init_string, 'serverClassFactory')
+        meta['file_name'].value = file_name
+        meta['download_url'].value = pathlib.Path(os.path.abspath(path)).as_uri()
+        cls.fix_meta_by_setting_defaults(meta)
+
+        return cls(
+            plugin_id = meta['id'].value,
+            version = meta['version'].value,
+            has_processingprovider = meta['hasProcessingProvider'].value,
+            has_serverfuncs = meta['server'].value,
+            experimental = meta['experimental'].value,
+            deprecated = meta['deprecated'].value,
+            installed = False,
+            meta = meta,
+            )
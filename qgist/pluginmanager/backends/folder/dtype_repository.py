@@ -0,0 +1,312 @@
+# -*- coding: utf-8 -*-
+
+"""
+
+QGIST PLUGIN MANAGER
+QGIS Plugin for Managing QGIS Plugins
+https://github.com/qgist/pluginmanager
+
+    qgist/pluginmanager/backends/folder/dtype_repository.py: Repository (local folder or network share)
+
+    Copyright (C) 2017-2020 QGIST project <info@qgist.org>
+
+<LICENSE_BLOCK>
+The contents of this file are subject to the GNU General Public License
+Version 2 ("GPL" or "License"). You may not use this file except in
+compliance with the License. You may obtain a copy of the License at
+https://www.gnu.org/licenses/old-licenses/gpl-2.0.txt
+https://github.com/qgist/pluginmanager/blob/master/LICENSE
+
+Software distributed under the License is distributed on an "AS IS" basis,
+WITHOUT WARRANTY OF ANY KIND, either express or implied. See the License for the
+specific language governing rights and limitations under the License.
+</LICENSE_BLOCK>
+
+"""
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# IMPORT (Python Standard Library)
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+import os
+import pathlib
+import random
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# IMPORT (Internal)
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+from .dtype_pluginrelease import dtype_pluginrelease_class
+
+from ..qgis.dtype_cache import dtype_cache_class
+
+from ...abc import (
+    settings_abc,
+    settings_group_abc,
+    )
+from ...const import (
+    CONFIG_DELIMITER,
+    CONFIG_GROUP_MANAGER_REPOS,
+    CONFIG_KEY_MANIFEST,
+    REPO_BACKEND_FOLDER,
+    )
+from ...dtype_changeset import dtype_changeset_class
+from ...dtype_refresh_error import dtype_refresh_error_class
+from ...dtype_repository_base import dtype_repository_base_class
+
+from ....error import (
+    QgistTypeError,
+    QgistValueError,
+    )
+from ....util import tr
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# CLASS
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+class dtype_repository_class(dtype_repository_base_class):
+    """
+    Repository of plugin ZIP-files in a local folder or on a network share (including sub-folders)
+
+    A manifest remembers size and modification time of every ZIP-file together with the
+    release it contains. On refresh, only new or changed ZIP-files are opened.
+
+    Mutable.
+    """
+
+    _repo_type = REPO_BACKEND_FOLDER
+
+    def __init__(self, path = None, writeable = False, manifest = None, **kwargs):
+
+        if 'repo_id' not in kwargs.keys():
+            raise QgistValueError('"repo_id" missing')
+        repo_id = kwargs['repo_id']
+        if not isinstance(repo_id, str):
+            raise QgistTypeError(tr('"repo_id" must be a str.'))
+        if len(repo_id) == 0:
+            raise QgistValueError(tr('"repo_id" must not be empty.'))
+
+        self._cache = dtype_cache_class(repo_id)
+
+        super().__init__(**kwargs)
+
+        if not isinstance(path, str):
+            raise QgistTypeError(tr('"path" must be str'))
+        if len(path) == 0:
+            raise QgistValueError(tr('"path" must not be empty'))
+        if not isinstance(writeable, bool):
+            raise QgistTypeError(tr('"writeable" must be bool'))
+        if manifest is None:
+            manifest = dict()
+        if not isinstance(manifest, dict):
+            raise QgistTypeError(tr('"manifest" must be a dict or None'))
+
+        self._path = os.path.abspath(path)
+        self._writeable = writeable # TODO publishing plugins into folder
+        self._manifest = manifest # by path relative to folder: [size, mtime in ns, download_url or None if invalid]
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# SPECIAL PROPERTIES (ONLY THIS REPO TYPE)
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+    @property
+    def cache(self):
+        return self._cache
+
+    @property
+    def path(self):
+        return self._path
+
+    @property
+    def url(self):
+        return pathlib.Path(self._path).as_uri()
+
+    @property
+    def writeable(self):
+        return self._writeable
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# MANAGEMENT & EXPORT
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+    def fetch(self):
+        "Network part of refresh - must not change the repository, returns result for `apply_fetched`"
+
+        if not os.path.isdir(self._path):
+            raise QgistValueError(tr('Repository folder is not available') + f': {self._path:s}')
+
+        with self._lock: # snapshot, repo may change while folder is scanned
+            known_releases = {
+                release.meta['download_url'].value: release
+                for release in self._plugin_releases
+                }
+            known_manifest = dict(self._manifest)
+
+        releases = []
+        manifest = {}
+        errors = []
+
+        for path, stat in _iter_zipfiles(self._path):
+
+            relpath = os.path.relpath(path, self._path)
+            file_name = pathlib.PurePath(relpath).as_posix() # cache key, unique within the folder
+            entry = known_manifest.get(relpath, None)
+
+            if entry is not None and entry[:2] == [stat.st_size, stat.st_mtime_ns]: # unchanged, do not open
+                manifest[relpath] = entry
+                if (
+                    entry[2] is not None and entry[2] in known_releases.keys()
+                    and known_releases[entry[2]].meta['file_name'].value == file_name # else cached under base name
+                    ):
+                    releases.append(known_releases[entry[2]])
+                    continue
+                if entry[2] is None: # known to be invalid
+                    continue
+
+            try:
+                release = dtype_pluginrelease_class.from_zipfile(path, file_name)
+            except Exception as e:
+                errors.append(dtype_refresh_error_class(self._id, pathlib.Path(path).as_uri(), e))
+                manifest[relpath] = [stat.st_size, stat.st_mtime_ns, None]
+                continue
+
+            releases.append(release)
+            manifest[relpath] = [stat.st_size, stat.st_mtime_ns, release.meta['download_url'].value]
+
+        return releases, manifest, errors
+
+    def apply_fetched(self, fetched):
+        "Local part of refresh - diffs releases against known ones, applies and persists the changes only"
+
+        releases, manifest, errors = fetched
+        self._refresh_errors = tuple(errors)
+
+        changeset = dtype_changeset_class.from_releases(self._plugin_releases, releases)
+
+        for release in (*changeset.removed, *changeset.changed): # cached copies of replaced ZIP-files are stale
+            filename = release.meta['file_name'].value
+            if filename in self._cache:
+                self._cache.remove_file(filename)
+
+        self._manifest = manifest
+        self.apply_changeset(changeset)
+        self._config_group[CONFIG_KEY_MANIFEST] = self._config_group.settings.dump(self._manifest)
+
+        return changeset
+
+    def remove(self):
+        "Run cleanup actions e.g. in config before repo is removed"
+
+        self._cache.clear()
+        self._releasefile.remove()
+
+    def to_config(self):
+        "Write repository to configuration"
+
+        super().to_config()
+
+        self._config_group['path'] = self._path
+        self._config_group['writeable'] = self._config_group.settings.bool_to_str(self._writeable, style = 'truefalse')
+        self._config_group[CONFIG_KEY_MANIFEST] = self._config_group.settings.dump(self._manifest)
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# CLASS-LEVEL API
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+    @classmethod
+    def find_plugins(cls, config, protected, plugin_modules):
+
+        return tuple() # installed plugins are found by the QGIS plugin backend
+
+    @staticmethod
+    def _get_manifest_from_config(config_group):
+
+        manifest_compressed = config_group.get(CONFIG_KEY_MANIFEST, None)
+        if manifest_compressed is None:
+            return dict()
+
+        manifest = config_group.settings.load(manifest_compressed)
+        if not isinstance(manifest, dict):
+            raise QgistTypeError(tr('Inconsistent repository manifest: Expected a dict'))
+
+        return manifest
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# PRE-CONSTRUCTOR
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+    @classmethod
+    def from_directory(cls, config, path, writeable = False):
+
+        if not isinstance(config, settings_abc):
+            raise QgistTypeError(tr('"config" is not settings'))
+        if not isinstance(path, str):
+            raise QgistTypeError(tr('"path" must be str'))
+        if not os.path.isdir(path):
+            raise QgistValueError(tr('"path" must point to an existing directory'))
+
+        name = os.path.basename(os.path.abspath(path))
+        repo_id = f'{name:s} ({random.randint(2**31, 2**32 - 1):x})' # avoid collisions!
+
+        return cls(
+            repo_id = repo_id,
+            name = name,
+            active = True,
+            protected = False,
+            plugin_releases = tuple(), # This is new, there is no cache.
+            config_group = config.get_group(CONFIG_GROUP_MANAGER_REPOS).get_group(cls._repo_type).get_group(repo_id),
+            # SPECIAL
+            path = path,
+            writeable = writeable,
+            )
+
+    @classmethod
+    def from_config(cls, config_group):
+
+        if not isinstance(config_group, settings_group_abc):
+            raise QgistTypeError(tr('"config_group" is not a group of settings'))
+
+        return cls(
+            repo_id = config_group.root.rsplit(CONFIG_DELIMITER, 1)[-1],
+            name = config_group['name'],
+            active = config_group.settings.str_to_bool(config_group['enabled']),
+            protected = config_group.settings.str_to_bool(config_group['protected']),
+            plugin_releases = cls.get_releases_from_config_cache(config_group, cls._repo_type),
+            config_group = config_group,
+            # SPECIAL
+            path = config_group['path'],
+            writeable = config_group.settings.str_to_bool(config_group.get('writeable', 'false')),
+            manifest = cls._get_manifest_from_config(config_group),
+            )
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# ROUTINES (ONLY THIS REPO TYPE)
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+def _iter_zipfiles(path, visited = None):
+    """
+    Yields path and stat of every ZIP-file in folder and its sub-folders - one stat call per file
+    Symlinked folders are followed, each folder is visited once (by device and inode), i.e. no cycles.
+    """
+
+    if visited is None:
+        visited = set()
+
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return
+    if (stat.st_dev, stat.st_ino) in visited:
+        return
+    visited.add((stat.st_dev, stat.st_ino))
+
+    try:
+        entries = list(os.scandir(path))
+    except OSError:
+        return
+
+    for entry in entries:
+        if entry.is_dir(follow_symlinks = True):
+            yield from _iter_zipfiles(entry.path, visited)
+        elif entry.is_file(follow_symlinks = True) and entry.name.lower().endswith('.zip'):
+            yield entry.path, entry.stat(follow_symlinks = True)
@@ -36,3 +36,9 @@ import abc
 
 class cache_abc(abc.ABC):
     pass
+
+class remotezip_abc(abc.ABC):
+    pass
+
+class store_abc(abc.ABC):
+    pass
@@ -31,6 +31,9 @@ specific language governing rights and limitations under the License.
 import glob
 import hashlib
 import os
+import shutil
+import threading
+import time
 import zipfile
 
 # +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
@@ -38,15 +41,24 @@ import zipfile
 # +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
 
 from .abc import cache_abc
+from .dtype_store import (
+    dtype_store_class,
+    get_store,
+    read_json,
+    write_json,
+    )
 
-from ...const import REPO_CACHE_FLD
+from ...const import (
+    REPO_CACHE_FLD,
+    REPO_CACHE_INDEX_FN,
+    REPO_CACHE_STORE_FLD,
+    )
 
 from ....config import get_config_path
 from ....error import (
     QgistTypeError,
     QgistValueError,
     )
-from ....qgis_api import request_data
 from ....util import tr
 
 # +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
@@ -57,24 +69,30 @@ class dtype_cache_class(cache_abc):
     """
     Cache for holding (and managing) plugin ZIP-files locally
 
+    The ZIP-files themselves live in the content-addressed store shared by all repositories.
+    The cache of a repository is an index of file names to digests, persisted next to the store.
+    Entries whose files were evicted from the store are ignored (and replaced when added again).
+    Nothing is touched on disk at construction: The index is read on first use, in one go.
+
     Mutable.
     """
 
-    def __init__(self, prefix):
+    def __init__(self, prefix, root = None):
 
         if not isinstance(prefix, str):
             raise QgistTypeError(tr('"prefix" must be a str'))
         if len(prefix) == 0:
             raise QgistValueError(tr('"prefix" must not be empty'))
+        if not isinstance(root, str) and root is not None:
+            raise QgistTypeError(tr('"root" must be a str or None'))
 
         prefix = hashlib.sha256(prefix.encode('utf-8')).hexdigest()[:8]
 
-        path = os.path.join(get_config_path(), REPO_CACHE_FLD, prefix)
-        self._ensure_path(path)
-
-        self._path = path
-        self._files = {}
-        self._refresh()
+        self._root = root # own folder with own store instead of shared one, e.g. for benchmarks
+        self._path = os.path.join(get_config_path(), REPO_CACHE_FLD, prefix) if root is None else os.path.join(root, prefix)
+        self._lock = threading.RLock()
+        self._store = None # loaded on first use
+        self._files = None # by filename: digest, loaded on first use
 
     def __repr__(self):
 
@@ -82,27 +100,26 @@ class dtype_cache_class(cache_abc):
 
     def __len__(self):
 
-        return len(self._files)
+        return len(tuple(self.files))
 
     def __getitem__(self, filename):
         "Translates filename to full path if filename is present in cache"
 
-        self._check_filename(filename)
-        if filename not in self:
-            raise QgistValueError(tr('"filename" is not present in cache'))
-
-        return self._files[filename]
+        digest = self.get_file_digest(filename)
+        return self._store[digest]
 
     def __contains__(self, filename):
         "Checks if filename is present in cache"
 
-        return filename in self._files.keys()
+        self._load()
+        return filename in self._files.keys() and self._files[filename] in self._store
 
     @property
     def files(self):
         "Returns iterator of cached filenames (not their paths)"
 
-        return (fn for fn in self._files.keys())
+        self._load()
+        return (fn for fn, digest in tuple(self._files.items()) if digest in self._store)
 
     @staticmethod
     def _check_filename(filename):
@@ -129,55 +146,116 @@ class dtype_cache_class(cache_abc):
         if not os.access(path, os.W_OK | os.R_OK):
             raise QgistValueError(tr('path is not writeable and/or readable'))
 
-    @staticmethod
-    def _get_cache_subdirs(filename):
-        "Translates filename to cache sub-directories, i.e. its location in cache"
+    def _add(self, filename, digest):
+        "Adds filename to index of cache and persists index"
+
+        with self._lock:
+            self._files[filename] = digest
+            self._save()
+
+    def _collect(self, digests):
+        "Removes files from store unless referenced by the cache of any repository"
+
+        root = os.path.dirname(self._path)
+        referenced = set()
+        for path in glob.iglob(os.path.join(root, '*', REPO_CACHE_INDEX_FN)): # one index per repository
+            referenced.update(read_json(path, {}).values())
+
+        referenced.update(self._store.installed) # files of installed releases stay
+
+        for digest in digests:
+            if digest not in referenced and digest in self._store:
+                self._store.remove(digest)
 
-        filename_hash = hashlib.sha256(filename.encode('utf-8')).hexdigest()
-        return filename_hash[0], filename_hash[1]
+    def _import_legacy_files(self):
+        "Moves ZIP-files of old (per repository) cache layout into store, once"
 
-    def _refresh(self):
-        "Refreshes, i.e. rebuilds, the _files dict mapping filenames to absolute paths"
+        if not os.path.isdir(self._path): # new repository, nothing to import
+            return
 
-        new_files = {
-            os.path.basename(path): path
-            for path in glob.iglob(self._path + '/**', recursive = True)
-            if path.lower().endswith('.zip') and os.path.isfile(path)
-            }
+        for path in glob.iglob(self._path + '/**', recursive = True):
+            if not path.lower().endswith('.zip') or not os.path.isfile(path):
+                continue
+            try:
+                self._files[os.path.basename(path)] = self._store.add_file(path)
+            except QgistValueError:
+                pass # broken file, drop it
+            os.unlink(path)
+
+        self._save()
+
+    def _load(self):
+        "Reads index on first use - one file, no scan of the file system"
+
+        with self._lock:
+            if self._files is not None:
+                return
+            self._store = get_store() if self._root is None else dtype_store_class(os.path.join(self._root, REPO_CACHE_STORE_FLD))
+            files = read_json(os.path.join(self._path, REPO_CACHE_INDEX_FN), None)
+            if files is None: # no index yet
+                self._files = {}
+                self._import_legacy_files()
+            else:
+                self._files = files
 
-        self._files.clear()
-        self._files.update(new_files)
+    def _save(self):
+
+        self._ensure_path(self._path) # may have been collected as orphan
+        write_json(os.path.join(self._path, REPO_CACHE_INDEX_FN), self._files)
 
     def add_remote_file(self, filename, url, authcfg):
-        "Add file from URL"
+        "Add file from URL - streamed to disk, not downloaded again if the store already holds a file from this URL"
 
         self._check_filename(filename)
         if filename in self:
             raise QgistValueError(tr('"filename" is present in cache'))
 
-        raw_data = request_data(url, authcfg) # does check url and authcfg
+        self._load()
+        digest = self._store.get_digest(url) # does check url
+        if digest is None:
+            digest = self._store.add_url(url, authcfg) # does check authcfg, does verify data
 
-        subdirs = self._get_cache_subdirs(filename)
-        subpath = os.path.join(self._path, *subdirs)
-        self._ensure_path(subpath)
+        self._add(filename, digest)
 
-        filepath = os.path.abspath(os.path.join(subpath, filename))
-        if os.path.exists(filepath):
-            raise QgistValueError(tr('internal error - full path to future cache file already exists'))
+    def add_local_file(self, filename, path):
+        "Add file from local path (e.g. folder or network share)"
 
-        try:
-            with open(filepath, 'wb') as f:
-                f.write(raw_data)
-        except Exception as e:
-            raise QgistValueError(tr('failed to write cache file'), e)
+        self._check_filename(filename)
+        if filename in self:
+            raise QgistValueError(tr('"filename" is present in cache'))
+
+        self._load()
+        self._add(filename, self._store.add_file(path)) # does check and verify path
+
+    def get_file_digest(self, filename):
+        "SHA-256 digest of file in local cache"
 
-        if not zipfile.is_zipfile(filepath):
-            raise QgistValueError(tr('based on its content, file appears to be no ZIP-file'))
+        self._check_filename(filename)
+        if filename not in self:
+            raise QgistValueError(tr('"filename" is not present in cache'))
 
-        self._files[filename] = filepath
+        return self._files[filename]
 
-    def extract(self, filename, path, password = None):
-        "Extract file from local cache to path"
+    def get_file_index(self, filename):
+        "Index of file in local cache (see `dtype_store_class.get_index`) - does not open file, do not modify"
+
+        digest = self.get_file_digest(filename)
+        return self._store.get_index(digest)
+
+    def mark_installed(self, filename, path):
+        "File was installed to path - it will not be evicted from the store while installed"
+
+        digest = self.get_file_digest(filename)
+        self._store.mark_installed(digest, path)
+
+    def mark_uninstalled(self, path):
+        "Release installed to path was removed"
+
+        self._load()
+        self._store.mark_uninstalled(path)
+
+    def extract(self, filename, path, password = None, members = None):
+        "Extract file (or only some of its members) from local cache to path - streamed, member by member"
 
         self._check_filename(filename)
         if filename not in self:
@@ -188,29 +266,23 @@ class dtype_cache_class(cache_abc):
             raise QgistValueError(tr('"path" must not be empty'))
         if not isinstance(password, str) and password is not None:
             raise QgistTypeError(tr('"password" must either be a str or None'))
+        if members is not None:
+            members = list(members)
+            if not all((isinstance(member, str) for member in members)):
+                raise QgistTypeError(tr('"members" must be names (str) or None'))
 
         self._ensure_path(path)
 
         try:
-            with zipfile.ZipFile(self._files[filename], 'r') as f:
-                f.extractall(path = path, pwd = password)
+            with zipfile.ZipFile(self[filename], 'r') as f:
+                f.extractall(path = path, members = members, pwd = password)
         except Exception as e:
             raise QgistValueError(tr('failed to extract ZIP-file'), e)
 
     def get_file_entries(self, filename):
         "Get iterator of entires in file in local cache"
 
-        self._check_filename(filename)
-        if filename not in self:
-            raise QgistValueError(tr('"filename" is not present in cache'))
-
-        try:
-            with zipfile.ZipFile(self._files[filename], 'r') as f:
-                namelist = f.namelist()
-        except Exception as e:
-            raise QgistValueError(tr('failed to open ZIP-file'), e)
-
-        return (name for name in namelist)
+        return (name for name in self.get_file_index(filename)['namelist'])
 
     def get_file_entry(self, filename, entryname, password = None):
         "Read entry from file in local cache"
@@ -222,13 +294,13 @@ class dtype_cache_class(cache_abc):
             raise QgistTypeError(tr('"entry" must be str'))
         if len(entryname) == 0:
             raise QgistValueError(tr('"entry" must not be empty'))
-        if entryname not in self.get_file_entries(filename):
+        if entryname not in self.get_file_index(filename)['namelist']:
             raise QgistValueError(tr('"entryname" is not present in ZIP-file'))
         if not isinstance(password, str) and password is not None:
             raise QgistTypeError(tr('"password" must either be a str or None'))
 
         try:
-            with zipfile.ZipFile(self._files[filename], 'r') as f:
+            with zipfile.ZipFile(self[filename], 'r') as f:
                 with f.open(entryname, mode = 'r', pwd = password) as fe:
                     data = fe.read()
         except Exception as e:
@@ -236,17 +308,54 @@ class dtype_cache_class(cache_abc):
 
         return data # bytes
 
+    def remove_file(self, filename):
+        "Remove one file from local cache (and from store, if no other repository refers to it)"
+
+        self._check_filename(filename)
+        if filename not in self:
+            raise QgistValueError(tr('"filename" is not present in cache'))
+
+        with self._lock:
+            digest = self._files.pop(filename)
+            self._save()
+        self._collect((digest,))
+
     def clear(self):
-        "Clear local cache, i.e. remove all of its files"
+        "Clear local cache, i.e. remove all of its files (from store, if no other repository refers to them)"
 
-        for path in self._files.values():
-            if not os.path.exists(path):
-                raise QgistValueError(tr('internal error - file in cache was already deleted'))
-            if not os.path.isfile(path):
-                raise QgistValueError(tr('internal error - file in cache is actually not a file'))
-            try:
-                os.unlink(path)
-            except Exception as e:
-                raise QgistValueError(tr('failed to remove cache file'), e)
+        self._load()
+        with self._lock:
+            digests = set(self._files.values())
+            self._files.clear()
+            self._save()
+        self._collect(digests)
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# ROUTINES
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+def evict_cache(max_bytes, max_age):
+    """
+    Reconciles store with files on disk and evicts files from it (see `dtype_store_class.evict`),
+    then removes caches of repositories which have not changed for `max_age` seconds and do not
+    refer to any file in store anymore (e.g. caches of removed repositories). Returns number of evicted files.
+    """
+
+    store = get_store()
+    store.reconcile()
+    evicted = store.evict(max_bytes, max_age)
+
+    now = time.time()
+    for path in glob.glob(os.path.join(os.path.dirname(store.path), '*', REPO_CACHE_INDEX_FN)):
+        try:
+            if now - os.path.getmtime(path) <= max_age:
+                continue
+        except OSError:
+            continue
+        if any((digest in store for digest in read_json(path, {}).values())):
+            continue
+        shutil.rmtree(os.path.dirname(path), ignore_errors = True)
+
+    store.flush() # times of last use
 
-        self._files.clear()
+    return len(evicted)
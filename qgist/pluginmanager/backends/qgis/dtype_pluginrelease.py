@@ -37,13 +37,16 @@ import shutil
 # +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
 
 from .dtype_cache import dtype_cache_class
+from .dtype_remotezip import get_remotezip
 
 from ...abc import repository_abc
 from ...const import REPO_BACKEND_QGISLEGACYPYTHON
 from ...dtype_metadata import dtype_metadata_class
 from ...dtype_pluginrelease_base import dtype_pluginrelease_base_class
+from ...error import QgistMetaTxtError
 
 from ....error import (
+    QgistRequestError,
     QgistTypeError,
     QgistValueError,
     )
@@ -58,6 +61,7 @@ class dtype_pluginrelease_class(dtype_pluginrelease_base_class):
 
     _repo_type = REPO_BACKEND_QGISLEGACYPYTHON
     _cache = dtype_cache_class(_repo_type) # will be overwritten by repo cache
+    _staging = None # staging folder of prepared installation
 
 # +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
 # PROPERTIES
@@ -78,7 +82,14 @@ class dtype_pluginrelease_class(dtype_pluginrelease_base_class):
 # API
 # +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
 
-    def install(self):
+    def download(self):
+
+        self._fetch_from_remote_to_cache_file()
+
+    def stage(self):
+
+        if self._staging is not None:
+            return
 
         self._fetch_from_remote_to_cache_file()
         self._check_file_in_cache()
@@ -86,7 +97,24 @@ class dtype_pluginrelease_class(dtype_pluginrelease_base_class):
 
         # TODO handle dependencies somewhere here
 
-        self._unpack_from_cache_file_to_install_fld()
+        self._staging = self._unpack_from_cache_file_to_staging_fld()
+
+    def unstage(self):
+
+        if self._staging is None:
+            return
+
+        self._staging.cleanup()
+        self._staging = None
+
+    def install(self):
+
+        self.stage()
+
+        try:
+            self._move_from_staging_fld_to_install_fld()
+        finally:
+            self.unstage()
 
     def uninstall(self):
 
@@ -104,6 +132,7 @@ class dtype_pluginrelease_class(dtype_pluginrelease_base_class):
         except Exception as e:
             raise QgistValueError(tr('removing release failed'), e)
 
+        self._cache.mark_uninstalled(self._path)
         self._path = None
 
 # +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
@@ -135,9 +164,9 @@ class dtype_pluginrelease_class(dtype_pluginrelease_base_class):
         if not self._is_in_cache():
             raise QgistValueError(tr('file is not in cache'))
 
-        namelist = list(self._cache.get_file_entries(self._meta['file_name'].value))
+        index = self._cache.get_file_index(self._meta['file_name'].value) # does not open file
 
-        plugin_names = [name[:-1] for name in namelist if name.count('/') == 1 and name.endswith('/')]
+        plugin_names = index['top_dirs']
         if len(plugin_names) == 0:
             raise QgistValueError(tr('There is no plugin in the zip-file (top-level directory missing)'))
         if len(plugin_names) > 1:
@@ -147,9 +176,9 @@ class dtype_pluginrelease_class(dtype_pluginrelease_base_class):
         if plugin_name != self._id:
             raise QgistValueError(tr('Plugin name mismatch'))
 
-        if not f'{self._id:s}/__init__.py' in namelist:
+        if self._id not in index['init_py']:
             raise QgistValueError(tr('Plugin init file missing'))
-        if not f'{self._id:s}/metadata.txt' in namelist:
+        if self._id not in index['metadata_txt']:
             raise QgistValueError(tr('Plugin metadata file missing'))
 
     def _update_metadata_from_cache_file(self):
@@ -160,73 +189,118 @@ class dtype_pluginrelease_class(dtype_pluginrelease_base_class):
         new_meta = self._get_metadata_from_cache()
         self._meta.update(new_meta)
 
-    def _unpack_from_cache_file_to_install_fld(self):
+    def _unpack_from_cache_file_to_staging_fld(self):
+        "Returns staging folder (temporary directory object) holding the unpacked plugin"
 
         if not self._is_in_cache():
             raise QgistValueError(tr('file is not in cache'))
 
-        install_fld = os.path.join(get_home_python_path(), 'plugins')
+        install_fld = self._get_install_fld()
 
-        if not os.path.exists(install_fld):
-            raise QgistValueError(tr('default QGIS plugin installation path does not exist'))
-        if not os.path.isdir(install_fld):
-            raise QgistValueError(tr('default QGIS plugin installation path exists but is no directory'))
-        if not os.access(install_fld, os.W_OK | os.R_OK):
-            raise QgistValueError(tr('default QGIS plugin installation path is not writeable and/or readable'))
-        if self._id in os.listdir(install_fld):
-            raise QgistValueError(tr('file or directory with identical name already in default QGIS plugin installation path'))
-
-        with tempfile.TemporaryDirectory() as tmp_fld:
+        staging = tempfile.TemporaryDirectory( # next to target: same file system, hidden from plugin search
+            prefix = f'.{self._id:s}-', suffix = '.staging', dir = install_fld,
+            )
+        try:
             self._cache.extract(
                 self._meta['file_name'].value,
-                tmp_fld,
+                staging.name,
                 password = None, # TODO
+                members = ( # only the plugin, see _check_file_in_cache
+                    name for name in self._cache.get_file_entries(self._meta['file_name'].value)
+                    if name.startswith(f'{self._id:s}/')
+                    ),
                 )
-            plugin_tmp_fld = os.path.join(tmp_fld, self._id)
-            if not self.is_python_plugin_dir(plugin_tmp_fld):
+            if not self.is_python_plugin_dir(os.path.join(staging.name, self._id)):
                 raise QgistValueError(tr('unpacked plugin zip file folder is no valid plugin'))
-            try:
-                shutil.move(
-                    src = plugin_tmp_fld,
-                    dst = install_fld,
-                    copy_function = shutil.copy, # allow to succeed if filesystem metadata can not be copied
-                    )
-            except Exception as e:
-                raise QgistValueError(tr('Moving unpacked plugin to default QGIS plugin installation path failed'), e)
+        except Exception:
+            staging.cleanup()
+            raise
+
+        return staging
 
+    def _move_from_staging_fld_to_install_fld(self):
+
+        if self._staging is None:
+            raise QgistValueError(tr('release is not staged'))
+
+        install_fld = self._get_install_fld()
         path = os.path.join(install_fld, self._id)
+
+        if os.path.lexists(path):
+            raise QgistValueError(tr('file or directory with identical name already in default QGIS plugin installation path'))
+
+        try:
+            os.rename(os.path.join(self._staging.name, self._id), path) # atomic, nothing is copied
+        except Exception as e:
+            raise QgistValueError(tr('Moving unpacked plugin to default QGIS plugin installation path failed'), e)
+
         if not self.is_python_plugin_dir(path):
             raise QgistValueError(tr('Moved unpacked plugin is no valid plugin'))
         self._path = path
+        self._cache.mark_installed(self._meta['file_name'].value, path) # never evicted while installed
 
         self.fix_meta_by_inspecting_plugindir(
             meta = self._meta,
             path = self._path,
             )
 
+    @staticmethod
+    def _get_install_fld():
+
+        install_fld = os.path.join(get_home_python_path(), 'plugins')
+
+        if not os.path.exists(install_fld):
+            raise QgistValueError(tr('default QGIS plugin installation path does not exist'))
+        if not os.path.isdir(install_fld):
+            raise QgistValueError(tr('default QGIS plugin installation path exists but is no directory'))
+        if not os.access(install_fld, os.W_OK | os.R_OK):
+            raise QgistValueError(tr('default QGIS plugin installation path is not writeable and/or readable'))
+
+        return install_fld
+
     def _get_dependencies(self, fetch = False):
 
         if not isinstance(fetch, bool):
             raise QgistTypeError(tr('"fetch" must be a bool'))
-        if not self._is_in_cache() and not fetch:
+        if self._is_in_cache():
+            meta = self._get_metadata_from_cache()
+        elif not fetch:
             raise QgistValueError(tr('file is not in cache'))
+        else:
+            try:
+                meta = self._get_metadata_from_remote() # only metadata.txt, no download
+            except (QgistValueError, QgistRequestError): # remote ZIP-file can not be read partially (e.g. HTTP 416), download it
+                self._fetch_from_remote_to_cache_file()
+                meta = self._get_metadata_from_cache()
 
-        if not self._is_in_cache() and fetch:
-            self._fetch_from_remote_to_cache_file()
-
-        meta = self._get_metadata_from_cache()
         if not meta['plugin_dependencies'].value_set:
             return meta['plugin_dependencies'].default_value
         return (dep for dep in meta['plugin_dependencies'].value)
 
+    def _get_metadata_from_remote(self):
+
+        if not self._meta['download_url'].value_set:
+            raise QgistValueError(tr('"download_url" not set in meta data'))
+
+        new_meta_raw = get_remotezip(
+            self._meta['download_url'].value,
+            authcfg = None, # TODO
+            ).read(f'{self._id:s}/metadata.txt')
+        try:
+            new_meta_raw = new_meta_raw.decode('utf-8')
+        except UnicodeDecodeError as e:
+            raise QgistMetaTxtError(tr('failed to decode metadata.txt') + ': ' + str(e))
+
+        return dtype_metadata_class.from_metadatatxt(self._id, new_meta_raw)
+
     def _get_metadata_from_cache(self):
 
         if not self._is_in_cache():
             raise QgistValueError(tr('file is not in cache'))
 
-        new_meta_raw = self._cache.get_file_entry(
-            filename = self._meta['file_name'].value,
-            entryname = f'{self._id:s}/metadata.txt',
-            password = None, # TODO
-            ).decode('utf-8')
-        return dtype_metadata_class.from_metadatatxt(self._id, new_meta_raw)
+        index = self._cache.get_file_index(self._meta['file_name'].value) # metadata.txt parsed when cached
+        if self._id in index['metadata_errors'].keys():
+            raise QgistMetaTxtError(index['metadata_errors'][self._id])
+        if self._id not in index['metadata'].keys():
+            raise QgistValueError(tr('Plugin metadata file missing'))
+        return dtype_metadata_class(id = self._id, **index['metadata'][self._id])
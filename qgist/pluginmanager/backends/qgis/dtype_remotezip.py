@@ -0,0 +1,295 @@
+# -*- coding: utf-8 -*-
+
+"""
+
+QGIST PLUGIN MANAGER
+QGIS Plugin for Managing QGIS Plugins
+https://github.com/qgist/pluginmanager
+
+    qgist/pluginmanager/backends/qgis/dtype_remotezip.py: Remote ZIP-file, read via HTTP range requests
+
+    Copyright (C) 2017-2020 QGIST project <info@qgist.org>
+
+<LICENSE_BLOCK>
+The contents of this file are subject to the GNU General Public License
+Version 2 ("GPL" or "License"). You may not use this file except in
+compliance with the License. You may obtain a copy of the License at
+https://www.gnu.org/licenses/old-licenses/gpl-2.0.txt
+https://github.com/qgist/pluginmanager/blob/master/LICENSE
+
+Software distributed under the License is distributed on an "AS IS" basis,
+WITHOUT WARRANTY OF ANY KIND, either express or implied. See the License for the
+specific language governing rights and limitations under the License.
+</LICENSE_BLOCK>
+
+"""
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# IMPORT (Python Standard Library)
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+import collections
+import struct
+import threading
+import zlib
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# IMPORT (Internal)
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+from .abc import remotezip_abc
+from .dtype_store import get_store
+
+from ...const import (
+    REPO_REMOTEZIP_MEMO_BYTES,
+    REPO_REMOTEZIP_MEMO_MAX,
+    REPO_REMOTEZIP_TAIL,
+    )
+
+from ....error import (
+    QgistTypeError,
+    QgistValueError,
+    )
+from ....qgis_api import request_data_range
+from ....util import tr
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# CONST
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+_EOCD = struct.Struct('<4s4H2LH') # end of central directory record
+_EOCD_SIGNATURE = b'PK\x05\x06'
+_CENTRAL = struct.Struct('<4s6H3L5H2L') # central directory file header
+_CENTRAL_SIGNATURE = b'PK\x01\x02'
+_LOCAL = struct.Struct('<4s5H3L2H') # local file header
+_LOCAL_SIGNATURE = b'PK\x03\x04'
+_LOCAL_SLACK = 256 # extra field of local header may be longer than the one in central directory
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# CLASS
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+class dtype_remotezip_class(remotezip_abc):
+    """
+    Read-only view of a remote ZIP-file, based on HTTP range requests
+
+    Only the end of the file (end of central directory record, usually along with the central
+    directory itself) and the members actually read are fetched - typically two small requests
+    for reading one member. Whatever was fetched is kept. Servers without support for ranges
+    send the entire file at once, which is then handed to the store (i.e. it is not downloaded
+    again for installation) and read from there instead of being kept in memory. ZIP64 and encrypted members are
+    not supported, neither are compression methods other than stored and deflated.
+
+    Mutable.
+    """
+
+    def __init__(self, url, authcfg = None):
+
+        if not isinstance(url, str):
+            raise QgistTypeError(tr('"url" must be a str'))
+        if not isinstance(authcfg, str) and authcfg is not None:
+            raise QgistTypeError(tr('"authcfg" must be a str or None'))
+
+        self._url = url
+        self._authcfg = authcfg
+        self._lock = threading.Lock()
+
+        self._entries = None # by name: dict, from central directory, fetched on first use
+        self._members = {} # by name: bytes, uncompressed
+        self._nbytes = 0 # held in memory: central directory and members
+        self._digest = None # of entire file in store, if server did not support ranges
+
+    def __repr__(self):
+
+        return (
+            '<remotezip '
+            f'url="{self._url:s}" '
+            f'entries={"?" if self._entries is None else str(len(self._entries)):s} '
+            f'read={len(self._members):d}'
+            '>'
+            )
+
+    def __contains__(self, name):
+
+        return name in self._get_entries().keys()
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# PROPERTIES
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+    @property
+    def nbytes(self):
+        "Approximate memory held (bytes)"
+        return self._nbytes
+
+    @property
+    def url(self):
+        return self._url
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# API
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+    def namelist(self):
+        "Names of members, like `zipfile.ZipFile.namelist`"
+
+        return list(self._get_entries().keys())
+
+    def read(self, name):
+        "Reads member (bytes, uncompressed) - fetches only its local header and compressed data"
+
+        if not isinstance(name, str):
+            raise QgistTypeError(tr('"name" must be a str'))
+
+        with self._lock:
+            if name in self._members.keys():
+                return self._members[name]
+
+        entries = self._get_entries()
+        if name not in entries.keys():
+            raise QgistValueError(tr('"name" is not present in ZIP-file'))
+        entry = entries[name]
+        if entry['flags'] & 0x1:
+            raise QgistValueError(tr('member of ZIP-file is encrypted'))
+        if entry['method'] not in (zlib.DEFLATED, 0): # deflated, stored
+            raise QgistValueError(tr('compression method of member of ZIP-file is not supported'))
+
+        raw = self._get_range(entry['offset'], _LOCAL.size + entry['header'] + entry['size'] + _LOCAL_SLACK)
+        if len(raw) < _LOCAL.size or raw[:4] != _LOCAL_SIGNATURE:
+            raise QgistValueError(tr('local header of member of ZIP-file is broken'))
+        fields = _LOCAL.unpack(raw[:_LOCAL.size])
+        start = _LOCAL.size + fields[9] + fields[10] # name and extra field
+        if len(raw) < start + entry['size']: # local extra field even longer than expected
+            raw += self._get_range(entry['offset'] + len(raw), start + entry['size'] - len(raw))
+        compressed = raw[start:start + entry['size']]
+
+        try:
+            data = zlib.decompressobj(-zlib.MAX_WBITS).decompress(compressed) if entry['method'] == zlib.DEFLATED else compressed
+        except zlib.error as e:
+            raise QgistValueError(tr('failed to decompress member of ZIP-file'), e)
+        if zlib.crc32(data) != entry['crc']:
+            raise QgistValueError(tr('member of ZIP-file is broken (CRC mismatch)'))
+
+        with self._lock:
+            if name not in self._members.keys():
+                self._members[name] = data
+                self._nbytes += len(data)
+        _trim_remotezips()
+
+        return data
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# HELPER
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+    def _get_entries(self):
+        "Central directory, fetched once: End of file first, remainder of central directory if required"
+
+        with self._lock:
+            if self._entries is not None:
+                return self._entries
+
+        tail, tail_offset, total, _ = request_data_range(self._url, self._authcfg, start = None, length = REPO_REMOTEZIP_TAIL)
+        if tail_offset == 0 and total == len(tail): # entire file
+            self._hand_to_store(tail)
+        elif total is not None and tail_offset + len(tail) != total: # e.g. range transparently decoded
+            raise QgistValueError(tr('range of remote ZIP-file does not match request'))
+
+        position = tail.rfind(_EOCD_SIGNATURE)
+        if position == -1 or len(tail) - position < _EOCD.size:
+            raise QgistValueError(tr('end of central directory of ZIP-file not found'))
+        _, _, _, _, count, size, offset, _ = _EOCD.unpack(tail[position:position + _EOCD.size])
+        if count == 0xFFFF or size == 0xFFFFFFFF or offset == 0xFFFFFFFF:
+            raise QgistValueError(tr('ZIP64 is not supported for remote ZIP-files'))
+
+        start = tail_offset + position - size # actual start of central directory
+        concat = start - offset # bytes prepended to ZIP-file, if any
+        if concat < 0:
+            raise QgistValueError(tr('central directory of ZIP-file is broken'))
+        if start >= tail_offset:
+            central = tail[start - tail_offset:position]
+        else:
+            central = self._get_range(start, size)
+
+        entries = collections.OrderedDict()
+        position = 0
+        for _ in range(count):
+            if central[position:position + 4] != _CENTRAL_SIGNATURE:
+                raise QgistValueError(tr('central directory of ZIP-file is broken'))
+            fields = _CENTRAL.unpack(central[position:position + _CENTRAL.size])
+            name_length, extra_length, comment_length = fields[10:13]
+            name = central[position + _CENTRAL.size:position + _CENTRAL.size + name_length]
+            entries[name.decode('utf-8' if fields[3] & 0x800 else 'cp437')] = {
+                'flags': fields[3],
+                'method': fields[4],
+                'crc': fields[7],
+                'size': fields[8], # compressed
+                'header': name_length + extra_length, # expected variable length of local header
+                'offset': fields[16] + concat, # of local header
+                }
+            position += _CENTRAL.size + name_length + extra_length + comment_length
+
+        with self._lock:
+            if self._entries is None:
+                self._entries = entries
+                self._nbytes += len(central)
+
+        return self._entries
+
+    def _get_range(self, start, length):
+
+        with self._lock:
+            digest = self._digest
+        if digest is not None:
+            with open(get_store()[digest], 'rb') as f: # raises QgistValueError if evicted meanwhile
+                f.seek(start)
+                return f.read(length)
+
+        content, offset, total, _ = request_data_range(self._url, self._authcfg, start = start, length = length)
+        if offset != start or len(content) > length: # ranges ignored, entire file sent
+            self._hand_to_store(content)
+            return content[start:start + length]
+        if total is not None and len(content) != min(length, total - start): # e.g. range transparently decoded
+            raise QgistValueError(tr('range of remote ZIP-file does not match request'))
+
+        return content
+
+    def _hand_to_store(self, data):
+        "Entire file was sent - keep it in the store (verified there), not in memory"
+
+        digest = get_store().add_data(data, url = self._url) # raises QgistValueError if broken
+
+        with self._lock:
+            self._digest = digest
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# ROUTINES
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+_remotezips = collections.OrderedDict() # by URL: remote ZIP-file, most recently used last
+_remotezips_lock = threading.Lock()
+
+def get_remotezip(url, authcfg = None):
+    "Remote ZIP-file by URL - recently used ones are kept, including whatever was read from them"
+
+    with _remotezips_lock:
+        if url in _remotezips.keys():
+            _remotezips.move_to_end(url)
+            return _remotezips[url]
+
+    remotezip = dtype_remotezip_class(url, authcfg) # does check url and authcfg
+
+    with _remotezips_lock:
+        remotezip = _remotezips.setdefault(url, remotezip)
+    _trim_remotezips()
+
+    return remotezip
+
+def _trim_remotezips():
+    "Forget least recently used remote ZIP-files beyond limits of count and memory"
+
+    with _remotezips_lock:
+        nbytes = sum((remotezip.nbytes for remotezip in _remotezips.values()))
+        while len(_remotezips) > REPO_REMOTEZIP_MEMO_MAX or (len(_remotezips) > 1 and nbytes > REPO_REMOTEZIP_MEMO_BYTES):
+            _, remotezip = _remotezips.popitem(last = False)
+            nbytes -= remotezip.nbytes
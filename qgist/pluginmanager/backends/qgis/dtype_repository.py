@@ -29,23 +29,22 @@ specific language governing rights and limitations under the License.
 # +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
 
 import glob
-import multiprocessing
 import os
 import random
 import sys
-
-# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
-# IMPORT (External)
-# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
-
-import xmltodict
+import time
+from xml.etree import ElementTree
 
 # +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
 # IMPORT (Internal)
 # +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
 
-from .dtype_cache import dtype_cache_class
+from .dtype_cache import (
+    dtype_cache_class,
+    evict_cache,
+    )
 from .dtype_pluginrelease import dtype_pluginrelease_class
+from .dtype_store import flush_store
 
 from ...abc import (
     settings_abc,
@@ -54,13 +53,26 @@ from ...abc import (
 from ...const import (
     CONFIG_DELIMITER,
     CONFIG_GROUP_QGISLEGACY_REPOS,
+    CONFIG_KEY_CACHE_MAX_AGE,
+    CONFIG_KEY_CACHE_MAX_BYTES,
+    CONFIG_KEY_VALIDATORS,
+    REPO_CACHE_MAX_AGE,
+    REPO_CACHE_MAX_BYTES,
     REPO_DEFAULT_URL,
     REPO_BACKEND_QGISLEGACYPYTHON,
+    REPO_FETCH_MAX_INFLIGHT,
+    REPO_HISTORY_TTL,
     )
 from ...error import (
     QgistNotADirectoryError,
     )
+from ...dtype_changeset import (
+    dtype_changeset_class,
+    get_release_key,
+    )
+from ...dtype_fetcher import dtype_fetcher_class
 from ...dtype_plugin import dtype_plugin_class
+from ...dtype_refresh_error import dtype_refresh_error_class
 from ...dtype_repository_base import dtype_repository_base_class
 from ...dtype_version import dtype_version_class
 
@@ -72,7 +84,7 @@ from ....qgis_api import (
     get_home_python_path,
     get_python_path,
     get_qgis_version,
-    request_data,
+    request_data_conditional,
     )
 from ....util import tr
 
@@ -93,7 +105,8 @@ class dtype_repository_class(dtype_repository_base_class):
     _repo_type = REPO_BACKEND_QGISLEGACYPYTHON
 
     def __init__(self,
-        valid = None, authcfg = None, url = None,
+        valid = None, authcfg = None, url = None, max_inflight = REPO_FETCH_MAX_INFLIGHT, validators = None,
+        lazy_history = True,
         **kwargs,
         ):
 
@@ -117,10 +130,24 @@ class dtype_repository_class(dtype_repository_base_class):
             raise QgistTypeError(tr('"url" must be str'))
         if not url.lower().startswith('http://') and not url.lower().startswith('https://'):
             raise QgistValueError(tr(''))
+        if not isinstance(max_inflight, int):
+            raise QgistTypeError(tr('"max_inflight" must be int'))
+        if max_inflight < 1:
+            raise QgistValueError(tr('"max_inflight" must be greater than zero'))
+        if validators is None:
+            validators = dict()
+        if not isinstance(validators, dict):
+            raise QgistTypeError(tr('"validators" must be a dict or None'))
+        if not isinstance(lazy_history, bool):
+            raise QgistTypeError(tr('"lazy_history" must be bool'))
 
         self._valid = valid # TODO Appears to be meaningless!?
         self._url = url
         self._authcfg = authcfg
+        self._max_inflight = max_inflight # concurrent requests during refresh
+        self._validators = validators # by URL: ETag & Last-Modified of cached responses
+        self._lazy_history = lazy_history # only fetch newest releases on refresh, older ones on demand
+        self._history = {} # by plugin id: time of last fetch of full release history (lazy mode)
 
 # +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
 # SPECIAL PROPERTIES (ONLY THIS REPO TYPE)
@@ -138,59 +165,167 @@ class dtype_repository_class(dtype_repository_base_class):
 # MANAGEMENT & EXPORT
 # +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
 
-    def refresh(self):
-        "Refresh index, i.e. reload metadata from remote source"
+    def fetch(self):
+        "Network part of refresh - must not change the repository, returns result for `apply_fetched`"
 
-        qgis_version = dtype_version_class.from_qgisversion(get_qgis_version(), fix_plugin_compatibility = True)
+        qgis_version = self._get_qgis_version()
 
-        raw_xml_bytes = request_data(
-            f'{self._url:s}?qgis={qgis_version[0]:s}.{qgis_version[1]:s}',
-            self._authcfg,
+        cached_releases = {} # by plugin id
+        with self._lock: # snapshot, repo may change while the network is busy
+            for release in self._plugin_releases:
+                cached_releases.setdefault(release.id, []).append(release)
+            validators = dict(self._validators) if len(cached_releases) != 0 else dict() # validators without cache are useless
+        new_validators = {}
+
+        url = f'{self._url:s}?qgis={qgis_version[0]:s}.{qgis_version[1]:s}'
+        latest_releases, new_validators[url] = self._request_releases( # newest compatible release per plugin
+            (url, self._authcfg, validators.get(url, None))
             )
-        raw_xml = raw_xml_bytes.decode('utf-8')
-        raw_xml = raw_xml.replace('& ', '&amp; ') # From plugin installer: Fix lonely ampersands in metadata
-        tree = xmltodict.parse(raw_xml)
-        release_id_set = {
-            dtype_pluginrelease_class.from_xmldict(dict(release_dict)).id
-            for release_dict in tree['plugins']['pyqgis_plugin']
-            }
+        if latest_releases is None: # not modified, cache is up to date
+            return None
 
-        dict_release_list_list = []
-        with multiprocessing.Pool(processes = multiprocessing.cpu_count()) as p:
-            dict_release_list_list.extend(p.imap_unordered(
-                func = self._request_dict_releases_per_plugin,
-                iterable = (
-                    (f'{self._url:s}?package_name={release_id:s}&qgis={qgis_version[0]:s}.{qgis_version[1]:s}', self._authcfg)
-                    for release_id in release_id_set
-                    ),
-                chunksize = 50,
-                ))
+        if self._lazy_history: # older releases are fetched on demand, see `get_release_history`
+            return latest_releases, new_validators, True, []
 
+        package_urls = {
+            release.id: self._get_package_url(release.id, qgis_version)
+            for release in latest_releases
+            }
+        release_list_list = dtype_fetcher_class(max_inflight = self._max_inflight).map(
+            func = self._request_releases,
+            params = (
+                (
+                    package_url,
+                    self._authcfg,
+                    validators.get(package_url, None) if release_id in cached_releases.keys() else None,
+                    )
+                for release_id, package_url in package_urls.items()
+                ),
+            return_exceptions = True, # partial results
+            )
+
+        latest_releases = {release.id: release for release in latest_releases}
         all_releases = []
-        for dict_release_list in dict_release_list_list:
-            all_releases.extend((
-                dtype_pluginrelease_class.from_xmldict(dict_release)
-                for dict_release in dict_release_list
-                ))
+        errors = []
+        for release_id, result in zip(package_urls.keys(), release_list_list):
+            if isinstance(result, Exception): # failed, fall back to what is known
+                errors.append(dtype_refresh_error_class(self._id, package_urls[release_id], result))
+                if package_urls[release_id] in validators.keys():
+                    new_validators[package_urls[release_id]] = validators[package_urls[release_id]]
+                all_releases.extend(cached_releases.get(release_id, [latest_releases[release_id]]))
+                continue
+            release_list, new_validators[package_urls[release_id]] = result
+            if release_list is None: # not modified, re-use cached releases
+                all_releases.extend(cached_releases[release_id])
+                continue
+            all_releases.extend(release_list)
+
+        return all_releases, new_validators, False, errors
+
+    def apply_fetched(self, fetched):
+        "Local part of refresh - diffs fetched releases against known ones, applies and persists the changes only"
+
+        if fetched is None: # not modified
+            self._refresh_errors = tuple()
+            return dtype_changeset_class()
+
+        releases, validators, clear_history, errors = fetched
+        self._refresh_errors = tuple(errors)
+        changeset = dtype_changeset_class.from_releases(
+            self._get_releases_to_diff(releases) if clear_history else self._plugin_releases, releases
+            )
+
+        if clear_history: # lazy mode: keep histories and their validators, unless their plugin has changed
+            for plugin_id in changeset.plugin_ids:
+                self._history.pop(plugin_id, None)
+            self._validators.update(validators)
+        else:
+            self._validators = validators
+
+        self.apply_changeset(changeset)
+        self._config_group[CONFIG_KEY_VALIDATORS] = self._config_group.settings.dump(self._validators)
+
+        return changeset
+
+    def get_release_history(self, plugin_id):
+        "Returns all releases of one plugin - in lazy mode, the history is fetched on demand"
+
+        if not isinstance(plugin_id, str):
+            raise QgistTypeError(tr('"plugin_id" must be a str.'))
+        if len(plugin_id) == 0:
+            raise QgistValueError(tr('"plugin_id" must not be empty.'))
+
+        if self._lazy_history and not self._history_is_fresh(plugin_id):
+            self._fetch_release_history(plugin_id)
+
+        return super().get_release_history(plugin_id)
+
+    def _fetch_release_history(self, plugin_id):
+        "Fetches all releases of one plugin and adds those which are not yet known"
+
+        with self._lock: # snapshot, repo may change while the network is busy
+            if not any((release.id == plugin_id for release in self._plugin_releases)): # plugin not in this repo
+                return
+            url = self._get_package_url(plugin_id, self._get_qgis_version())
+            validator = self._validators.get(url, None) if plugin_id in self._history.keys() else None # full history known?
+
+        release_list, validator = self._request_releases((url, self._authcfg, validator))
+
+        with self._lock:
+            if release_list is not None:
+                known_keys = {get_release_key(release) for release in self._plugin_releases if release.id == plugin_id}
+                self.apply_changeset(dtype_changeset_class(added = [
+                    release for release in release_list
+                    if get_release_key(release) not in known_keys
+                    ]))
+            self._validators[url] = validator
+            self._config_group[CONFIG_KEY_VALIDATORS] = self._config_group.settings.dump(self._validators)
+            self._history[plugin_id] = time.monotonic()
+
+    def _get_releases_to_diff(self, latest_releases):
+        """
+        Known releases minus older releases of plugins which are listed in `latest_releases` (lazy mode).
+        Older releases were fetched on demand, their absence from the latest list does not mean they were removed.
+        """
+
+        latest_keys = {get_release_key(release) for release in latest_releases}
+        latest_ids = {release.id for release in latest_releases}
+
+        return [
+            release for release in self._plugin_releases
+            if release.id not in latest_ids or get_release_key(release) in latest_keys
+            ]
+
+    def _history_is_fresh(self, plugin_id):
 
-        self._plugin_releases.clear()
-        self._plugin_releases.extend(all_releases)
-        self._make_releases_aware_of_repo()
-        self.to_config()
+        if plugin_id not in self._history.keys():
+            return False
+
+        return (time.monotonic() - self._history[plugin_id]) < REPO_HISTORY_TTL
+
+    def _get_package_url(self, plugin_id, qgis_version):
+
+        return f'{self._url:s}?package_name={plugin_id:s}&qgis={qgis_version[0]:s}.{qgis_version[1]:s}'
+
+    @staticmethod
+    def _get_qgis_version():
+
+        return dtype_version_class.from_qgisversion(get_qgis_version(), fix_plugin_compatibility = True)
 
     @staticmethod
-    def _request_dict_releases_per_plugin(param):
+    def _request_releases(param):
+        "Returns tuple of list of releases (None if not modified) and new validators"
 
-        url, authcfg = param
-        raw_xml_bytes = request_data(url, authcfg)
+        url, authcfg, validators = param
+        raw_xml_bytes, new_validators = request_data_conditional(url, authcfg, validators)
 
-        raw_xml = raw_xml_bytes.decode('utf-8')
-        raw_xml = raw_xml.replace('& ', '&amp; ') # From plugin installer: Fix lonely ampersands in metadata
-        tree = xmltodict.parse(raw_xml)
+        if raw_xml_bytes is None: # not modified
+            return None, new_validators
 
-        if isinstance(tree['plugins']['pyqgis_plugin'], list): # more than one
-            return [dict(release_dict) for release_dict in tree['plugins']['pyqgis_plugin']]
-        return [dict(tree['plugins']['pyqgis_plugin'])] # just one
+        return [
+            dtype_pluginrelease_class.from_xmldict(release_dict)
+            for release_dict in _iter_xml_release_dicts(_iter_chunks(raw_xml_bytes))
+            ], new_validators
 
     # def remove(self):
     #     "Run cleanup actions e.g. in config before repo is removed"
@@ -205,6 +340,9 @@ class dtype_repository_class(dtype_repository_base_class):
         self._config_group['valid'] = self._config_group.settings.bool_to_str(self._valid, style = 'truefalse')
         self._config_group['authcfg'] = self._authcfg
         self._config_group['url'] = self._url
+        self._config_group['max_inflight'] = str(self._max_inflight)
+        self._config_group[CONFIG_KEY_VALIDATORS] = self._config_group.settings.dump(self._validators)
+        self._config_group['lazy_history'] = self._config_group.settings.bool_to_str(self._lazy_history, style = 'truefalse')
 
 # +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
 # CLASS-LEVEL API
@@ -258,6 +396,37 @@ class dtype_repository_class(dtype_repository_base_class):
 
         return (plugin for plugin in plugins)
 
+    @classmethod
+    def maintain(cls, config):
+        "Evicts plugin ZIP-files from cache by age and total size"
+
+        if not isinstance(config, settings_abc):
+            raise QgistTypeError(tr('"config" must be a "dtype_settings_class" object.'))
+
+        evict_cache(
+            max_bytes = int(config.get(CONFIG_KEY_CACHE_MAX_BYTES, str(REPO_CACHE_MAX_BYTES))),
+            max_age = float(config.get(CONFIG_KEY_CACHE_MAX_AGE, str(REPO_CACHE_MAX_AGE))),
+            )
+
+    @classmethod
+    def shutdown(cls):
+        "Saves pending times of last use of cached plugin ZIP-files"
+
+        flush_store()
+
+    @staticmethod
+    def _get_validators_from_config(config_group):
+
+        validators_compressed = config_group.get(CONFIG_KEY_VALIDATORS, None)
+        if validators_compressed is None:
+            return dict()
+
+        validators = config_group.settings.load(validators_compressed)
+        if not isinstance(validators, dict):
+            raise QgistTypeError(tr('Inconsistent validators: Expected a dict'))
+
+        return validators
+
 # +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
 # PRE-CONSTRUCTOR
 # +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
@@ -307,6 +476,9 @@ class dtype_repository_class(dtype_repository_base_class):
             valid = config_group.settings.str_to_bool(config_group.get('valid', 'true')),
             authcfg = config_group['authcfg'],
             url = config_group['url'],
+            max_inflight = int(config_group.get('max_inflight', str(REPO_FETCH_MAX_INFLIGHT))),
+            validators = cls._get_validators_from_config(config_group),
+            lazy_history = config_group.settings.str_to_bool(config_group.get('lazy_history', 'true')),
             )
 
 # +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
@@ -333,3 +505,52 @@ def _get_extra_plugins_paths():
         checked_paths.append(path)
 
     return (path for path in checked_paths)
+
+def _iter_chunks(raw_bytes, chunk_size = 2 ** 16):
+    "Slices bytes into chunks without copying all of it at once"
+
+    view = memoryview(raw_bytes)
+    for offset in range(0, len(view), chunk_size):
+        yield bytes(view[offset:(offset + chunk_size)])
+
+def _iter_fixed_chunks(chunks):
+    "From plugin installer: Fix lonely ampersands in metadata - on the fly, chunk by chunk"
+
+    carry = b''
+    for chunk in chunks:
+        chunk = carry + chunk
+        carry = b''
+        if chunk.endswith(b'&'): # ampersand might be lonely, depends on next chunk
+            chunk, carry = chunk[:-1], b'&'
+        yield chunk.replace(b'& ', b'&amp; ')
+    if len(carry) != 0:
+        yield carry
+
+def _iter_xml_release_dicts(chunks):
+    """
+    Streaming parser for plugins.xml, yields one dict per `pyqgis_plugin` element.
+    Dicts look like xmltodict's output: attributes prefixed by `@`, stripped texts, None for empty elements.
+    Only the current element is held in memory, not the entire tree.
+    """
+
+    parser = ElementTree.XMLPullParser(events = ('start', 'end'))
+    root = None
+
+    for chunk in _iter_fixed_chunks(chunks):
+        parser.feed(chunk)
+        for event, element in parser.read_events():
+            if event == 'start':
+                if root is None:
+                    root = element
+                continue
+            if element.tag != 'pyqgis_plugin':
+                continue
+            release_dict = {f'@{key:s}': value for key, value in element.attrib.items()}
+            release_dict.update({
+                child.tag: (child.text.strip() or None) if child.text is not None else None
+                for child in element
+                })
+            root.clear() # drop everything parsed so far
+            yield release_dict
+
+    parser.close()
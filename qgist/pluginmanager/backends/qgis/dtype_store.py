@@ -0,0 +1,612 @@
+# -*- coding: utf-8 -*-
+
+"""
+
+QGIST PLUGIN MANAGER
+QGIS Plugin for Managing QGIS Plugins
+https://github.com/qgist/pluginmanager
+
+    qgist/pluginmanager/backends/qgis/dtype_store.py: Content-addressed store for plugin ZIP-files
+
+    Copyright (C) 2017-2020 QGIST project <info@qgist.org>
+
+<LICENSE_BLOCK>
+The contents of this file are subject to the GNU General Public License
+Version 2 ("GPL" or "License"). You may not use this file except in
+compliance with the License. You may obtain a copy of the License at
+https://www.gnu.org/licenses/old-licenses/gpl-2.0.txt
+https://github.com/qgist/pluginmanager/blob/master/LICENSE
+
+Software distributed under the License is distributed on an "AS IS" basis,
+WITHOUT WARRANTY OF ANY KIND, either express or implied. See the License for the
+specific language governing rights and limitations under the License.
+</LICENSE_BLOCK>
+
+"""
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# IMPORT (Python Standard Library)
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+import atexit
+import hashlib
+import json
+import os
+import glob
+import tempfile
+import threading
+import time
+import zipfile
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# IMPORT (Internal)
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+from .abc import store_abc
+
+from ...const import (
+    REPO_CACHE_FLD,
+    REPO_CACHE_ZIPINDEX_VERSION,
+    REPO_CACHE_DOWNLOAD_CHUNK,
+    REPO_CACHE_MANIFEST_FN,
+    REPO_CACHE_PARTIAL_MAX_AGE,
+    REPO_CACHE_STORE_FLD,
+    REPO_CACHE_URLS_FN,
+    )
+
+from ....config import get_config_path
+from ...dtype_metadata import dtype_metadata_class
+from ...error import QgistMetaTxtError
+
+from ....error import (
+    QgistTypeError,
+    QgistValueError,
+    )
+from ....qgis_api import request_data_range
+from ....util import tr
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# CLASS
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+class dtype_store_class(store_abc):
+    """
+    Content-addressed store of plugin ZIP-files, shared by all repositories
+
+    Files are keyed by the SHA-256 digest of their content. The digest is computed and the
+    content is verified to be a ZIP-file exactly once, while writing. Identical files from
+    different repositories are stored once. Download URLs are remembered, i.e. a file offered
+    by more than one repository under the same URL is downloaded once.
+
+    A manifest keeps size and time of last use of every file as well as the files of installed
+    releases. Files are evicted by age and size (least recently used first), installed ones never.
+
+    Downloads are streamed into partial files in chunks and resumed if interrupted.
+
+    Every file comes with an index (see `get_zipfile_index`), built in the same pass as its
+    digest and kept next to it, i.e. looking into a file does not require to open it.
+
+    Mutable.
+    """
+
+    def __init__(self, path):
+
+        if not isinstance(path, str):
+            raise QgistTypeError(tr('"path" must be a str'))
+        if len(path) == 0:
+            raise QgistValueError(tr('"path" must not be empty'))
+
+        os.makedirs(path, exist_ok = True)
+
+        self._path = path
+        self._lock = threading.RLock() # downloads may run concurrently
+        self._urls = read_json(os.path.join(path, REPO_CACHE_URLS_FN), {})
+
+        manifest = read_json(os.path.join(path, REPO_CACHE_MANIFEST_FN), None) # one file, no scan
+        self._files = {} if manifest is None else manifest['files'] # by digest: [size in bytes, time of last use]
+        self._installed = {} if manifest is None else manifest['installed'] # by installation path: digest
+        self._dirty = False # unsaved times of last use
+        self._indices = {} # by digest: index of ZIP-file, loaded on first use
+        self._downloads = {} # by partial file name: lock, one download per URL at a time
+        if manifest is None: # first use of store or manifest lost
+            self.reconcile()
+
+    def __repr__(self):
+
+        return f'<store path="{self._path:s}" files={len(self._files):d} size={self.size:d}>'
+
+    def __contains__(self, digest):
+
+        return digest in self._files.keys()
+
+    def __getitem__(self, digest):
+        "Translates digest to full path of file - counts as use of file"
+
+        path = self._get_path(digest)
+
+        with self._lock:
+            if digest not in self._files.keys():
+                raise QgistValueError(tr('"digest" is not present in store'))
+            if not os.path.isfile(path): # removed by someone else
+                self._files.pop(digest)
+                self._save_manifest()
+                raise QgistValueError(tr('"digest" is not present in store'))
+            self._files[digest][1] = time.time()
+            self._dirty = True # saved with next change or eviction
+
+        return path
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# PROPERTIES
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+    @property
+    def installed(self):
+        "Digests of files of installed releases"
+        with self._lock:
+            return frozenset(self._installed.values())
+
+    @property
+    def path(self):
+        return self._path
+
+    @property
+    def size(self):
+        "Total size of files in bytes"
+        with self._lock:
+            return sum((size for size, _ in self._files.values()))
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# API
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+    def add_data(self, data, url = None):
+        "Add ZIP-file from bytes - returns its digest"
+
+        if not isinstance(data, bytes):
+            raise QgistTypeError(tr('"data" must be bytes'))
+
+        def _write(f, digest):
+            f.write(data)
+            digest.update(data)
+
+        return self._add(_write, url)
+
+    def add_file(self, path, url = None):
+        "Add ZIP-file from local path (copied) - returns its digest"
+
+        if not isinstance(path, str):
+            raise QgistTypeError(tr('"path" must be a str'))
+        if not os.path.isfile(path):
+            raise QgistValueError(tr('"path" must point to an existing file'))
+
+        def _copy(f, digest):
+            with open(path, 'rb') as source:
+                for chunk in iter(lambda: source.read(2 ** 20), b''):
+                    f.write(chunk)
+                    digest.update(chunk)
+
+        return self._add(_copy, url)
+
+    def add_url(self, url, authcfg = None, chunk_size = REPO_CACHE_DOWNLOAD_CHUNK):
+        """
+        Download ZIP-file from URL in chunks (HTTP range requests) - returns its digest
+
+        Chunks are appended to a partial file, i.e. memory use is bounded by `chunk_size`.
+        An interrupted download is resumed by the next attempt for the same URL, provided
+        the server sent a validator (ETag, Last-Modified) for If-Range.
+        """
+
+        if not isinstance(url, str):
+            raise QgistTypeError(tr('"url" must be a str'))
+        if not isinstance(chunk_size, int):
+            raise QgistTypeError(tr('"chunk_size" must be an int'))
+        if chunk_size < 1:
+            raise QgistValueError(tr('"chunk_size" must be greater than zero'))
+
+        name = hashlib.sha256(url.encode('utf-8')).hexdigest()[:16]
+        part_path = os.path.join(self._path, f'{name:s}.part')
+        state_path = f'{part_path:s}.json'
+
+        with self._lock:
+            download_lock = self._downloads.setdefault(name, threading.Lock())
+
+        with download_lock:
+
+            digest = self.get_digest(url)
+            if digest is not None: # downloaded by another thread meanwhile
+                return digest
+
+            state = read_json(state_path, {})
+            if state.get('url', None) == url and os.path.isfile(part_path):
+                offset, total, validator = os.path.getsize(part_path), state.get('total', None), state.get('validator', None)
+            else:
+                offset, total, validator = 0, None, None
+
+            try:
+                with open(part_path, 'r+b' if offset > 0 else 'wb') as f:
+                    f.seek(offset)
+                    while total is None or offset < total:
+                        content, start, total_new, validator_new = request_data_range(
+                            url, authcfg, start = offset, length = chunk_size, validator = validator,
+                            )
+                        if start != offset: # entire content sent: no ranges or changed meanwhile
+                            f.seek(start)
+                            f.truncate()
+                        f.write(content)
+                        offset = start + len(content)
+                        if validator_new is not None and (total_new, validator_new) != (total, validator):
+                            f.flush()
+                            write_json(state_path, {'url': url, 'total': total_new, 'validator': validator_new})
+                        total, validator = total_new, validator_new
+                        if total is None and len(content) < chunk_size: # size unknown, last chunk
+                            break
+                        if len(content) == 0:
+                            break
+            except OSError as e: # partial file kept for next attempt
+                raise QgistValueError(tr('failed to write file to store'), e)
+
+            try:
+                digest = hashlib.sha256()
+                with open(part_path, 'rb') as f:
+                    for chunk in iter(lambda: f.read(2 ** 20), b''):
+                        digest.update(chunk)
+            except OSError as e:
+                raise QgistValueError(tr('failed to read file'), e)
+
+            _unlink_silently(state_path)
+            return self._publish(part_path, digest.hexdigest(), url)
+
+    def get_index(self, digest):
+        "Index of file (see `get_zipfile_index`) - built once if missing, e.g. for files of older versions"
+
+        path = self._get_path(digest)
+        if digest not in self:
+            raise QgistValueError(tr('"digest" is not present in store'))
+
+        with self._lock:
+            index = self._indices.get(digest, None)
+        if index is not None:
+            return index
+
+        index = read_json(path[:-len('.zip')] + '.json', None)
+        if index is None or index.get('version', None) != REPO_CACHE_ZIPINDEX_VERSION:
+            index = get_zipfile_index(path)
+            write_json(path[:-len('.zip')] + '.json', index)
+
+        with self._lock:
+            self._indices[digest] = index
+
+        return index
+
+    def get_digest(self, url):
+        "Digest of file previously downloaded from URL - None if unknown or no longer present"
+
+        if not isinstance(url, str):
+            raise QgistTypeError(tr('"url" must be a str'))
+
+        with self._lock:
+            digest = self._urls.get(url, None)
+        if digest is None or digest not in self:
+            return None
+
+        return digest
+
+    def evict(self, max_bytes, max_age):
+        """
+        Removes files unused for more than `max_age` seconds, then least recently used files
+        until the total size is below `max_bytes` - files of installed releases are kept
+
+        Returns list of removed digests.
+        """
+
+        if not isinstance(max_bytes, int):
+            raise QgistTypeError(tr('"max_bytes" must be an int'))
+        if not isinstance(max_age, (int, float)):
+            raise QgistTypeError(tr('"max_age" must be a number'))
+        if max_bytes < 0 or max_age < 0:
+            raise QgistValueError(tr('"max_bytes" and "max_age" must not be negative'))
+
+        now = time.time()
+        evicted = []
+
+        with self._lock:
+
+            self._installed = { # releases may have been removed behind our back
+                path: digest for path, digest in self._installed.items()
+                if os.path.isdir(path)
+                }
+            installed = set(self._installed.values())
+
+            size = sum((size for size, _ in self._files.values()))
+            for last_use, digest in sorted(
+                (last_use, digest) for digest, (_, last_use) in self._files.items()
+                if digest not in installed
+                ): # least recently used first
+                if now - last_use <= max_age and size <= max_bytes:
+                    break
+                try:
+                    os.unlink(self._get_path(digest))
+                except FileNotFoundError:
+                    pass
+                except OSError:
+                    continue # e.g. opened by someone else (Windows)
+                size -= self._files.pop(digest)[0]
+                self._remove_index(digest)
+                evicted.append(digest)
+
+            self._forget_urls(evicted)
+            self._save_manifest()
+
+        return evicted
+
+    def flush(self):
+        "Save pending times of last use"
+
+        with self._lock:
+            if self._dirty:
+                self._save_manifest()
+
+    def mark_installed(self, digest, path):
+        "File was installed to path, i.e. it must not be evicted"
+
+        if not isinstance(path, str):
+            raise QgistTypeError(tr('"path" must be a str'))
+        if digest not in self:
+            raise QgistValueError(tr('"digest" is not present in store'))
+
+        with self._lock:
+            self._installed[os.path.abspath(path)] = digest
+            self._save_manifest()
+
+    def mark_uninstalled(self, path):
+        "Release installed to path was removed - its file may be evicted again"
+
+        if not isinstance(path, str):
+            raise QgistTypeError(tr('"path" must be a str'))
+
+        with self._lock:
+            if self._installed.pop(os.path.abspath(path), None) is not None:
+                self._save_manifest()
+
+    def reconcile(self):
+        """
+        Brings manifest in line with files actually present, e.g. after a crash or manual
+        intervention - scans the store, i.e. slow, meant for background. Files unknown to the
+        manifest count as used now. Returns number of corrected entries.
+        """
+
+        now = time.time()
+
+        with self._lock:
+            present = {
+                os.path.basename(path)[:-len('.zip')]: path
+                for path in glob.iglob(os.path.join(self._path, '*', '*.zip'))
+                }
+            missing = self._files.keys() - present.keys()
+            unknown = present.keys() - self._files.keys()
+            for digest in missing:
+                self._files.pop(digest)
+                self._remove_index(digest)
+            for digest in unknown:
+                try:
+                    self._files[digest] = [os.path.getsize(present[digest]), now]
+                except OSError:
+                    pass # removed meanwhile
+            self._forget_urls(missing)
+            self._save_manifest()
+
+            for path in glob.iglob(os.path.join(self._path, '*', '*.json')): # indices of files removed by others
+                if os.path.basename(path)[:-len('.json')] not in self._files.keys():
+                    _unlink_silently(path)
+
+        for pattern in ('*.tmp', '*.part', '*.part.json'): # abandoned downloads
+            for path in glob.iglob(os.path.join(self._path, pattern)):
+                try:
+                    if now - os.path.getmtime(path) > REPO_CACHE_PARTIAL_MAX_AGE:
+                        os.unlink(path)
+                except OSError:
+                    pass
+
+        return len(missing) + len(unknown)
+
+    def remove(self, digest):
+        "Remove file from store - files of installed releases are kept, see `installed`"
+
+        path = self._get_path(digest)
+        if digest not in self:
+            raise QgistValueError(tr('"digest" is not present in store'))
+
+        with self._lock:
+            if digest in self._installed.values():
+                raise QgistValueError(tr('"digest" belongs to an installed release'))
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+            except Exception as e:
+                raise QgistValueError(tr('failed to remove file from store'), e)
+            self._files.pop(digest)
+            self._remove_index(digest)
+            self._forget_urls((digest,))
+            self._save_manifest()
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# HELPER
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+    def _add(self, writer, url):
+        "Writes into temporary file while hashing, then publishes it"
+
+        if not isinstance(url, str) and url is not None:
+            raise QgistTypeError(tr('"url" must be a str or None'))
+
+        digest = hashlib.sha256()
+        fd, tmp_path = tempfile.mkstemp(dir = self._path, suffix = '.tmp') # same file system, rename is atomic
+
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                writer(f, digest)
+        except Exception as e:
+            _unlink_silently(tmp_path)
+            raise QgistValueError(tr('failed to write file to store'), e)
+
+        return self._publish(tmp_path, digest.hexdigest(), url)
+
+    def _publish(self, tmp_path, digest, url):
+        "Verifies temporary file, then publishes it by atomic rename - temporary file is gone afterwards"
+
+        try:
+            index = get_zipfile_index(tmp_path) # does verify ZIP-file
+            path = self._get_path(digest)
+            os.makedirs(os.path.dirname(path), exist_ok = True)
+            size = os.path.getsize(tmp_path)
+            write_json(path[:-len('.zip')] + '.json', index) # index first: a present file always has one
+            if os.path.isfile(path): # identical content is already present
+                os.unlink(tmp_path)
+            else:
+                os.replace(tmp_path, path)
+        except QgistValueError:
+            _unlink_silently(tmp_path)
+            raise
+        except Exception as e:
+            _unlink_silently(tmp_path)
+            raise QgistValueError(tr('failed to write file to store'), e)
+
+        with self._lock:
+            self._files[digest] = [size, time.time()]
+            self._indices[digest] = index
+            self._save_manifest()
+            if url is not None and self._urls.get(url, None) != digest:
+                self._urls[url] = digest
+                write_json(os.path.join(self._path, REPO_CACHE_URLS_FN), self._urls)
+
+        return digest
+
+    def _forget_urls(self, digests):
+
+        digests = set(digests)
+        urls = [url for url, digest in self._urls.items() if digest in digests]
+        if len(urls) == 0:
+            return
+
+        for url in urls:
+            self._urls.pop(url)
+        write_json(os.path.join(self._path, REPO_CACHE_URLS_FN), self._urls)
+
+    def _get_path(self, digest):
+
+        if not isinstance(digest, str):
+            raise QgistTypeError(tr('"digest" must be a str'))
+        if len(digest) != 64:
+            raise QgistValueError(tr('"digest" must be a SHA-256 hex digest'))
+
+        return os.path.join(self._path, digest[:2], f'{digest:s}.zip')
+
+    def _remove_index(self, digest):
+
+        self._indices.pop(digest, None)
+        _unlink_silently(self._get_path(digest)[:-len('.zip')] + '.json')
+
+    def _save_manifest(self):
+
+        write_json(os.path.join(self._path, REPO_CACHE_MANIFEST_FN), {
+            'files': self._files,
+            'installed': self._installed,
+            })
+        self._dirty = False
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# ROUTINES
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+_store = None
+_store_lock = threading.Lock()
+
+def get_store():
+    "Store shared by all repositories, created on first use"
+
+    global _store
+
+    with _store_lock:
+        if _store is None:
+            _store = dtype_store_class(os.path.join(get_config_path(), REPO_CACHE_FLD, REPO_CACHE_STORE_FLD))
+
+    return _store
+
+def flush_store():
+    "Saves pending times of last use of store, if it was used - e.g. on unload or exit"
+
+    with _store_lock:
+        store = _store
+    if store is not None:
+        store.flush()
+
+atexit.register(flush_store)
+
+def get_zipfile_index(path):
+    """
+    Reads central directory and metadata.txt files of ZIP-file in one pass. Returns dict with
+    namelist, top-level directories, top-level directories containing `__init__.py` and
+    `metadata.txt` respectively, parsed meta data fields and parser errors by top-level directory.
+    """
+
+    index = {
+        'version': REPO_CACHE_ZIPINDEX_VERSION,
+        'namelist': [],
+        'top_dirs': [],
+        'init_py': [],
+        'metadata_txt': [],
+        'metadata': {}, # by top-level directory: dict of fields
+        'metadata_errors': {}, # by top-level directory: message
+        }
+
+    try:
+        with zipfile.ZipFile(path, 'r') as f:
+            index['namelist'] = f.namelist()
+            names = set(index['namelist'])
+            index['top_dirs'] = [name[:-1] for name in index['namelist'] if name.count('/') == 1 and name.endswith('/')]
+            for top_dir in index['top_dirs']:
+                if f'{top_dir:s}/__init__.py' in names:
+                    index['init_py'].append(top_dir)
+                if f'{top_dir:s}/metadata.txt' not in names:
+                    continue
+                index['metadata_txt'].append(top_dir)
+                try:
+                    index['metadata'][top_dir] = dtype_metadata_class.get_fields_from_metadatatxt(
+                        f.read(f'{top_dir:s}/metadata.txt').decode('utf-8')
+                        )
+                except (QgistMetaTxtError, UnicodeDecodeError, RuntimeError, zipfile.BadZipFile) as e: # RuntimeError: encrypted
+                    index['metadata_errors'][top_dir] = str(e)
+    except (zipfile.BadZipFile, OSError) as e:
+        raise QgistValueError(tr('based on its content, file appears to be no (readable) ZIP-file'), e)
+
+    return index
+
+def read_json(path, default):
+    "Reads JSON file - returns default if it does not exist or is broken"
+
+    try:
+        with open(path, 'r', encoding = 'utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return default
+
+def write_json(path, data):
+    "Writes JSON file atomically: temporary file in same folder, then rename"
+
+    fd, tmp_path = tempfile.mkstemp(dir = os.path.dirname(path), suffix = '.tmp')
+    try:
+        with os.fdopen(fd, 'w', encoding = 'utf-8') as f:
+            json.dump(data, f)
+        os.replace(tmp_path, path)
+    except Exception as e:
+        _unlink_silently(tmp_path)
+        raise QgistValueError(tr('failed to write file'), e)
+
+def _unlink_silently(path):
+
+    try:
+        os.unlink(path)
+    except OSError:
+        pass
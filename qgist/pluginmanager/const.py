@@ -40,8 +40,17 @@ CONFIG_DELIMITER = '/'
 
 CONFIG_KEY_ALLOW_DEPRECATED = 'app/plugin_installer/allowDeprecated' # TODO
 CONFIG_KEY_ALLOW_EXPERIMENTAL = 'app/plugin_installer/allowExperimental' # TODO
+CONFIG_KEY_REDIRECTS = 'app/pluginmanager/redirects' # permanent HTTP redirects
+CONFIG_KEY_CACHE_MAX_AGE = 'app/pluginmanager/cache_max_age' # seconds since last use of a ZIP-file
+CONFIG_KEY_CACHE_MAX_BYTES = 'app/pluginmanager/cache_max_bytes' # total size of ZIP-file store
 
 CONFIG_KEY_CACHE = 'cache'
+CONFIG_KEY_CACHE_JOURNAL = 'cache_journal'
+CONFIG_KEY_LAST_REFRESH = 'last_refresh'
+CONFIG_KEY_MANIFEST = 'manifest'
+CONFIG_KEY_REFRESH_INTERVAL = 'refresh_interval'
+CONFIG_KEY_REFRESH_TIMEOUT = 'refresh_timeout'
+CONFIG_KEY_VALIDATORS = 'validators'
 
 CONFIG_GROUP_MANAGER_REPOS = 'app/pluginmanager/repositories' # TODO
 CONFIG_GROUP_QGISLEGACY_REPOS = 'app/plugin_repositories' # TODO
@@ -73,7 +82,32 @@ QGSSETTINGS_SPEC = {
 REPO_DEFAULT_URL = 'https://plugins.qgis.org/plugins/plugins.xml'
 REPO_BACKEND_QGISLEGACYPYTHON = 'qgis'
 REPO_BACKEND_QGISLEGACYCPP = 'cpp'
+REPO_BACKEND_FOLDER = 'folder'
+REPO_CACHE_DOWNLOAD_CHUNK = 4 * 2 ** 20 # bytes per HTTP range request when downloading ZIP-files
 REPO_CACHE_FLD = 'pluginmanager_cache'
+REPO_CACHE_INDEX_FN = 'index.json' # per repository: file names to digests
+REPO_CACHE_MAINTENANCE_INTERVAL = 3600 # seconds between two background evictions
+REPO_CACHE_MANIFEST_FN = 'manifest.json' # sizes and access times of ZIP-files, installed ZIP-files
+REPO_CACHE_MAX_AGE = 90 * 86400 # default seconds since last use until a ZIP-file is evicted
+REPO_CACHE_MAX_BYTES = 512 * 2 ** 20 # default total size of ZIP-file store
+REPO_CACHE_PARTIAL_MAX_AGE = 86400 # seconds until an interrupted download is abandoned
+REPO_CACHE_STORE_FLD = 'store' # content-addressed ZIP-files, shared by all repositories
+REPO_CACHE_URLS_FN = 'urls.json' # download URLs to digests
+REPO_CACHE_ZIPINDEX_VERSION = 1 # format of index next to every ZIP-file in store
+REPO_CACHE_JOURNAL_MAX = 256 # releases in cache journal before it is merged into the cache
+REPO_REMOTEZIP_MEMO_BYTES = 2 ** 24 # bytes read from remote ZIP-files kept in memory, in total
+REPO_REMOTEZIP_MEMO_MAX = 256 # remote ZIP-files kept in memory, along with what was read from them
+REPO_REMOTEZIP_TAIL = 2 ** 16 + 22 # bytes fetched from end of remote ZIP-file: max. comment plus end of central directory
+REPO_FETCH_MAX_INFLIGHT = 16 # default number of concurrent requests per repository
+REPO_HISTORY_TTL = 3600 # seconds until release history of a plugin is fetched again (lazy mode)
+REPO_RELEASES_FLD = 'pluginmanager_releases' # per repository: releases and journal of changesets applied since
+REPO_RELEASES_VERSION = 2 # format of releases file
+REPO_REFRESH_INTERVAL = 86400 # default seconds between two background refreshes of a repository
+REPO_REFRESH_TIMEOUT = 120 # default seconds until the refresh of a repository is abandoned
+REPO_SCHEDULER_TICK = 60 # seconds between two checks for repositories due for refresh
+
+INSTALL_MAX_DOWNLOADS = 8 # concurrent downloads of bulk installation
+INSTALL_MAX_WORKERS = 4 # concurrent validation and unpacking of bulk installation
 
 # +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
 # VERSIONS
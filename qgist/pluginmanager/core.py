@@ -61,6 +61,7 @@ from ..const import (
     )
 from ..config import (
     config_class,
+    flush_configs,
     get_config_path,
     )
 from ..error import (
@@ -144,6 +145,8 @@ class pluginmanager:
 
         self._iface.pindex = self._index # TODO HACK for debugging in console
 
+        self._index.scheduler.start() # serves cached releases, refreshes repos in the background
+
         # self._ui_dict['action_manage'].triggered.connect(self._open_manager) # TODO
         self._ui_dict['action_manage'].setEnabled(True)
 
@@ -152,5 +155,13 @@ class pluginmanager:
         QGis Plugin Interface Routine
         """
 
+        stopped = True
+        if self._index is not None:
+            stopped = self._index.scheduler.stop(timeout = 1.0) # thread is a daemon, do not hold up QGIS
+            if stopped:
+                self._index.shutdown()
+        if stopped: # otherwise refresh is still writing - its configuration flushes itself (write-behind)
+            flush_configs() # plugin may be reloaded, i.e. QGIS does not exit
+
         for cleanup_action in self._ui_cleanup:
             cleanup_action()
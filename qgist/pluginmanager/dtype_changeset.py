@@ -0,0 +1,222 @@
+# -*- coding: utf-8 -*-
+
+"""
+
+QGIST PLUGIN MANAGER
+QGIS Plugin for Managing QGIS Plugins
+https://github.com/qgist/pluginmanager
+
+    qgist/pluginmanager/dtype_changeset.py: Changes between two sets of plugin releases
+
+    Copyright (C) 2017-2020 QGIST project <info@qgist.org>
+
+<LICENSE_BLOCK>
+The contents of this file are subject to the GNU General Public License
+Version 2 ("GPL" or "License"). You may not use this file except in
+compliance with the License. You may obtain a copy of the License at
+https://www.gnu.org/licenses/old-licenses/gpl-2.0.txt
+https://github.com/qgist/pluginmanager/blob/master/LICENSE
+
+Software distributed under the License is distributed on an "AS IS" basis,
+WITHOUT WARRANTY OF ANY KIND, either express or implied. See the License for the
+specific language governing rights and limitations under the License.
+</LICENSE_BLOCK>
+
+"""
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# IMPORT (Python Standard Library)
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+from typing import Generator, Iterator
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# IMPORT (Internal)
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+from .abc import (
+    changeset_abc,
+    pluginrelease_abc,
+    )
+
+from ..error import QgistTypeError
+from ..util import tr
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# CLASS
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+class dtype_changeset_class(changeset_abc):
+    """
+    Added, removed and changed plugin releases of one repository, keyed by plugin id and version
+
+    Changed releases are new objects replacing old ones with identical key but different meta data.
+
+    Immutable.
+    """
+
+    def __init__(self, added = None, removed = None, changed = None):
+
+        added, removed, changed = (
+            self._check_releases(name, releases)
+            for name, releases in (('added', added), ('removed', removed), ('changed', changed))
+            )
+
+        self._added = added
+        self._removed = removed
+        self._changed = changed
+
+    def __repr__(self):
+
+        return (
+            '<changeset '
+            f'added={len(self._added):d} '
+            f'removed={len(self._removed):d} '
+            f'changed={len(self._changed):d}'
+            '>'
+            )
+
+    def __len__(self):
+
+        return len(self._added) + len(self._removed) + len(self._changed)
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# PROPERTIES
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+    @property
+    def added(self):
+        return self._added
+
+    @property
+    def removed(self):
+        return self._removed
+
+    @property
+    def changed(self):
+        return self._changed
+
+    @property
+    def plugin_ids(self):
+        "Ids of all plugins affected by this changeset"
+        return frozenset((release.id for release in (*self._added, *self._removed, *self._changed)))
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# API
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+    def apply(self, releases):
+        "Returns new list of releases: Removed and changed ones dropped, new ones appended - untouched objects are kept"
+
+        if not isinstance(releases, list):
+            raise QgistTypeError(tr('"releases" must be a list.'))
+
+        if len(self) == 0:
+            return releases.copy()
+
+        drop = {get_release_key(release) for release in (*self._removed, *self._changed)}
+
+        return [
+            release for release in releases
+            if get_release_key(release) not in drop
+            ] + list(self._changed) + list(self._added)
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# EXPORT
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+    def as_config_decompressed(self):
+        "Export changeset to uncompressed configuration data (JSON-serializable dict), e.g. for a cache journal"
+
+        return {
+            'added': [release.as_config_decompressed() for release in self._added],
+            'removed': [list(get_release_key(release)) for release in self._removed],
+            'changed': [release.as_config_decompressed() for release in self._changed],
+            }
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# HELPER
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+    @staticmethod
+    def _check_releases(name, releases):
+
+        if releases is None:
+            return tuple()
+
+        if not any((isinstance(releases, dtype) for dtype in (Generator, Iterator, list, tuple))):
+            raise QgistTypeError(tr('"{NAME:s}" must be any of the following: list, tuple, generator, iterator.').format(NAME = name))
+        releases = tuple(releases)
+        if not all((isinstance(release, pluginrelease_abc) for release in releases)):
+            raise QgistTypeError(tr('All items in "{NAME:s}" must be plugin releases.').format(NAME = name))
+
+        return releases
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# PRE-CONSTRUCTOR
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+    @classmethod
+    def from_releases(cls, old_releases, new_releases):
+        """
+        Compares two sets of releases - releases present (as objects) in both are skipped cheaply,
+        others are compared by fingerprint, only releases without fingerprint are serialized for comparison
+        """
+
+        old_releases = {get_release_key(release): release for release in old_releases}
+        new_releases = {get_release_key(release): release for release in new_releases}
+
+        return cls(
+            added = [
+                release for key, release in new_releases.items()
+                if key not in old_releases.keys()
+                ],
+            removed = [
+                release for key, release in old_releases.items()
+                if key not in new_releases.keys()
+                ],
+            changed = [
+                release for key, release in new_releases.items()
+                if key in old_releases.keys()
+                and release is not old_releases[key]
+                and is_release_changed(old_releases[key], release)
+                ],
+            )
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# ROUTINES
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+def apply_changeset_config(releases_config, changeset_config):
+    "Replays exported changeset (`as_config_decompressed`) on a list of exported releases - returns new list"
+
+    if not isinstance(releases_config, list):
+        raise QgistTypeError(tr('"releases_config" must be a list.'))
+    if not isinstance(changeset_config, dict):
+        raise QgistTypeError(tr('"changeset_config" must be a dict.'))
+
+    drop = {tuple(key) for key in changeset_config['removed']}
+    drop.update((get_config_key(release_config) for release_config in changeset_config['changed']))
+
+    return [
+        release_config for release_config in releases_config
+        if get_config_key(release_config) not in drop
+        ] + changeset_config['changed'] + changeset_config['added']
+
+def is_release_changed(old_release, new_release):
+    "Compares releases with identical key by fingerprint - by exported meta data if any fingerprint is unknown"
+
+    if old_release.fingerprint is not None and new_release.fingerprint is not None:
+        return old_release.fingerprint != new_release.fingerprint
+
+    return old_release.meta.as_config_decompressed() != new_release.meta.as_config_decompressed()
+
+def get_config_key(release_config):
+    "Key of exported release (`as_config_decompressed`)"
+
+    return release_config['meta']['id'], release_config['meta']['version']
+
+def get_release_key(release):
+    "Key of release"
+
+    return release.id, release.version.original
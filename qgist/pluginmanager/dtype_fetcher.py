@@ -0,0 +1,226 @@
+# -*- coding: utf-8 -*-
+
+"""
+
+QGIST PLUGIN MANAGER
+QGIS Plugin for Managing QGIS Plugins
+https://github.com/qgist/pluginmanager
+
+    qgist/pluginmanager/dtype_fetcher.py: Concurrent fetching of remote resources
+
+    Copyright (C) 2017-2020 QGIST project <info@qgist.org>
+
+<LICENSE_BLOCK>
+The contents of this file are subject to the GNU General Public License
+Version 2 ("GPL" or "License"). You may not use this file except in
+compliance with the License. You may obtain a copy of the License at
+https://www.gnu.org/licenses/old-licenses/gpl-2.0.txt
+https://github.com/qgist/pluginmanager/blob/master/LICENSE
+
+Software distributed under the License is distributed on an "AS IS" basis,
+WITHOUT WARRANTY OF ANY KIND, either express or implied. See the License for the
+specific language governing rights and limitations under the License.
+</LICENSE_BLOCK>
+
+"""
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# IMPORT (Python Standard Library)
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+import asyncio
+from concurrent.futures import (
+    Executor,
+    Future,
+    )
+import threading
+from typing import Generator, Iterator
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# IMPORT (Internal)
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+from .abc import fetcher_abc
+from .const import REPO_FETCH_MAX_INFLIGHT
+
+from ..error import (
+    QgistTimeoutError,
+    QgistTypeError,
+    QgistValueError,
+    )
+from ..util import tr
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# CLASS
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+class dtype_fetcher_class(fetcher_abc):
+    """
+    Runs blocking jobs (e.g. HTTP requests) concurrently within the current process
+
+    An asyncio event loop schedules all jobs while a semaphore bounds the number of jobs in flight.
+    `QgsBlockingNetworkRequest` can not be awaited, so the blocking calls themselves are
+    handed to daemon threads, at most as many as jobs in flight - a job exceeding its timeout keeps
+    its slot until its thread is actually done. Nothing is forked, nothing is pickled.
+    Unlike the workers of a thread pool, daemon threads are not joined on exit: An interrupted
+    refresh never keeps QGIS from exiting.
+
+    Mutable.
+    """
+
+    def __init__(self, max_inflight = REPO_FETCH_MAX_INFLIGHT):
+
+        self._check_max_inflight(max_inflight)
+
+        self._max_inflight = max_inflight
+
+    def __repr__(self):
+
+        return f'<fetcher max_inflight={self._max_inflight:d}>'
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# PROPERTIES
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+    @property
+    def max_inflight(self):
+        return self._max_inflight
+    @max_inflight.setter
+    def max_inflight(self, value):
+        self._check_max_inflight(value)
+        self._max_inflight = value
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# API
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+    def map(self, func, params, timeouts = None, return_exceptions = False):
+        """
+        Calls func once per item in params, concurrently - returns list of results in order of params
+
+        `timeouts` is either None, a number (seconds) for all jobs or a list of numbers (or None), one per job.
+        A job exceeding its timeout raises `QgistTimeoutError` - its thread is abandoned, its result discarded.
+        If `return_exceptions` is True, exceptions are returned in place of results instead of being raised.
+        """
+
+        if not hasattr(func, '__call__'):
+            raise QgistTypeError(tr('"func" must be callable'))
+        if not any((isinstance(params, dtype) for dtype in (Generator, Iterator, list, tuple))):
+            raise QgistTypeError(tr('"params" must be any of the following: list, tuple, generator, iterator.'))
+        params = list(params)
+        if not isinstance(return_exceptions, bool):
+            raise QgistTypeError(tr('"return_exceptions" must be a bool'))
+        timeouts = self._check_timeouts(timeouts, len(params))
+
+        if len(params) == 0:
+            return []
+
+        loop = asyncio.new_event_loop() # private loop, works in any thread
+        executor = _daemon_executor_class()
+        try:
+            return loop.run_until_complete(self._map(loop, executor, func, params, timeouts, return_exceptions))
+        finally:
+            loop.close() # abandoned (timed out) jobs keep running in their threads, results are discarded
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# HELPER
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+    async def _map(self, loop, executor, func, params, timeouts, return_exceptions):
+
+        semaphore = asyncio.Semaphore(self._max_inflight)
+
+        async def _job(param, timeout):
+            await semaphore.acquire() # timeout starts once job is actually running
+            future = _wrap_future(loop, executor.submit(func, param))
+            try:
+                return await asyncio.wait_for(asyncio.shield(future), timeout)
+            except asyncio.TimeoutError:
+                raise QgistTimeoutError(tr('Job exceeded its timeout') + f': {timeout:.1f}s')
+            finally: # abandoned thread keeps its slot until it is actually done, i.e. `max_inflight` holds
+                future.add_done_callback(lambda _: semaphore.release())
+
+        return await asyncio.gather(
+            *(_job(param, timeout) for param, timeout in zip(params, timeouts)),
+            return_exceptions = return_exceptions,
+            )
+
+    @staticmethod
+    def _check_timeouts(timeouts, length):
+
+        if timeouts is None or isinstance(timeouts, (int, float)):
+            timeouts = [timeouts for _ in range(length)]
+        if not isinstance(timeouts, (list, tuple)):
+            raise QgistTypeError(tr('"timeouts" must be None, a number or a list or tuple'))
+        if len(timeouts) != length:
+            raise QgistValueError(tr('"timeouts" must have one item per item in "params"'))
+        if not all((timeout is None or isinstance(timeout, (int, float)) for timeout in timeouts)):
+            raise QgistTypeError(tr('All items in "timeouts" must be None or numbers'))
+        if any((timeout is not None and timeout <= 0 for timeout in timeouts)):
+            raise QgistValueError(tr('All items in "timeouts" must be greater than zero'))
+
+        return list(timeouts)
+
+    @staticmethod
+    def _check_max_inflight(max_inflight):
+
+        if not isinstance(max_inflight, int):
+            raise QgistTypeError(tr('"max_inflight" must be an int'))
+        if max_inflight < 1:
+            raise QgistValueError(tr('"max_inflight" must be greater than zero'))
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# CLASS: DAEMON EXECUTOR
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+class _daemon_executor_class(Executor):
+    """
+    Runs every job in a daemon thread of its own - the number of jobs is bounded by the caller
+
+    Mutable.
+    """
+
+    def submit(self, fn, *args, **kwargs):
+
+        future = Future()
+
+        def _run():
+            if not future.set_running_or_notify_cancel():
+                return
+            try:
+                result = fn(*args, **kwargs)
+            except BaseException as e:
+                future.set_exception(e)
+            else:
+                future.set_result(result)
+
+        threading.Thread(target = _run, name = 'qgist-pluginmanager-fetcher', daemon = True).start()
+
+        return future
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# ROUTINES
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+def _wrap_future(loop, concurrent_future):
+    "Like `asyncio.wrap_future`, but abandoned jobs finishing after the loop was closed are dropped silently"
+
+    future = loop.create_future()
+
+    def _set_state():
+        if future.done():
+            return
+        if concurrent_future.exception() is not None:
+            future.set_exception(concurrent_future.exception())
+        else:
+            future.set_result(concurrent_future.result())
+
+    def _done(_):
+        try:
+            loop.call_soon_threadsafe(_set_state)
+        except RuntimeError: # loop closed, job was abandoned
+            pass
+
+    concurrent_future.add_done_callback(_done)
+
+    return future
@@ -24,6 +24,12 @@ specific language governing rights and limitations under the License.
 
 """
 
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# IMPORT (Python Standard Library)
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+import threading
+
 # +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
 # IMPORT (Internal)
 # +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
@@ -38,6 +44,7 @@ from .const import (
     # CONFIG_GROUP_MANAGER_REPOS,
     CONFIG_KEY_ALLOW_DEPRECATED,
     CONFIG_KEY_ALLOW_EXPERIMENTAL,
+    CONFIG_KEY_REDIRECTS,
     REPO_BACKEND_QGISLEGACYCPP,
     REPO_BACKEND_QGISLEGACYPYTHON,
     REPO_DEFAULT_URL,
@@ -47,8 +54,12 @@ from .error import (
     QgistPluginIdCollisionError,
     QgistRepoError,
     )
+from .dtype_fetcher import dtype_fetcher_class
 from .dtype_imports import dtype_imports_class
+from .dtype_installer import dtype_installer_class
 from .dtype_plugin import dtype_plugin_class
+from .dtype_refresh_error import dtype_refresh_error_class
+from .dtype_scheduler import dtype_scheduler_class
 
 from ..error import (
     QgistIndexError,
@@ -56,8 +67,10 @@ from ..error import (
     QgistValueError,
     )
 from ..qgis_api import (
+    get_http_redirects,
     get_plugin_modules,
     get_plugin_module_names,
+    set_http_redirects,
     )
 from ..util import tr
 
@@ -80,6 +93,7 @@ class dtype_index_class(index_abc):
         self._config = config
         self._repos = [] # From high to low priority
         self._plugins = {} # Individual plugins, not their releases
+        self._lock = threading.RLock() # guards repos and plugins against background refresh
 
         # TODO <HACK>
         # remove this eventually - Plugin Manager should manage this on its own
@@ -105,8 +119,11 @@ class dtype_index_class(index_abc):
             config = self._config,
             )
 
+        self._redirects_from_config()
         self.rebuild()
 
+        self._scheduler = dtype_scheduler_class(index = self)
+
     def __repr__(self):
 
         return f'<index id={id(self):x} repos={len(self.repos):d} plugins={len(self.plugins):d}>'
@@ -123,6 +140,15 @@ class dtype_index_class(index_abc):
     def plugins(self):
         return self._plugins_wrapper
 
+    @property
+    def lock(self):
+        "Hold while iterating over repos or plugins if the scheduler is running"
+        return self._lock
+
+    @property
+    def scheduler(self):
+        return self._scheduler
+
 # +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
 # API
 # +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
@@ -130,28 +156,150 @@ class dtype_index_class(index_abc):
     def rebuild(self):
         "Rebuild index of repos and plugins"
 
-        self._repos.clear()
-        self._plugins.clear()
-        # TODO what about self._plugin_modules?
+        with self._lock:
 
-        self._add_installed_plugins()
-        self._add_configured_repos()
-        self._ensure_qgislegacypython_default_repo()
-        self._ensure_qgislegacycpp_repo()
+            self._config.invalidate_keys() # repos may have been configured elsewhere, e.g. by QGIS
+            self._repos.clear()
+            self._plugins.clear()
+            # TODO what about self._plugin_modules?
 
-    def refresh(self):
-        "Refresh (from remote) repos and plugins"
+            self._add_installed_plugins()
+            self._add_configured_repos()
+            self._ensure_qgislegacypython_default_repo()
+            self._ensure_qgislegacycpp_repo()
 
-        for repo in self._repos:
-            repo.refresh()
+    def refresh(self, due_only = False):
+        """
+        Refresh (from remote) repos and plugins - all or only those due according to their interval
+
+        Partial results are applied. Returns list of refresh errors (empty if everything went fine).
+        """
+
+        if not isinstance(due_only, bool):
+            raise QgistTypeError(tr('"due_only" must be a bool.'))
 
-        # TODO set last refresh to config
+        with self._lock:
+            repos = [repo for repo in self._repos if repo.refresh_due or not due_only]
 
-        self.reconnect()
+        if len(repos) == 0:
+            return []
+
+        fetched_list = dtype_fetcher_class(max_inflight = len(repos)).map( # network, without lock - concurrently
+            func = lambda repo: repo.fetch(), # cached releases remain available meanwhile
+            params = repos,
+            timeouts = [repo.refresh_timeout for repo in repos],
+            return_exceptions = True,
+            )
+
+        plugin_ids = set()
+        errors = []
+        with self._lock, self._config.batch(): # changes of all repos written at once
+            for repo, fetched in zip(repos, fetched_list): # merge in order of priority
+                if isinstance(fetched, Exception): # failed or timed out: keep cached releases, remains due
+                    errors.append(dtype_refresh_error_class(repo.id, None, fetched))
+                    continue
+                plugin_ids.update(repo.apply_fetched(fetched).plugin_ids)
+                errors.extend(repo.refresh_errors)
+                if len(repo.refresh_errors) == 0: # partially refreshed repos remain due
+                    repo.mark_refreshed()
+            self._reconnect_plugins(plugin_ids) # only plugins affected by changes
+            self._redirects_to_config()
+
+        return errors
+
+    def install(self, plugin_ids, progress = None, **kwargs):
+        """
+        Install (or upgrade) many plugins at once, newest release of the repository with highest priority
+        each (see `dtype_plugin_class.get_preferred_release`) - downloads concurrently, see `dtype_installer_class`.
+        `kwargs` are passed on to `dtype_plugin_class.install`.
+        Returns summary of installed and failed plugins.
+        """
+
+        return dtype_installer_class(index = self).run(plugin_ids, progress = progress, **kwargs)
+
+    def upgrade(self, progress = None):
+        "Upgrade all upgradable (and unprotected) plugins at once, see `install`"
+
+        with self._lock:
+            plugin_ids = [
+                plugin_id for plugin_id, plugin in self._plugins.items()
+                if plugin.upgradable and not plugin.protected
+                and plugin.get_preferred_release().version > plugin.installed_release.version # what `install` picks
+                ]
+
+        return self.install(plugin_ids, progress = progress, allow_update = True)
+
+    def maintain(self):
+        "Housekeeping of all repository types, e.g. cache eviction - slow, meant for background"
+
+        for repo_type in backends.keys():
+            self.repos.get_class(repo_type).maintain(self._config)
+
+    def shutdown(self):
+        "Persist pending state of all repository types, e.g. on unload"
+
+        for repo_type in backends.keys():
+            self.repos.get_class(repo_type).shutdown()
 
     def reconnect(self):
         "Should run once after every change of repositories (e.g. add, remove, change of priority)"
 
+        with self._lock:
+            self._reconnect()
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# HELPER
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+    def _redirects_from_config(self):
+        "Permanent HTTP redirects are shared by all repos (HTTP session)"
+
+        redirects = self._config.get(CONFIG_KEY_REDIRECTS, None)
+        if redirects is None:
+            return
+
+        set_http_redirects(self._config.load(redirects))
+
+    def _redirects_to_config(self):
+
+        redirects = get_http_redirects()
+        if len(redirects) == 0:
+            return
+
+        redirects_compressed = self._config.dump(redirects)
+        if redirects_compressed == self._config.get(CONFIG_KEY_REDIRECTS, None):
+            return
+
+        self._config[CONFIG_KEY_REDIRECTS] = redirects_compressed
+
+    def _reconnect_plugins(self, plugin_ids):
+        "Like `_reconnect`, but only for given plugins"
+
+        if len(plugin_ids) == 0:
+            return
+
+        for plugin_id in plugin_ids:
+            if plugin_id in self._plugins.keys():
+                self._plugins[plugin_id].clear_releases()
+
+        for repo in self._repos:
+            for release in sorted(
+                (release for release in repo.plugin_releases if release.id in plugin_ids),
+                key = lambda x: x.version,
+                ):
+                if release.id in self._plugins.keys():
+                    self._plugins[release.id].add_release(release)
+                else:
+                    self._plugins[release.id] = dtype_plugin_class.from_uninstalled_release(release)
+
+        for plugin_id in plugin_ids:
+            if plugin_id not in self._plugins.keys():
+                continue
+            if not self._plugins[plugin_id].installed and len(self._plugins[plugin_id]) == 0:
+                self._plugins.pop(plugin_id)
+
+    def _reconnect(self):
+
         for plugin in self._plugins.values():
             plugin.clear_releases()
 
@@ -170,10 +318,6 @@ class dtype_index_class(index_abc):
                 else:
                     self._plugins[release.id] = dtype_plugin_class.from_uninstalled_release(release)
 
-# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
-# HELPER
-# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
-
     def _add_installed_plugins(self):
         "Find installed plugins and add them"
 
@@ -300,6 +444,7 @@ class _repos_wrapper_class:
         if repo.id in self.keys():
             raise QgistValueError(tr('"repo" can not be added - its id is already in list'))
 
+        repo.lock = self._index.lock # background refresh reads repo state under lock
         self._repos.insert(0, repo) # Add to list at the end, i.e. with lowest priority
         self._index.reconnect()
 
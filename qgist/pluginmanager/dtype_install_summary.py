@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+
+"""
+
+QGIST PLUGIN MANAGER
+QGIS Plugin for Managing QGIS Plugins
+https://github.com/qgist/pluginmanager
+
+    qgist/pluginmanager/dtype_install_summary.py: Result of bulk installation
+
+    Copyright (C) 2017-2020 QGIST project <info@qgist.org>
+
+<LICENSE_BLOCK>
+The contents of this file are subject to the GNU General Public License
+Version 2 ("GPL" or "License"). You may not use this file except in
+compliance with the License. You may obtain a copy of the License at
+https://www.gnu.org/licenses/old-licenses/gpl-2.0.txt
+https://github.com/qgist/pluginmanager/blob/master/LICENSE
+
+Software distributed under the License is distributed on an "AS IS" basis,
+WITHOUT WARRANTY OF ANY KIND, either express or implied. See the License for the
+specific language governing rights and limitations under the License.
+</LICENSE_BLOCK>
+
+"""
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# IMPORT (Internal)
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+from .abc import install_summary_abc
+
+from ..error import QgistTypeError
+from ..util import tr
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# CLASS
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+class dtype_install_summary_class(install_summary_abc):
+    """
+    Outcome of a bulk installation: Installed plugins (in order) and failed plugins with their exceptions
+
+    Immutable.
+    """
+
+    def __init__(self, installed, failed):
+
+        if not isinstance(installed, (list, tuple)):
+            raise QgistTypeError(tr('"installed" must be a list or tuple.'))
+        if not all((isinstance(plugin_id, str) for plugin_id in installed)):
+            raise QgistTypeError(tr('All items in "installed" must be str.'))
+        if not isinstance(failed, dict):
+            raise QgistTypeError(tr('"failed" must be a dict.'))
+        if not all((isinstance(plugin_id, str) and isinstance(error, Exception) for plugin_id, error in failed.items())):
+            raise QgistTypeError(tr('"failed" must map str to exceptions.'))
+
+        self._installed = tuple(installed)
+        self._failed = failed.copy()
+
+    def __repr__(self):
+
+        return f'<install_summary installed={len(self._installed):d} failed={len(self._failed):d}>'
+
+    def __len__(self):
+
+        return len(self._installed) + len(self._failed)
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# PROPERTIES
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+    @property
+    def failed(self):
+        "By plugin id: exception"
+        return self._failed.copy()
+
+    @property
+    def installed(self):
+        "Plugin ids, in order of installation"
+        return self._installed
+
+    @property
+    def success(self):
+        return len(self._failed) == 0
@@ -0,0 +1,170 @@
+# -*- coding: utf-8 -*-
+
+"""
+
+QGIST PLUGIN MANAGER
+QGIS Plugin for Managing QGIS Plugins
+https://github.com/qgist/pluginmanager
+
+    qgist/pluginmanager/dtype_installer.py: Bulk installation of plugins
+
+    Copyright (C) 2017-2020 QGIST project <info@qgist.org>
+
+<LICENSE_BLOCK>
+The contents of this file are subject to the GNU General Public License
+Version 2 ("GPL" or "License"). You may not use this file except in
+compliance with the License. You may obtain a copy of the License at
+https://www.gnu.org/licenses/old-licenses/gpl-2.0.txt
+https://github.com/qgist/pluginmanager/blob/master/LICENSE
+
+Software distributed under the License is distributed on an "AS IS" basis,
+WITHOUT WARRANTY OF ANY KIND, either express or implied. See the License for the
+specific language governing rights and limitations under the License.
+</LICENSE_BLOCK>
+
+"""
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# IMPORT (Python Standard Library)
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+import threading
+from typing import Generator, Iterator
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# IMPORT (Internal)
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+from .abc import (
+    index_abc,
+    installer_abc,
+    )
+from .const import (
+    INSTALL_MAX_DOWNLOADS,
+    INSTALL_MAX_WORKERS,
+    )
+from .dtype_fetcher import dtype_fetcher_class
+from .dtype_install_summary import dtype_install_summary_class
+
+from ..error import (
+    QgistTypeError,
+    QgistValueError,
+    )
+from ..util import tr
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# CLASS
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+class dtype_installer_class(installer_abc):
+    """
+    Installs (or upgrades) many plugins of an index at once
+
+    Releases are downloaded concurrently. Each release is validated and unpacked into a staging
+    folder as soon as its download is complete, by at most `max_workers` jobs at a time.
+    Finally, in order of request and under the index lock, plugins are installed one after another,
+    i.e. staged releases are moved into the plugin folder. One failing plugin does not affect others.
+
+    `progress` is called with plugin id and stage ("downloaded", "staged", "installed", "failed")
+    from worker threads. Partial results are kept, a summary is returned.
+
+    Mutable.
+    """
+
+    def __init__(self, index, max_downloads = INSTALL_MAX_DOWNLOADS, max_workers = INSTALL_MAX_WORKERS):
+
+        if not isinstance(index, index_abc):
+            raise QgistTypeError(tr('"index" must be an index.'))
+        self._check_max('max_downloads', max_downloads)
+        self._check_max('max_workers', max_workers)
+
+        self._index = index
+        self._max_downloads = max_downloads
+        self._max_workers = max_workers
+
+    def __repr__(self):
+
+        return (
+            '<installer '
+            f'index={id(self._index):x} '
+            f'max_downloads={self._max_downloads:d} max_workers={self._max_workers:d}'
+            '>'
+            )
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# API
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+    def run(self, plugin_ids, progress = None, **kwargs):
+        "Install newest release of every plugin from its repository with highest priority - `kwargs` are passed on to `dtype_plugin_class.install`"
+
+        if not any((isinstance(plugin_ids, dtype) for dtype in (Generator, Iterator, list, tuple))):
+            raise QgistTypeError(tr('"plugin_ids" must be any of the following: list, tuple, generator, iterator.'))
+        plugin_ids = list(dict.fromkeys(plugin_ids)) # unique, keeps order
+        if not all((isinstance(plugin_id, str) for plugin_id in plugin_ids)):
+            raise QgistTypeError(tr('All items in "plugin_ids" must be str.'))
+        if not hasattr(progress, '__call__') and progress is not None:
+            raise QgistTypeError(tr('"progress" must be callable or None.'))
+
+        def _report(plugin_id, stage):
+            if progress is not None:
+                progress(plugin_id, stage)
+
+        failed = {}
+        jobs = [] # plugin id, plugin, release
+
+        with self._index.lock:
+            for plugin_id in plugin_ids:
+                try:
+                    plugin = self._index.plugins[plugin_id]
+                    jobs.append((plugin_id, plugin, plugin.get_release_to_install(
+                        release = plugin.get_preferred_release(), **kwargs, # repository priority applies
+                        )))
+                except Exception as e:
+                    failed[plugin_id] = e
+                    _report(plugin_id, 'failed')
+
+        staging = threading.BoundedSemaphore(self._max_workers)
+
+        def _prepare(job):
+            plugin_id, _, release = job
+            release.download() # network
+            _report(plugin_id, 'downloaded')
+            with staging: # disk and CPU
+                release.stage()
+            _report(plugin_id, 'staged')
+
+        results = dtype_fetcher_class(max_inflight = self._max_downloads).map(
+            func = _prepare,
+            params = jobs,
+            return_exceptions = True,
+            )
+
+        installed = []
+        with self._index.lock:
+            for (plugin_id, plugin, release), result in zip(jobs, results): # in order of request
+                try:
+                    if isinstance(result, Exception):
+                        raise result
+                    plugin.install(release, **kwargs) # publishes staged release
+                except Exception as e:
+                    release.unstage()
+                    failed[plugin_id] = e
+                    _report(plugin_id, 'failed')
+                    continue
+                installed.append(plugin_id)
+                _report(plugin_id, 'installed')
+
+        return dtype_install_summary_class(installed, failed)
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# HELPER
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+    @staticmethod
+    def _check_max(name, value):
+
+        if not isinstance(value, int):
+            raise QgistTypeError(tr('Value must be an int') + f': "{name:s}"')
+        if value < 1:
+            raise QgistValueError(tr('Value must be greater than zero') + f': "{name:s}"')
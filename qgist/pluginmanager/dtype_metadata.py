@@ -166,7 +166,7 @@ class dtype_metadata_class(metadata_abc):
 
     @classmethod
     def from_xmldict(cls, xml_dict):
-        "Fixes an XML dict from xmltodict and returns a meta data object"
+        "Fixes an (xmltodict-style) XML dict and returns a meta data object"
 
         if not isinstance(xml_dict, dict) and not isinstance(xml_dict, OrderedDict):
             raise QgistTypeError(tr('"name" must be a dict.'))
@@ -207,6 +207,12 @@ class dtype_metadata_class(metadata_abc):
     def from_metadatatxt(cls, plugin_id, metadatatxt_string):
         "Parses a metadata.txt string and returns a meta data object"
 
+        return cls(id = plugin_id, **cls.get_fields_from_metadatatxt(metadatatxt_string))
+
+    @staticmethod
+    def get_fields_from_metadatatxt(metadatatxt_string):
+        "Parses a metadata.txt string and returns the fields of its general section as a dict of str"
+
         cp = ConfigParser(
             interpolation = None, # TODO ok? Because of e.g. tuflow.3.0.4.zip (containing `%` in changelog)
             strict = False, # TODO ok? Because of e.g. Sentinel-2 Download 3.5 (field `email` twice)
@@ -227,4 +233,4 @@ class dtype_metadata_class(metadata_abc):
         except Exception as e:
             raise QgistMetaTxtError(tr('failed to convert section "general" from metadata.txt to dict') + ': ' + str(e))
 
-        return cls(id = plugin_id, **fields)
+        return fields
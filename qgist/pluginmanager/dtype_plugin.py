@@ -40,6 +40,7 @@ from .abc import (
     settings_abc,
     )
 from .backends import backends
+from .dtype_refresh_error import dtype_refresh_error_class
 from .error import (
     QgistNotAPluginDirectoryError,
     QgistIsInstalledError,
@@ -49,6 +50,8 @@ from .error import (
 
 from ..error import (
     QgistNotImplementedError,
+    QgistRequestError,
+    QgistTimeoutError,
     QgistTypeError,
     QgistValueError,
     )
@@ -113,7 +116,7 @@ class dtype_plugin_class(plugin_abc):
             f'active={"yes" if self._active else "no":s} '
             f'available_releases={len(self):d} '
             f'upgradable={"yes" if self.upgradable else "no":s} '
-            f'downgradable={"yes" if self.downgradable else "no":s} '
+            f'downgradable={"yes" if self._is_downgradable() else "no":s} '
             f'orphan={"yes" if self.orphan else "no":s} '
             f'deprecated={"yes" if self._deprecated else "no":s} '
             f'protected={"yes" if self._protected else "no":s}'
@@ -184,6 +187,7 @@ class dtype_plugin_class(plugin_abc):
 
     @property
     def available_releases(self):
+        "Known releases - older ones may require `fetch_release_history` first, this does not touch the network"
         return (release for release in self._available_releases)
 
     @property
@@ -199,14 +203,8 @@ class dtype_plugin_class(plugin_abc):
 
     @property
     def downgradable(self):
-        if not self.installed:
-            return False
-        if len(self._available_releases) == 0:
-            return False
-        return any((
-            available_release.version < self._installed_release.version
-            for available_release in self._available_releases
-            ))
+        "Based on known releases - older ones may require `fetch_release_history` first"
+        return self._is_downgradable()
 
     @property
     def orphan(self):
@@ -236,12 +234,57 @@ class dtype_plugin_class(plugin_abc):
         self._available_releases.append(new_release)
         self._update_deprecation()
 
+    def fetch_release_history(self):
+        """
+        Ask repositories of available releases for all releases, i.e. also for older ones - may block (network).
+        Repositories which can not be reached (e.g. offline) are skipped, their known releases remain.
+        Returns list of refresh errors (empty if everything went fine).
+        """
+
+        repos = []
+        for release in self._available_releases:
+            if release.repo is not None and not any((release.repo is repo for repo in repos)):
+                repos.append(release.repo)
+
+        errors = []
+        for repo in repos:
+            try:
+                history = list(repo.get_release_history(self._id))
+            except (QgistRequestError, QgistTimeoutError) as e: # incl. open circuit breaker
+                errors.append(dtype_refresh_error_class(repo.id, None, e))
+                continue
+            for release in history:
+                if release not in self:
+                    self._available_releases.append(release)
+
+        self._sort_releases(repos)
+        self._update_deprecation()
+
+        return errors
+
     def clear_releases(self):
         "Remove all uninstalled releases"
 
         self._available_releases.clear()
         self._update_deprecation()
 
+    def _sort_releases(self, repos):
+        "Restores order of available releases: by repo (in order of given repos), then by version"
+
+        order = {id(repo): index for index, repo in enumerate(repos)}
+        self._available_releases.sort(key = lambda release: (order.get(id(release.repo), len(order)), release.version))
+
+    def _is_downgradable(self):
+
+        if not self.installed:
+            return False
+        if len(self._available_releases) == 0:
+            return False
+        return any((
+            available_release.version < self._installed_release.version
+            for available_release in self._available_releases
+            ))
+
     def _update_deprecation(self):
         "Checks all releases for deprecated flag and taint entire plugin"
 
@@ -258,19 +301,34 @@ class dtype_plugin_class(plugin_abc):
 # INSTALL / UNINSTALL
 # +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
 
-    def install(self,
+    def get_preferred_release(self):
+        "Newest release of the repository with highest priority (not necessarily the newest release overall)"
+
+        if len(self._available_releases) == 0:
+            raise QgistValueError(tr('no release available'))
+
+        top_repo = self._available_releases[0].repo # sorted by repo priority, then version - see `_sort_releases`
+        return [
+            available_release for available_release in self._available_releases
+            if available_release.repo is top_repo
+            ][-1]
+
+    def get_release_to_install(self,
         release = None,
         allow_typechange = False,
         allow_sameversion = False, allow_downgrade = False, allow_update = True,
         ):
-        "Installs a plugin release"
-        # TODO Should allow dry runs
+        "Checks whether a release can be installed (see install) - returns release, changes nothing"
 
         if self._protected:
             raise QgistProtectedError(tr('this plugin is protected'))
 
         if release is None:
-            release = self._available_releases[-1] # take the newest from repo with highest priority
+            if len(self._available_releases) == 0:
+                raise QgistValueError(tr('no release available'))
+            release = max( # take the newest, from repo with highest priority if there is more than one
+                self._available_releases, key = lambda available_release: available_release.version,
+                )
 
         if not isinstance(release, pluginrelease_abc):
             raise QgistTypeError(tr('"release" must be a plugin release'))
@@ -288,20 +346,38 @@ class dtype_plugin_class(plugin_abc):
         if not isinstance(allow_update, bool):
             raise QgistTypeError(tr('"allow_update" must be bool'))
 
-        def _uninstall(allow_x, msg):
+        def _check_uninstall(allow_x, msg):
             if not allow_x:
                 raise QgistIsInstalledError(msg)
             if self._installed_release.repo_type != release.repo_type and not allow_typechange:
                 raise QgistIsInstalledError(tr('change of repo type not allowed'))
-            self.uninstall()
 
         if self.installed:
             if self._installed_release.version == release.version:
-                _uninstall(allow_sameversion, tr('plugin release is already installed'))
+                _check_uninstall(allow_sameversion, tr('plugin release is already installed'))
             elif self._installed_release.version > release.version:
-                _uninstall(allow_downgrade, tr('plugin would be downgraded'))
+                _check_uninstall(allow_downgrade, tr('plugin would be downgraded'))
             elif self._installed_release.version < release.version:
-                _uninstall(allow_update, tr('plugin would be updated'))
+                _check_uninstall(allow_update, tr('plugin would be updated'))
+
+        return release
+
+    def install(self,
+        release = None,
+        allow_typechange = False,
+        allow_sameversion = False, allow_downgrade = False, allow_update = True,
+        ):
+        "Installs a plugin release - a release staged beforehand is published right away"
+        # TODO Should allow dry runs
+
+        release = self.get_release_to_install(
+            release,
+            allow_typechange = allow_typechange,
+            allow_sameversion = allow_sameversion, allow_downgrade = allow_downgrade, allow_update = allow_update,
+            )
+
+        if self.installed:
+            self.uninstall()
 
         release.install()
         self._installed_release = release
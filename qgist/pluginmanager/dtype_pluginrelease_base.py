@@ -29,6 +29,7 @@ specific language governing rights and limitations under the License.
 # +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
 
 import ast
+import hashlib
 import os
 
 # +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
@@ -68,7 +69,7 @@ class dtype_pluginrelease_base_class(pluginrelease_abc):
     def __init__(self,
         plugin_id, version,
         has_processingprovider, has_serverfuncs, experimental, deprecated, installed,
-        meta, path = None,
+        meta, path = None, fingerprint = None,
         ):
 
         if not isinstance(plugin_id, str):
@@ -94,6 +95,8 @@ class dtype_pluginrelease_base_class(pluginrelease_abc):
         if isinstance(path, str):
             if not os.path.isdir(path):
                 raise QgistValueError(tr('If "path" is a str, it must exist'))
+        if not isinstance(fingerprint, str) and fingerprint is not None:
+            raise QgistTypeError(tr('"fingerprint" must be a str or None.'))
 
         self._id = plugin_id
         self._version = version
@@ -104,6 +107,7 @@ class dtype_pluginrelease_base_class(pluginrelease_abc):
         self._installed = installed
         self._meta = meta
         self._path = path # None if not locally installed
+        self._fingerprint = fingerprint # hash of source meta data (e.g. XML) captured at parse time, None if unknown
 
         self._repo = None
 
@@ -165,6 +169,10 @@ class dtype_pluginrelease_base_class(pluginrelease_abc):
     def version(self):
         return self._version
 
+    @property
+    def fingerprint(self):
+        return self._fingerprint
+
     @property
     def meta(self):
         return self._meta
@@ -191,7 +199,20 @@ class dtype_pluginrelease_base_class(pluginrelease_abc):
 # API
 # +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
 
+    def download(self):
+        "Fetch whatever installation requires from remote - thread-safe, may run concurrently"
+        pass
+
+    def stage(self):
+        "Prepare installation without touching installed plugins (e.g. validate, unpack) - may run concurrently"
+        pass
+
+    def unstage(self):
+        "Discard prepared installation, if any"
+        pass
+
     def install(self):
+        "Install release, i.e. stage it (if not yet staged) and publish it"
         raise QgistNotImplementedError()
 
     def uninstall(self):
@@ -288,9 +309,13 @@ class dtype_pluginrelease_base_class(pluginrelease_abc):
     def as_config_decompressed(self):
         "Export plugin release to uncompressed configuration data (JSON-serializable dict)"
 
-        return {
+        config_decompressed = {
             'meta': self._meta.as_config_decompressed(),
             }
+        if self._fingerprint is not None:
+            config_decompressed['fingerprint'] = self._fingerprint
+
+        return config_decompressed
 
 # +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
 # PRE-CONSTRUCTOR
@@ -319,6 +344,7 @@ class dtype_pluginrelease_base_class(pluginrelease_abc):
             deprecated = meta['deprecated'].value,
             installed = False,
             meta = meta,
+            fingerprint = config_decompressed.get('fingerprint', None), # not present in old caches
             )
 
     @classmethod
@@ -354,7 +380,7 @@ class dtype_pluginrelease_base_class(pluginrelease_abc):
 
     @classmethod
     def from_xmldict(cls, xml_dict):
-        "From XML meta data (parsed by xmltodict)"
+        "From XML meta data (parsed into a flat dict, xmltodict-style)"
 
         if not isinstance(xml_dict, dict):
             raise QgistTypeError(tr('"xml_dict" must be a dict'))
@@ -371,4 +397,7 @@ class dtype_pluginrelease_base_class(pluginrelease_abc):
             deprecated = meta['deprecated'].value,
             installed = False,
             meta = meta,
+            fingerprint = hashlib.blake2b( # XML values are str or None, i.e. repr is stable
+                repr(sorted(xml_dict.items())).encode('utf-8'), digest_size = 16,
+                ).hexdigest(),
             )
@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+
+"""
+
+QGIST PLUGIN MANAGER
+QGIS Plugin for Managing QGIS Plugins
+https://github.com/qgist/pluginmanager
+
+    qgist/pluginmanager/dtype_refresh_error.py: Error during refresh of a repository
+
+    Copyright (C) 2017-2020 QGIST project <info@qgist.org>
+
+<LICENSE_BLOCK>
+The contents of this file are subject to the GNU General Public License
+Version 2 ("GPL" or "License"). You may not use this file except in
+compliance with the License. You may obtain a copy of the License at
+https://www.gnu.org/licenses/old-licenses/gpl-2.0.txt
+https://github.com/qgist/pluginmanager/blob/master/LICENSE
+
+Software distributed under the License is distributed on an "AS IS" basis,
+WITHOUT WARRANTY OF ANY KIND, either express or implied. See the License for the
+specific language governing rights and limitations under the License.
+</LICENSE_BLOCK>
+
+"""
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# IMPORT (Internal)
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+from .abc import refresh_error_abc
+
+from ..error import (
+    QgistTypeError,
+    QgistValueError,
+    )
+from ..util import tr
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# CLASS
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+class dtype_refresh_error_class(refresh_error_abc):
+    """
+    One failure during refresh: Which repository, which URL (None if entire repository failed), which exception
+
+    Immutable.
+    """
+
+    def __init__(self, repo_id, url, error):
+
+        if not isinstance(repo_id, str):
+            raise QgistTypeError(tr('"repo_id" must be a str.'))
+        if len(repo_id) == 0:
+            raise QgistValueError(tr('"repo_id" must not be empty.'))
+        if not isinstance(url, str) and url is not None:
+            raise QgistTypeError(tr('"url" must be a str or None.'))
+        if not isinstance(error, Exception):
+            raise QgistTypeError(tr('"error" must be an exception.'))
+
+        self._repo_id = repo_id
+        self._url = url
+        self._error = error
+
+    def __repr__(self):
+
+        return (
+            '<refresh_error '
+            f'repo_id="{self._repo_id:s}" '
+            f'url={"none" if self._url is None else self._url:s} '
+            f'error={type(self._error).__name__:s}'
+            '>'
+            )
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# PROPERTIES
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+    @property
+    def error(self):
+        return self._error
+
+    @property
+    def message(self):
+        return str(self._error)
+
+    @property
+    def repo_id(self):
+        return self._repo_id
+
+    @property
+    def url(self):
+        return self._url
@@ -0,0 +1,328 @@
+# -*- coding: utf-8 -*-
+
+"""
+
+QGIST PLUGIN MANAGER
+QGIS Plugin for Managing QGIS Plugins
+https://github.com/qgist/pluginmanager
+
+    qgist/pluginmanager/dtype_releasefile.py: Persisted releases of one repository
+
+    Copyright (C) 2017-2020 QGIST project <info@qgist.org>
+
+<LICENSE_BLOCK>
+The contents of this file are subject to the GNU General Public License
+Version 2 ("GPL" or "License"). You may not use this file except in
+compliance with the License. You may obtain a copy of the License at
+https://www.gnu.org/licenses/old-licenses/gpl-2.0.txt
+https://github.com/qgist/pluginmanager/blob/master/LICENSE
+
+Software distributed under the License is distributed on an "AS IS" basis,
+WITHOUT WARRANTY OF ANY KIND, either express or implied. See the License for the
+specific language governing rights and limitations under the License.
+</LICENSE_BLOCK>
+
+"""
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# IMPORT (Python Standard Library)
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+import hashlib
+import json
+import os
+import struct
+import tempfile
+import threading
+import time
+import zlib
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# IMPORT (Internal)
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+from .abc import (
+    releasefile_abc,
+    settings_group_abc,
+    )
+from .const import (
+    REPO_RELEASES_FLD,
+    REPO_RELEASES_VERSION,
+    )
+from .dtype_changeset import apply_changeset_config
+from .dtype_settings import (
+    pack_columns,
+    unpack_columns,
+    )
+
+from ..error import (
+    QgistTypeError,
+    QgistValueError,
+    )
+from ..util import tr
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# CONST
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+_MAGIC = b'QGISTREL'
+_HEADER = struct.Struct('<8sHHQ') # magic, version, number of sections, generation
+_SECTION = struct.Struct('<16sQQ') # name, offset, length
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# CLASS
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+class dtype_releasefile_class(releasefile_abc):
+    """
+    Releases of one repository (exported, see `as_config_decompressed`), persisted next to the configuration
+
+    Two files: The releases, written in full and replaced atomically, plus a journal of changesets
+    applied since, appended to (one JSON line per changeset). The releases file has a fixed size header
+    and a table of sections - currently there is one, the releases packed column-wise (see `pack_columns`).
+    Every full write starts a new generation - journal lines of other generations (e.g. left over by a crash)
+    are ignored.
+
+    Mutable.
+    """
+
+    def __init__(self, path):
+
+        if not isinstance(path, str):
+            raise QgistTypeError(tr('"path" must be a str.'))
+        if len(path) == 0:
+            raise QgistValueError(tr('"path" must not be empty.'))
+
+        self._path = path # without extension
+        self._lock = threading.RLock()
+        self._journal_len = None # releases in journal, counted on first use
+
+    def __repr__(self):
+
+        return f'<releasefile path="{self._path:s}" exists={"yes" if self.exists else "no":s}>'
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# PROPERTIES
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+    @property
+    def exists(self):
+        return os.path.isfile(self._releases_fn)
+
+    @property
+    def journal_len(self):
+        "Number of releases added or changed by journal"
+
+        with self._lock:
+            if self._journal_len is None and not self.exists: # no releases, no journal
+                return 0
+            if self._journal_len is None:
+                self._journal_len = sum((
+                    len(entry['added']) + len(entry['changed'])
+                    for entry in self._read_journal(self._read_generation())
+                    ))
+            return self._journal_len
+
+    @property
+    def size(self):
+        "Bytes on disk, releases and journal"
+
+        return sum((
+            os.path.getsize(fn) for fn in (self._releases_fn, self._journal_fn) if os.path.isfile(fn)
+            ))
+
+    @property
+    def _releases_fn(self):
+        return self._path + '.releases'
+
+    @property
+    def _journal_fn(self):
+        return self._path + '.journal'
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# API
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+    def read(self):
+        "Returns list of exported releases, journal replayed - empty list if nothing was written yet"
+
+        with self._lock:
+            try:
+                with open(self._releases_fn, 'rb') as f:
+                    data = f.read()
+            except FileNotFoundError:
+                return []
+            except OSError as e:
+                raise QgistValueError(tr('Releases file can not be read.'), e)
+            version, generation, sections = self._read_header(data)
+            releases = self._read_section(data, sections, 'releases')
+
+            if version == 1: # JSON
+                releases = json.loads(zlib.decompress(releases).decode('utf-8'))
+            else: # columns, see `pack_columns`
+                releases = unpack_columns(releases)
+            if not isinstance(releases, list):
+                raise QgistTypeError(tr('Inconsistent releases file: Expected a list'))
+
+            for changeset_config in self._read_journal(generation):
+                releases = apply_changeset_config(releases, changeset_config)
+
+        return releases
+
+    def write(self, releases):
+        "Writes exported releases in full, empties journal"
+
+        if not isinstance(releases, list):
+            raise QgistTypeError(tr('"releases" must be a list.'))
+
+        sections = [('releases', pack_columns(releases))]
+
+        header = [_HEADER.pack(_MAGIC, REPO_RELEASES_VERSION, len(sections), int(time.time() * 1e6))]
+        offset = _HEADER.size + _SECTION.size * len(sections)
+        for name, data in sections:
+            header.append(_SECTION.pack(name.encode('utf-8'), offset, len(data)))
+            offset += len(data)
+
+        with self._lock:
+            fld = os.path.dirname(self._path)
+            try:
+                os.makedirs(fld, exist_ok = True)
+                fd, tmp_fn = tempfile.mkstemp(dir = fld, suffix = '.tmp')
+            except OSError as e:
+                raise QgistValueError(tr('Releases file can not be written.'), e)
+            try:
+                with os.fdopen(fd, 'wb') as f:
+                    for data in (*header, *(data for _, data in sections)):
+                        f.write(data)
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(tmp_fn, self._releases_fn) # journal now belongs to old generation
+            except OSError as e:
+                _unlink_silently(tmp_fn)
+                raise QgistValueError(tr('Releases file can not be written.'), e)
+            _unlink_silently(self._journal_fn)
+            self._journal_len = 0
+
+    def append(self, changeset_config):
+        "Appends exported changeset (`as_config_decompressed`) to journal - releases file must exist"
+
+        if not isinstance(changeset_config, dict):
+            raise QgistTypeError(tr('"changeset_config" must be a dict.'))
+
+        with self._lock:
+            journal_len = self.journal_len
+            line = json.dumps({'generation': self._read_generation(), 'changeset': changeset_config})
+            try:
+                with open(self._journal_fn, 'a', encoding = 'utf-8') as f:
+                    f.write(line + '\n')
+            except OSError as e:
+                raise QgistValueError(tr('Releases journal can not be written.'), e)
+            self._journal_len = journal_len + len(changeset_config['added']) + len(changeset_config['changed'])
+
+    def remove(self):
+        "Removes releases and journal from disk"
+
+        with self._lock:
+            _unlink_silently(self._releases_fn)
+            _unlink_silently(self._journal_fn)
+            self._journal_len = None
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# HELPER
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+    def _read_generation(self):
+
+        try:
+            with open(self._releases_fn, 'rb') as f:
+                _, generation, _ = self._read_header(f.read(_HEADER.size))
+        except FileNotFoundError:
+            raise QgistValueError(tr('Releases file does not exist.'))
+        except OSError as e:
+            raise QgistValueError(tr('Releases file can not be read.'), e)
+
+        return generation
+
+    def _read_journal(self, generation):
+        "Changesets of generation - stops at first broken line, i.e. at an interrupted write"
+
+        try:
+            with open(self._journal_fn, 'r', encoding = 'utf-8') as f:
+                lines = f.readlines()
+        except FileNotFoundError:
+            return []
+        except OSError as e:
+            raise QgistValueError(tr('Releases journal can not be read.'), e)
+
+        journal = []
+        for line in lines:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                break
+            if entry['generation'] == generation:
+                journal.append(entry['changeset'])
+
+        return journal
+
+    @staticmethod
+    def _read_header(data):
+        "Returns version, generation and sections (by name: offset, length) - reads header only"
+
+        if len(data) < _HEADER.size:
+            raise QgistValueError(tr('Releases file is truncated.'))
+        magic, version, sections_len, generation = _HEADER.unpack(data[:_HEADER.size])
+        if magic != _MAGIC:
+            raise QgistValueError(tr('Releases file has unknown format.'))
+        if version not in (1, REPO_RELEASES_VERSION): # 1: JSON, 2: columns
+            raise QgistValueError(tr('Releases file has unsupported version.'), version)
+
+        sections = {}
+        for index in range(sections_len):
+            start = _HEADER.size + index * _SECTION.size
+            if len(data) < start + _SECTION.size: # only header was read
+                break
+            name, offset, length = _SECTION.unpack(data[start:start + _SECTION.size])
+            sections[name.rstrip(b'\x00').decode('utf-8')] = (offset, length)
+
+        return version, generation, sections
+
+    @staticmethod
+    def _read_section(data, sections, name):
+        "Returns one section of contents of releases file"
+
+        if name not in sections.keys():
+            raise QgistValueError(tr('Releases file lacks section.'), name)
+        offset, length = sections[name]
+        if len(data) < offset + length:
+            raise QgistValueError(tr('Releases file is truncated.'))
+
+        return data[offset:offset + length]
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# PRE-CONSTRUCTOR
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+    @classmethod
+    def from_config_group(cls, config_group):
+        "Releases file of repository configured in group - in folder next to configuration file"
+
+        if not isinstance(config_group, settings_group_abc):
+            raise QgistTypeError(tr('"config_group" is not a group of settings'))
+
+        return cls(os.path.join(
+            config_group.settings.fld,
+            REPO_RELEASES_FLD,
+            hashlib.sha256(config_group.root.encode('utf-8')).hexdigest()[:16],
+            ))
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# ROUTINES
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+def _unlink_silently(path):
+
+    try:
+        os.unlink(path)
+    except OSError:
+        pass
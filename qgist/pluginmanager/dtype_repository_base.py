@@ -28,6 +28,8 @@ specific language governing rights and limitations under the License.
 # IMPORT (Python Standard Library)
 # +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
 
+import threading
+import time
 from typing import Generator, Iterator
 
 # +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
@@ -35,6 +37,7 @@ from typing import Generator, Iterator
 # +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
 
 from .abc import (
+    changeset_abc,
     pluginrelease_abc,
     repository_abc,
     settings_abc,
@@ -43,8 +46,17 @@ from .abc import (
 from .const import (
     CONFIG_GROUP_MANAGER_REPOS,
     CONFIG_KEY_CACHE,
+    CONFIG_KEY_CACHE_JOURNAL,
+    CONFIG_KEY_LAST_REFRESH,
+    CONFIG_KEY_REFRESH_INTERVAL,
+    CONFIG_KEY_REFRESH_TIMEOUT,
+    REPO_CACHE_JOURNAL_MAX,
+    REPO_REFRESH_INTERVAL,
+    REPO_REFRESH_TIMEOUT,
     )
 from .backends import backends
+from .dtype_changeset import apply_changeset_config
+from .dtype_releasefile import dtype_releasefile_class
 
 from ..error import (
     QgistNotImplementedError,
@@ -100,7 +112,10 @@ class dtype_repository_base_class(repository_abc):
         self._protected = protected
         self._plugin_releases = plugin_releases
 
+        self._lock = threading.RLock() # replaced by lock of index, once added to it
         self._config_group = config_group
+        self._releasefile = dtype_releasefile_class.from_config_group(config_group) # releases not kept in config
+        self._refresh_errors = tuple() # of most recent refresh
 
         self._make_releases_aware_of_repo()
 
@@ -157,6 +172,16 @@ class dtype_repository_base_class(repository_abc):
     def active(self):
         return self._active
 
+    @property
+    def lock(self):
+        "Guards releases (and other state) - held while reading it from a background refresh"
+        return self._lock
+    @lock.setter
+    def lock(self, value):
+        if not all((hasattr(value, name) for name in ('acquire', 'release', '__enter__', '__exit__'))):
+            raise QgistTypeError(tr('"lock" must be a lock.'))
+        self._lock = value
+
     @property
     def protected(self):
         return self._protected
@@ -169,6 +194,49 @@ class dtype_repository_base_class(repository_abc):
     def repo_type(self):
         return self._repo_type
 
+    @property
+    def refresh_errors(self):
+        "Errors of most recent refresh - partial results were applied nevertheless"
+        return self._refresh_errors
+
+    @property
+    def refresh_interval(self):
+        "Seconds between two (background) refreshes"
+        return int(self._config_group.get(CONFIG_KEY_REFRESH_INTERVAL, str(REPO_REFRESH_INTERVAL)))
+    @refresh_interval.setter
+    def refresh_interval(self, value):
+        if not isinstance(value, int):
+            raise QgistTypeError(tr('New value of "refresh_interval" must be an int.'))
+        if value < 0:
+            raise QgistValueError(tr('New value of "refresh_interval" must not be negative.'))
+        self._config_group[CONFIG_KEY_REFRESH_INTERVAL] = str(value)
+
+    @property
+    def refresh_timeout(self):
+        "Seconds a refresh may take before it is abandoned"
+        return float(self._config_group.get(CONFIG_KEY_REFRESH_TIMEOUT, str(REPO_REFRESH_TIMEOUT)))
+    @refresh_timeout.setter
+    def refresh_timeout(self, value):
+        if not isinstance(value, (int, float)):
+            raise QgistTypeError(tr('New value of "refresh_timeout" must be a number.'))
+        if value <= 0:
+            raise QgistValueError(tr('New value of "refresh_timeout" must be greater than zero.'))
+        self._config_group[CONFIG_KEY_REFRESH_TIMEOUT] = str(value)
+
+    @property
+    def last_refresh(self):
+        "Time of last successful refresh (seconds since epoch), None if never refreshed"
+        value = self._config_group.get(CONFIG_KEY_LAST_REFRESH, None)
+        return float(value) if value is not None else None
+
+    @property
+    def refresh_due(self):
+        if not self._active:
+            return False
+        if self.last_refresh is None:
+            return True
+        return (time.time() - self.last_refresh) >= self.refresh_interval
+
 # +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
 # PROPERTIES: STUBS FOR SPECIALS
 # +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
@@ -186,10 +254,62 @@ class dtype_repository_base_class(repository_abc):
 # +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
 
     def refresh(self):
-        "Refresh index, i.e. reload metadata from remote source"
+        "Refresh index, i.e. reload metadata from remote source - returns changeset"
+
+        return self.apply_fetched(self.fetch())
+
+    def fetch(self):
+        "Network part of refresh - must not change the repository, returns result for `apply_fetched`"
 
         raise QgistNotImplementedError()
 
+    def apply_fetched(self, fetched):
+        "Local part of refresh - applies result of `fetch`, returns changeset"
+
+        raise QgistNotImplementedError()
+
+    def apply_changeset(self, changeset):
+        "Update releases and persisted cache incrementally - work is proportional to the changeset, not the repo"
+
+        if not isinstance(changeset, changeset_abc):
+            raise QgistTypeError(tr('"changeset" must be a changeset.'))
+
+        for release in (*changeset.added, *changeset.changed):
+            release.repo = self
+        if len(changeset) > 0:
+            self._plugin_releases[:] = changeset.apply(self._plugin_releases) # swap in one step
+
+        if self._config_group.get('repo_type', None) is None: # repo has never been written to config
+            self.to_config()
+            return
+
+        if len(changeset) == 0:
+            return
+
+        if not self._releasefile.exists: # e.g. removed by user
+            self._cache_to_config()
+            return
+
+        self._releasefile.append(changeset.as_config_decompressed())
+
+        if self._releasefile.journal_len > REPO_CACHE_JOURNAL_MAX:
+            self._cache_to_config() # merge journal into cache
+
+    def mark_refreshed(self):
+        "Remember time of last successful refresh"
+
+        self._config_group[CONFIG_KEY_LAST_REFRESH] = str(time.time())
+
+    def get_release_history(self, plugin_id):
+        "Returns all releases of one plugin - backends may fetch older releases on demand"
+
+        if not isinstance(plugin_id, str):
+            raise QgistTypeError(tr('"plugin_id" must be a str.'))
+        if len(plugin_id) == 0:
+            raise QgistValueError(tr('"plugin_id" must not be empty.'))
+
+        return (release for release in self._plugin_releases if release.id == plugin_id)
+
     def remove(self):
         "Run cleanup actions e.g. in config before repo is removed"
 
@@ -198,11 +318,17 @@ class dtype_repository_base_class(repository_abc):
     def to_config(self):
         "Write repository to configuration"
 
-        self._config_group['name'] = self._name
-        self._config_group['enabled'] = self._config_group.settings.bool_to_str(self._active, style = 'truefalse')
-        self._config_group['protected'] = self._config_group.settings.bool_to_str(self._protected, style = 'truefalse')
-        self._config_group['repo_type'] = self._repo_type
-        self._config_group[CONFIG_KEY_CACHE] = self._config_group.settings.dump([
+        with self._config_group.batch(): # written at once
+            self._config_group['name'] = self._name
+            self._config_group['enabled'] = self._config_group.settings.bool_to_str(self._active, style = 'truefalse')
+            self._config_group['protected'] = self._config_group.settings.bool_to_str(self._protected, style = 'truefalse')
+            self._config_group['repo_type'] = self._repo_type
+            self._cache_to_config()
+
+    def _cache_to_config(self):
+        "Write all releases to releases file, empty journal"
+
+        self._releasefile.write([
             release.as_config_decompressed() for release in self._plugin_releases
             ])
 
@@ -220,13 +346,10 @@ class dtype_repository_base_class(repository_abc):
         if repo_type not in backends.keys():
             raise QgistValueError(tr('"repo_type" is unknown.'))
 
-        repo_cache_compressed = config_group.get(CONFIG_KEY_CACHE, None)
-        if repo_cache_compressed is None:
-            return tuple()
-
-        repo_cache_decompressed = config_group.settings.load(repo_cache_compressed)
-        if not isinstance(repo_cache_decompressed, list):
-            raise QgistTypeError(tr('Inconsistent repository cache: Expected a list'))
+        releasefile = dtype_releasefile_class.from_config_group(config_group)
+        if not releasefile.exists:
+            cls._move_cache_from_config_to_releasefile(config_group, releasefile)
+        repo_cache_decompressed = releasefile.read()
 
         if not backends[repo_type].module_loaded:
             backends[repo_type].load_module()
@@ -236,6 +359,32 @@ class dtype_repository_base_class(repository_abc):
             for release_config_dict in repo_cache_decompressed
             )
 
+    @staticmethod
+    def _move_cache_from_config_to_releasefile(config_group, releasefile):
+        "Releases used to be kept in configuration - moved to releases file, once"
+
+        repo_cache_compressed = config_group.get(CONFIG_KEY_CACHE, None)
+        if repo_cache_compressed is None:
+            return
+
+        repo_cache_decompressed = config_group.settings.load(repo_cache_compressed)
+        if not isinstance(repo_cache_decompressed, list):
+            raise QgistTypeError(tr('Inconsistent repository cache: Expected a list'))
+
+        journal_compressed = config_group.get(CONFIG_KEY_CACHE_JOURNAL, None)
+        journal = config_group.settings.load(journal_compressed) if journal_compressed is not None else []
+        if not isinstance(journal, list):
+            raise QgistTypeError(tr('Inconsistent repository cache journal: Expected a list'))
+
+        for changeset_config in journal:
+            repo_cache_decompressed = apply_changeset_config(repo_cache_decompressed, changeset_config)
+
+        releasefile.write(repo_cache_decompressed)
+
+        with config_group.batch():
+            del config_group[CONFIG_KEY_CACHE]
+            del config_group[CONFIG_KEY_CACHE_JOURNAL]
+
     @classmethod
     def get_repo_config_groups(cls, config):
 
@@ -253,6 +402,16 @@ class dtype_repository_base_class(repository_abc):
     def find_plugins(cls, config, protected, plugin_modules):
         raise QgistNotImplementedError()
 
+    @classmethod
+    def maintain(cls, config):
+        "Housekeeping for repository type, e.g. cache eviction - runs in background"
+        pass
+
+    @classmethod
+    def shutdown(cls):
+        "Persist pending state of repository type, e.g. of caches - on unload"
+        pass
+
 # +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
 # PRE-CONSTRUCTOR
 # +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
@@ -0,0 +1,187 @@
+# -*- coding: utf-8 -*-
+
+"""
+
+QGIST PLUGIN MANAGER
+QGIS Plugin for Managing QGIS Plugins
+https://github.com/qgist/pluginmanager
+
+    qgist/pluginmanager/dtype_scheduler.py: Background refresh of repositories
+
+    Copyright (C) 2017-2020 QGIST project <info@qgist.org>
+
+<LICENSE_BLOCK>
+The contents of this file are subject to the GNU General Public License
+Version 2 ("GPL" or "License"). You may not use this file except in
+compliance with the License. You may obtain a copy of the License at
+https://www.gnu.org/licenses/old-licenses/gpl-2.0.txt
+https://github.com/qgist/pluginmanager/blob/master/LICENSE
+
+Software distributed under the License is distributed on an "AS IS" basis,
+WITHOUT WARRANTY OF ANY KIND, either express or implied. See the License for the
+specific language governing rights and limitations under the License.
+</LICENSE_BLOCK>
+
+"""
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# IMPORT (Python Standard Library)
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+import threading
+import time
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# IMPORT (Internal)
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+from .abc import (
+    index_abc,
+    scheduler_abc,
+    )
+from .const import (
+    REPO_CACHE_MAINTENANCE_INTERVAL,
+    REPO_SCHEDULER_TICK,
+    )
+
+from ..error import (
+    QgistTypeError,
+    QgistValueError,
+    )
+from ..util import tr
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# CLASS
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+class dtype_scheduler_class(scheduler_abc):
+    """
+    Refreshes repositories of an index in the background (stale-while-revalidate)
+
+    Repositories serve their cached releases right away. A daemon thread wakes up
+    every `tick` seconds and refreshes those repositories which are due, based on
+    their individual refresh interval and last refresh. Nothing ever blocks the caller.
+    Every once in a while, the same thread also runs housekeeping (e.g. cache eviction).
+
+    Mutable.
+    """
+
+    def __init__(self, index, tick = REPO_SCHEDULER_TICK):
+
+        if not isinstance(index, index_abc):
+            raise QgistTypeError(tr('"index" must be an index.'))
+        self._check_tick(tick)
+
+        self._index = index
+        self._tick = tick
+
+        self._thread = None
+        self._stop = threading.Event()
+        self._wakeup = threading.Event()
+        self._errors = []
+        self._last_maintenance = None # monotonic time
+
+    def __repr__(self):
+
+        return f'<scheduler index={id(self._index):x} running={"yes" if self.running else "no":s}>'
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# PROPERTIES
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+    @property
+    def errors(self):
+        "Errors of the most recent background refresh (refresh errors or exceptions)"
+        return self._errors.copy()
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    @property
+    def tick(self):
+        return self._tick
+    @tick.setter
+    def tick(self, value):
+        self._check_tick(value)
+        self._tick = value
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# API
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+    def start(self):
+        "Start background refresh - returns immediately"
+
+        if self.running:
+            return
+
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target = self._run,
+            name = 'qgist-pluginmanager-scheduler',
+            daemon = True, # must never keep QGIS from exiting
+            )
+        self._thread.start()
+
+    def stop(self, timeout = None):
+        """
+        Stop background refresh - waits for a running refresh to complete (or timeout).
+        Returns False if the refresh is still running after timeout (it stops once done), True otherwise.
+        """
+
+        if timeout is not None and not isinstance(timeout, (int, float)):
+            raise QgistTypeError(tr('"timeout" must be a number or None.'))
+
+        if not self.running:
+            return True
+
+        self._stop.set()
+        self._wakeup.set()
+        self._thread.join(timeout)
+        if self._thread.is_alive(): # still writing, keep handle so `running` tells the truth
+            return False
+        self._thread = None
+        return True
+
+    def trigger(self):
+        "Check for due repositories now instead of at next tick"
+
+        self._wakeup.set()
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# HELPER
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+    def _run(self):
+
+        while not self._stop.is_set():
+
+            try:
+                self._errors = self._index.refresh(due_only = True)
+            except Exception as e: # anything, the loop must survive - see `errors`
+                self._errors = [e]
+
+            if self._maintenance_due():
+                try:
+                    self._index.maintain()
+                except Exception as e: # anything, the loop must survive - see `errors`
+                    self._errors.append(e)
+                self._last_maintenance = time.monotonic()
+
+            self._wakeup.wait(self._tick)
+            self._wakeup.clear()
+
+    def _maintenance_due(self):
+
+        if self._last_maintenance is None:
+            return True
+        return time.monotonic() - self._last_maintenance >= REPO_CACHE_MAINTENANCE_INTERVAL
+
+    @staticmethod
+    def _check_tick(tick):
+
+        if not isinstance(tick, (int, float)):
+            raise QgistTypeError(tr('"tick" must be a number.'))
+        if tick <= 0:
+            raise QgistValueError(tr('"tick" must be greater than zero.'))
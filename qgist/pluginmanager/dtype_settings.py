@@ -28,8 +28,17 @@ specific language governing rights and limitations under the License.
 # IMPORT (Python Standard Library)
 # +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
 
+from array import array
 import base64
+from collections import OrderedDict
+from contextlib import contextmanager
+import copy
+from itertools import accumulate
 import json
+import os
+import struct
+import sys
+import threading
 import zlib
 
 # +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
@@ -55,6 +64,12 @@ from ..error import (
 from ..qgis_api import get_qgis_settings
 from ..util import tr
 
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# CONST
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+_TRIE_KEY = None # marks nodes of prefix tree which are keys, never a segment (str)
+
 # +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
 # CLASS: SETTINGS MAIN
 # +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
@@ -65,22 +80,38 @@ class dtype_settings_class(settings_abc):
     Class enables redundant storage of settings: Into QgsSettings *and* config_class.
     When read, data from QgsSettings is preferred.
     When written, data goes first into config_class, second into QgsSettings.
+    Keys are cached in a prefix tree (by segment), so groups enumerate their keys without
+    scanning all keys. Keys written through this class are added to the cache,
+    changes by anyone else become visible after `invalidate_keys` or when the next `batch` starts.
 
     Mutable.
     """
 
-    def __init__(self, config):
+    def __init__(self, config, fn = None):
 
         if not isinstance(config, config_class):
             raise QgistTypeError(tr('config must be an instance of config_class'))
+        if not isinstance(fn, str) and fn is not None:
+            raise QgistTypeError(tr('fn must be a str or None'))
 
         self._config = config
-        self._settings = get_qgis_settings(default = None)
+        self._fn = fn # INI-file instead of QGIS profile, isolated settings e.g. for benchmarks
+        self._local = threading.local() # QgsSettings is reentrant, not thread-safe: one instance per thread
+        self._lock = threading.RLock() # reads and writes may come from background refresh
+        self._trie = None # prefix tree of keys, built on first use
 
     def __repr__(self):
 
         return f'<settings ({id(self):x})>'
 
+    @property
+    def _settings(self):
+        "QgsSettings of current thread"
+
+        if not hasattr(self._local, 'settings'):
+            self._local.settings = get_qgis_settings(default = None, fn = self._fn)
+        return self._local.settings
+
     def __getitem__(self, name):
 
         if not isinstance(name, str):
@@ -88,10 +119,10 @@ class dtype_settings_class(settings_abc):
         if len(name) == 0:
             raise QgistValueError(tr('name must not be empty'))
 
-        setting = self._settings.value(name) if self._settings is not None else None
-
-        if setting is None:
-            return self._config[name]
+        with self._lock:
+            setting = self._settings.value(name) if self._settings is not None else None
+            if setting is None:
+                return self._config[name]
         return self._convert_qt_to_python(setting)
 
     def __setitem__(self, name, value):
@@ -101,9 +132,45 @@ class dtype_settings_class(settings_abc):
         if len(name) == 0:
             raise QgistValueError(tr('name must not be empty'))
 
-        self._config[name] = value # does internal validity and type checks on value etc
+        with self._lock:
+            self._config[name] = value # does internal validity and type checks on value etc
+            self._settings.setValue(name, value)
+            if self._trie is not None:
+                self._add_to_trie(self._trie, name)
+
+    def __delitem__(self, name):
+        "Removes setting - if present"
+
+        if not isinstance(name, str):
+            raise QgistTypeError(tr('name is not str'))
+        if len(name) == 0:
+            raise QgistValueError(tr('name must not be empty'))
 
-        self._settings.setValue(name, value)
+        with self._lock:
+            if name in self._config.keys():
+                del self._config[name]
+            if self._settings is not None:
+                self._settings.remove(name)
+            self._trie = None # QgsSettings also removes keys below name
+
+    @property
+    def fld(self):
+        "Folder of configuration file - for data kept next to it"
+        return os.path.dirname(self._config.fn)
+
+    @contextmanager
+    def batch(self):
+        "Many writes at once, see `config_class.batch` - QgsSettings keeps writes made before an exception"
+
+        with self._lock:
+            self._trie = None # keys written by others since last use become visible, read again on demand
+            with self._config.batch():
+                yield self
+
+    def flush(self):
+        "Write pending changes to disk now"
+
+        self._config.flush()
 
     def get(self, name, default):
         "dict get"
@@ -113,10 +180,10 @@ class dtype_settings_class(settings_abc):
         if len(name) == 0:
             raise QgistValueError(tr('name must not be empty'))
 
-        setting = self._settings.value(name) if self._settings is not None else None
-
-        if setting is None:
-            return self._config.get(name, default)
+        with self._lock:
+            setting = self._settings.value(name) if self._settings is not None else None
+            if setting is None:
+                return self._config.get(name, default)
         return self._convert_qt_to_python(setting)
 
     def get_group(self, root):
@@ -132,19 +199,90 @@ class dtype_settings_class(settings_abc):
     def keys(self):
         "dict keys generator"
 
-        keys = self._settings.allKeys() if self._settings is not None else None
+        with self._lock:
+            keys = self._settings.allKeys() if self._settings is not None else None
+            if keys is None:
+                keys = list(self._config.keys()) # snapshot, config may change meanwhile
 
-        if keys is not None:
-            return (key for key in keys) # keys is a list, should be a generator/iterator
-        return self._config.keys()
+        return (key for key in keys) # keys is a list, should be a generator/iterator
 
     def keys_root(self):
         "dict keys generator - at root"
 
-        return (item for item in set((
-            key.split(CONFIG_DELIMITER, 1)[0]
-            for key in self.keys()
-            )))
+        with self._lock:
+            return (item for item in [segment for segment in self._get_trie().keys() if segment is not _TRIE_KEY])
+
+    def get_group_keys(self, root):
+        """
+        keys below root, relative to it - proportional to size of group, not number of all keys
+
+        Keys are cached. Keys written by someone else (e.g. QGIS) show up only after `invalidate_keys`
+        or the start of the next `batch`.
+        """
+
+        if not isinstance(root, str):
+            raise QgistTypeError(tr('root is not str'))
+
+        keys = []
+        with self._lock:
+            stack = [(tuple(), self._get_trie_node(root))]
+            while len(stack) > 0:
+                path, node = stack.pop()
+                for segment, child in node.items():
+                    if segment is _TRIE_KEY:
+                        continue
+                    if _TRIE_KEY in child.keys():
+                        keys.append(CONFIG_DELIMITER.join(path + (segment,)))
+                    stack.append((path + (segment,), child))
+
+        return (key for key in keys if len(key) > 0)
+
+    def get_group_keys_root(self, root):
+        "keys below root, relative to it - only their first segment, cached like `get_group_keys`"
+
+        if not isinstance(root, str):
+            raise QgistTypeError(tr('root is not str'))
+
+        with self._lock:
+            return (item for item in [
+                segment for segment, child in self._get_trie_node(root).items()
+                if segment is not _TRIE_KEY and (len(segment) > 0 or any((item is not _TRIE_KEY for item in child.keys())))
+                ])
+
+    def invalidate_keys(self):
+        "Drop cached keys, e.g. after QgsSettings were changed by someone else - read again on next use"
+
+        with self._lock:
+            self._trie = None
+
+    def _get_trie(self):
+
+        with self._lock:
+            if self._trie is None:
+                trie = {}
+                for key in self.keys(): # all of QgsSettings, once
+                    self._add_to_trie(trie, key)
+                self._trie = trie
+            return self._trie
+
+    def _get_trie_node(self, root):
+        "Node of prefix tree for root - empty if there are no keys below root"
+
+        node = self._get_trie()
+        for segment in root.split(CONFIG_DELIMITER):
+            node = node.get(segment, None)
+            if node is None:
+                return {}
+
+        return node
+
+    @staticmethod
+    def _add_to_trie(trie, key):
+
+        node = trie
+        for segment in key.split(CONFIG_DELIMITER):
+            node = node.setdefault(segment, {})
+        node[_TRIE_KEY] = True
 
     @staticmethod
     def _convert_qt_to_python(data):
@@ -157,6 +295,31 @@ class dtype_settings_class(settings_abc):
 
         raise QgistTypeError(tr('unknown data type from QGIS settings'))
 
+    @staticmethod
+    def _unwrap(data):
+        "Checks packed configuration data - returns packing version and raw bytes"
+
+        PACKING_VERSIONS = ('REPO_V001', 'REPO_V002') # Making this future-proofed!
+
+        if not isinstance(data, str):
+            raise QgistTypeError(tr('data must be a str'))
+        packing_version = data[:len(PACKING_VERSIONS[0])]
+        if packing_version not in PACKING_VERSIONS:
+            raise QgistValueError(tr('data must be packed configuration'))
+
+        length_raw = data[len(packing_version):(len(packing_version) + 16)]
+        if not length_raw.isnumeric():
+            raise QgistValueError(tr('data does not have numeric length field - broken'))
+
+        length = int(length_raw)
+        data_raw = data[(len(packing_version) + 16):]
+        if length != len(data_raw):
+            raise QgistValueError(tr('length information in data does not match actual length'))
+
+        return packing_version, base64.b64decode(
+            data_raw.encode('utf-8') # to bytes (BASE64)
+            ) # to bytes (regular)
+
     @staticmethod
     def str_to_bool(value):
 
@@ -196,53 +359,77 @@ class dtype_settings_class(settings_abc):
 
         return styles[style](value)
 
-    @staticmethod
-    def load(data):
+    @classmethod
+    def load(cls, data):
         """
         Converts compressed configuration data back to Python objects
         """
 
-        PACKING_VERSION = 'REPO_V001' # Making this future-proofed!
+        packing_version, raw = cls._unwrap(data)
 
-        if not isinstance(data, str):
-            raise QgistTypeError(tr('data must be a str'))
-        if not data.startswith(PACKING_VERSION):
-            raise QgistValueError(tr('data must be packed configuration'))
-
-        length_raw = data[len(PACKING_VERSION):(len(PACKING_VERSION) + 16)]
-        if not length_raw.isnumeric():
-            raise QgistValueError(tr('data does not have numeric length field - broken'))
-
-        length = int(length_raw)
-        data_raw = data[(len(PACKING_VERSION) + 16):]
-        if length != len(data_raw):
-            raise QgistValueError(tr('length information in data does not match actual length'))
+        if packing_version == 'REPO_V002':
+            return unpack_columns(raw)
 
         return json.loads(
-            zlib.decompress(
-                base64.b64decode(
-                    data_raw.encode('utf-8') # to bytes (BASE64)
-                    ) # to bytes (regular)
-                ).decode('utf-8') # to decompressed, to string
+            zlib.decompress(raw).decode('utf-8') # to decompressed, to string
             ) # to Python
 
+    @classmethod
+    def load_column(cls, data, column):
+        """
+        Decodes one column of packed records, e.g. `('meta', 'id')` - list with one value per record,
+        None where a record lacks the column. As of REPO_V002, other columns are not decoded.
+        """
+
+        if not isinstance(column, tuple):
+            raise QgistTypeError(tr('column must be a tuple'))
+        if len(column) == 0 or not all((isinstance(key, str) for key in column)):
+            raise QgistValueError(tr('column must be a non-empty path of str keys'))
+
+        packing_version, raw = cls._unwrap(data)
+
+        if packing_version == 'REPO_V002':
+            records = unpack_columns(raw, columns = (column,))
+        else:
+            records = json.loads(zlib.decompress(raw).decode('utf-8'))
+        if not is_records(records):
+            raise QgistTypeError(tr('data must be packed records'))
+
+        values = []
+        for record in records:
+            for key in column:
+                record = record.get(key, None) if isinstance(record, dict) else None
+            values.append(record)
+
+        return values
+
     @staticmethod
     def dump(data):
         """
         Accepts anything that can be handled by JSON.
         Compresses data and prepares string which can be stored in configuration.
+        Lists of dicts (records, e.g. releases) are packed column-wise (REPO_V002), anything else as JSON (REPO_V001).
         """
 
-        PACKING_VERSION = 'REPO_V001' # Making this future-proofed!
-
         if not config_class.check_value(data):
             raise QgistTypeError(tr('"value" contains not allowed types.'))
 
-        packed = base64.b64encode(
-            zlib.compress(
+        PACKING_VERSION = 'REPO_V001' # Making this future-proofed!
+        raw = None
+
+        if is_records(data):
+            try:
+                raw = pack_columns(data)
+                PACKING_VERSION = 'REPO_V002'
+            except QgistTypeError: # e.g. keys which are not str
+                pass
+
+        if raw is None:
+            raw = zlib.compress(
                 json.dumps(data).encode('utf-8') # to JSON, to bytes
                 ) # to compressed bytes
-            ).decode('utf-8') # to base64, to string
+
+        packed = base64.b64encode(raw).decode('utf-8') # to base64, to string
 
         return f'{PACKING_VERSION:s}{len(packed):016d}{packed:s}'
 
@@ -272,7 +459,6 @@ class dtype_settings_group_class(settings_group_abc):
         self._settings = settings
         self._root = root
         self._base = self._root + CONFIG_DELIMITER
-        self._base_len = len(self._base)
 
     def __repr__(self):
 
@@ -296,6 +482,15 @@ class dtype_settings_group_class(settings_group_abc):
 
         self._settings[self._base + name] = value
 
+    def __delitem__(self, name):
+
+        if not isinstance(name, str):
+            raise QgistTypeError(tr('name is not str'))
+        if len(name) == 0:
+            raise QgistValueError(tr('name must not be empty'))
+
+        del self._settings[self._base + name]
+
     @property
     def root(self):
         return self._root
@@ -304,6 +499,11 @@ class dtype_settings_group_class(settings_group_abc):
     def settings(self):
         return self._settings
 
+    def batch(self):
+        "Many writes at once, see `dtype_settings_class.batch`"
+
+        return self._settings.batch()
+
     def get(self, name, default):
         "dict get"
 
@@ -327,17 +527,149 @@ class dtype_settings_group_class(settings_group_abc):
     def keys(self):
         "dict keys generator"
 
-        return (item for item in set((
-            key[self._base_len:]
-            for key in self._settings.keys()
-            if key.startswith(self._base) and len(key) > self._base_len
-            )))
+        return self._settings.get_group_keys(self._root)
 
     def keys_root(self):
         "dict keys generator - at root"
 
-        return (item for item in set((
-            key[self._base_len:].split(CONFIG_DELIMITER, 1)[0]
-            for key in self._settings.keys()
-            if key.startswith(self._base) and len(key) > self._base_len
-            )))
+        return self._settings.get_group_keys_root(self._root)
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# ROUTINES: COLUMNAR PACKING
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+_COLUMNS_HEADER = struct.Struct('<I') # length of compressed header
+
+def is_records(data):
+    "Checks whether data can be packed column-wise, i.e. is a non-empty list of dicts"
+
+    return isinstance(data, list) and len(data) > 0 and all((isinstance(record, dict) for record in data))
+
+def pack_columns(records):
+    """
+    Packs records (dicts, nested dicts allowed) column-wise: One column per path of keys to a value.
+    Every column has a dictionary of its distinct values and one integer code per record
+    (0 if record lacks column), e.g. repeated authors, URLs, QGIS versions and booleans cost
+    one or two bytes per record. Codes may be stored as differences to their predecessors instead,
+    whichever compresses better - differences do for columns of (mostly) unique values. Dictionary and codes of every column are
+    compressed independently, so a column can be decoded without touching any other column.
+    Columns identical to a previous column (e.g. file name and download URL) are stored once.
+
+    Layout: length of header (uint32), header (compressed JSON: number of records, columns
+    with path, type code, offsets and lengths), then dictionaries and codes of all columns.
+    """
+
+    if not isinstance(records, list) or not all((isinstance(record, dict) for record in records)):
+        raise QgistTypeError(tr('records must be a list of dicts'))
+
+    columns = OrderedDict() # by path: dictionary (list of values), index of values, codes
+    for number, record in enumerate(records):
+        for path, value in _flatten_record(record, tuple()):
+            if path not in columns.keys():
+                columns[path] = ([], {}, [0] * len(records))
+            values, index, codes = columns[path]
+            key = (type(value), value) if not isinstance(value, (list, dict)) else (type(value), json.dumps(value, sort_keys = True))
+            if key not in index.keys():
+                values.append(value)
+                index[key] = len(values) # 0 is reserved for "not present"
+            codes[number] = index[key]
+
+    header = {'records': len(records), 'columns': []}
+    blobs = []
+    stored = {} # by blobs: header entry, for identical columns
+    offset = 0
+    for path, (values, _, codes) in columns.items():
+        codes_blob, typecode, delta = min((
+            _pack_codes(codes, len(values), delta = False),
+            _pack_codes([code - previous for code, previous in zip(codes, [0] + codes[:-1])], len(values), delta = True),
+            ), key = lambda item: len(item[0]))
+        values_blob = zlib.compress(json.dumps(values).encode('utf-8'))
+        if (values_blob, codes_blob) in stored.keys():
+            header['columns'].append({**stored[(values_blob, codes_blob)], 'path': list(path)})
+            continue
+        stored[(values_blob, codes_blob)] = {
+            'path': list(path), 'typecode': typecode, 'delta': delta,
+            'values': [offset, len(values_blob)], 'codes': [offset + len(values_blob), len(codes_blob)],
+            }
+        header['columns'].append(stored[(values_blob, codes_blob)])
+        blobs.extend((values_blob, codes_blob))
+        offset += len(values_blob) + len(codes_blob)
+
+    header_blob = zlib.compress(json.dumps(header).encode('utf-8'))
+
+    return b''.join((_COLUMNS_HEADER.pack(len(header_blob)), header_blob, *blobs))
+
+def unpack_columns(raw, columns = None):
+    "Unpacks records packed by `pack_columns` - only columns (paths, tuples of keys) if given, all otherwise"
+
+    if not isinstance(raw, (bytes, bytearray, memoryview)):
+        raise QgistTypeError(tr('raw must be bytes'))
+    if columns is not None:
+        columns = {tuple(column) for column in columns}
+
+    try:
+        header_len, = _COLUMNS_HEADER.unpack(raw[:_COLUMNS_HEADER.size])
+        body = _COLUMNS_HEADER.size + header_len
+        header = json.loads(zlib.decompress(raw[_COLUMNS_HEADER.size:body]).decode('utf-8'))
+    except (struct.error, zlib.error, ValueError) as e:
+        raise QgistValueError(tr('packed columns are broken'), e)
+
+    records = [{} for _ in range(header['records'])]
+
+    for column in header['columns']:
+
+        path = tuple(column['path'])
+        if columns is not None and path not in columns:
+            continue
+
+        (values_offset, values_len), (codes_offset, codes_len) = column['values'], column['codes']
+        try:
+            values = [None] + json.loads(zlib.decompress(
+                raw[body + values_offset:body + values_offset + values_len]
+                ).decode('utf-8'))
+            codes = array(column['typecode'])
+            codes.frombytes(zlib.decompress(raw[body + codes_offset:body + codes_offset + codes_len]))
+        except (zlib.error, ValueError) as e:
+            raise QgistValueError(tr('packed columns are broken'), e)
+        if sys.byteorder == 'big':
+            codes.byteswap()
+        if column['delta']:
+            codes = list(accumulate(codes))
+        if len(codes) != len(records):
+            raise QgistValueError(tr('packed columns are inconsistent'))
+
+        shared = not any((isinstance(value, (list, dict)) for value in values)) # immutable values can be shared
+        parents, name = path[:-1], path[-1]
+        for record, code in zip(records, codes):
+            if code == 0:
+                continue
+            for key in parents:
+                record = record.setdefault(key, {})
+            record[name] = values[code] if shared else copy.deepcopy(values[code])
+
+    return records
+
+def _pack_codes(codes, limit, delta):
+    "Compressed codes (or differences of codes, if delta), little-endian, plus type code and delta"
+
+    if delta: # differences range from -limit to limit
+        typecode = 'b' if limit < 2 ** 7 else ('h' if limit < 2 ** 15 else 'i')
+    else:
+        typecode = 'B' if limit < 2 ** 8 else ('H' if limit < 2 ** 16 else 'I')
+
+    codes = array(typecode, codes)
+    if sys.byteorder == 'big':
+        codes.byteswap() # always little-endian on disk
+
+    return zlib.compress(codes.tobytes()), typecode, delta
+
+def _flatten_record(record, prefix):
+    "Yields paths (tuples of keys) and values of record - non-empty dicts are descended into"
+
+    for key, value in record.items():
+        if not isinstance(key, str):
+            raise QgistTypeError(tr('keys of records must be str'))
+        if isinstance(value, dict) and len(value) > 0:
+            yield from _flatten_record(value, prefix + (key,))
+        else:
+            yield prefix + (key,), value
@@ -29,12 +29,25 @@ specific language governing rights and limitations under the License.
 # +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
 
 import os
+import random
+import threading
+import time
+import urllib.parse
+import zlib
 
 # +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
 # IMPORT (Internal)
 # +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
 
+from .const import (
+    HTTP_BACKOFF_BASE,
+    HTTP_BACKOFF_MAX,
+    HTTP_BREAKER_COOLDOWN,
+    HTTP_BREAKER_THRESHOLD,
+    HTTP_RETRIES,
+    )
 from .error import (
+    QgistCircuitOpenError,
     QgistRequestError,
     QgistTypeError,
     QgistValueError,
@@ -45,7 +58,10 @@ from .util import tr
 # IMPORT (External)
 # +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
 
-from PyQt5.QtCore import QUrl as _QUrl
+from PyQt5.QtCore import (
+    QSettings as _QSettings,
+    QUrl as _QUrl,
+    )
 from PyQt5.QtNetwork import (
     QNetworkRequest as _QNetworkRequest,
     QNetworkReply as _QNetworkReply,
@@ -71,6 +87,19 @@ from qgis.utils import (
     )
 # TODO </HACK>
 
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# CONST
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+_VALIDATOR_HEADERS = { # validator: (request header name, reply header name in lower case)
+    'etag': ('If-None-Match', 'etag'),
+    'last_modified': ('If-Modified-Since', 'last-modified'),
+    }
+
+_ACCEPT_ENCODING = 'gzip, deflate'
+_ACCEPT_ENCODING_RANGE = 'identity' # ranges refer to encoded bytes, i.e. offsets must match the data handed back
+_PERMANENT_REDIRECTS = (301, 308)
+
 # +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
 # ROUTINES: MISC
 # +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
@@ -79,9 +108,15 @@ def get_qgis_version():
 
     return _Qgis.version()
 
-def get_qgis_settings(default):
+def get_qgis_settings(default, fn = None):
+    "QGIS settings of the profile or, if `fn` (INI-file) is given, isolated settings e.g. for benchmarks"
+
+    if not isinstance(fn, str) and fn is not None:
+        raise QgistTypeError(tr('"fn" must be a str or None'))
 
     # TODO return default if qgis import fails
+    if fn is not None:
+        return _QgsSettings(fn, _QSettings.IniFormat)
     return _QgsSettings()
 
 # +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
@@ -136,53 +171,107 @@ def get_qgis_settings_dir_path():
 
 def request_data(url, authcfg = None, redirection_counter = 1, max_redirect = 4):
 
-    if not isinstance(url, str):
-        raise QgistTypeError(tr('"url" must be a str'))
-    if not url.lower().startswith('http://') and not url.lower().startswith('https://'):
-        raise QgistValueError(tr('"url" does not look like a URL'))
-    if not isinstance(authcfg, str) and authcfg is not None:
-        raise QgistTypeError(tr('"authcfg" must be a str or None'))
-    if not isinstance(redirection_counter, int):
-        raise QgistTypeError(tr('"redirection_counter" must be a int'))
-    if redirection_counter < 1:
-        raise QgistValueError(tr('"redirection_counter" must be greater than zero'))
-    if not isinstance(max_redirect, int):
-        raise QgistTypeError(tr('"max_redirect" must be a int'))
-    if max_redirect < 1:
-        raise QgistValueError(tr('"max_redirect" must be greater than zero'))
-    if redirection_counter > max_redirect:
-        raise QgistValueError(tr('Exceeding maximum redirects'))
-
-    request_blocking = _QgsBlockingNetworkRequest()
-    request = _QNetworkRequest(_QUrl(url))
-    _autothenticate_request(request, authcfg)
-    _ = request_blocking.get(request) # TODO blocking_error?
-    reply = request_blocking.reply()
-    reply_error = reply.error()
-
-    if reply_error != _QNetworkReply.NoError:
-        raise QgistRequestError(tr('Request failed') + ':\n\n' + reply.errorString())
-
-    if reply.attribute(_QNetworkRequest.HttpStatusCodeAttribute) == 301: # HTTP 301
-
-        redirection_url = reply.attribute(_QNetworkRequest.RedirectionTargetAttribute)
-        if redirection_url.isRelative():
-            redirection_url = reply.url().resolved(redirection_url)
-
-        redirection_counter += 1
-        if redirection_counter > max_redirect:
-            raise QgistRequestError(tr('Too many redirections!'))
-
-        return request_data(
-            url = redirection_url, authcfg = authcfg,
-            redirection_counter = redirection_counter, max_redirect = max_redirect,
-            )
-
-    try:
-        content = bytes(reply.content())
-        return content
-    except Exception as e:
-        raise QgistRequestError(tr('Unexpected error while processing content') + ':\n\n' + str(e))
+    _, _, content = _session.request(url, authcfg, dict(), redirection_counter, max_redirect)
+
+    return content
+
+def request_data_conditional(url, authcfg = None, validators = None):
+    """
+    Conditional GET based on validators (ETag, Last-Modified) of a previous response.
+    Returns tuple of content (None if not modified, i.e. HTTP 304) and validators to be stored for next request.
+    """
+
+    if not isinstance(validators, dict) and validators is not None:
+        raise QgistTypeError(tr('"validators" must be a dict or None'))
+    if validators is None:
+        validators = dict()
+    if not all((isinstance(value, str) for value in validators.values())):
+        raise QgistTypeError(tr('All values in "validators" must be str'))
+
+    headers = {
+        request_name: validators[key]
+        for key, (request_name, _) in _VALIDATOR_HEADERS.items()
+        if key in validators.keys()
+        }
+
+    status, reply_headers, content = _session.request(url, authcfg, headers)
+
+    if status == 304: # HTTP 304, not modified
+        return None, validators.copy()
+
+    return content, {
+        key: reply_headers[reply_name]
+        for key, (_, reply_name) in _VALIDATOR_HEADERS.items()
+        if reply_name in reply_headers.keys()
+        }
+
+def request_data_range(url, authcfg = None, start = 0, length = None, validator = None):
+    """
+    Range request for `length` bytes (or all remaining bytes if None) beginning at `start`.
+    If `start` is None, the last `length` bytes are requested (suffix range).
+    `validator` (ETag or Last-Modified of a previous range) is sent as If-Range, i.e. the
+    server sends the entire content instead if it changed meanwhile - as do servers without
+    support for ranges. Do not request beyond the end of the content (HTTP 416 is an error). Returns tuple of content, its offset within entire content (0 if
+    entire content was sent), total size (None if unknown) and validator (None if unknown).
+    """
+
+    if not isinstance(start, int) and start is not None:
+        raise QgistTypeError(tr('"start" must be an int or None'))
+    if start is not None and start < 0:
+        raise QgistValueError(tr('"start" must not be negative'))
+    if not isinstance(length, int) and length is not None:
+        raise QgistTypeError(tr('"length" must be an int or None'))
+    if length is not None and length < 1:
+        raise QgistValueError(tr('"length" must be greater than zero'))
+    if start is None and length is None:
+        raise QgistValueError(tr('"start" and "length" must not both be None'))
+    if not isinstance(validator, str) and validator is not None:
+        raise QgistTypeError(tr('"validator" must be a str or None'))
+
+    if start is None:
+        headers = {'Range': f'bytes=-{length:d}'}
+    else:
+        headers = {'Range': f'bytes={start:d}-' + ('' if length is None else f'{start + length - 1:d}')}
+    if validator is not None:
+        headers['If-Range'] = validator
+
+    status, reply_headers, content = _session.request(url, authcfg, headers)
+
+    etag = reply_headers.get('etag', '').strip()
+    validator = etag if len(etag) != 0 and not etag.startswith('W/') else reply_headers.get('last-modified', None) # If-Range requires strong ETag
+
+    if status == 206:
+        if reply_headers.get('content-encoding', 'identity').strip().lower() not in ('', 'identity'): # offsets refer to encoded bytes
+            raise QgistRequestError(tr('Encoded range in reply despite "Accept-Encoding: identity"') + f': {url:s}')
+        offset, total = _parse_content_range(reply_headers.get('content-range', ''))
+        if offset is None:
+            raise QgistRequestError(tr('Invalid "Content-Range" in reply') + f': {url:s}')
+        return content, offset, total, validator
+
+    return content, 0, len(content), validator
+
+def get_http_redirects():
+    "Permanent redirects remembered by the HTTP session (dict, JSON-serializable) - e.g. for persisting them"
+
+    return _session.redirects
+
+def set_http_redirects(redirects):
+    "Restore permanent redirects of the HTTP session, e.g. from configuration"
+
+    _session.redirects = redirects
+
+def _parse_content_range(content_range):
+    "Parses value of Content-Range header, e.g. bytes 0-99/1234 - returns tuple of first byte and total (None if unknown)"
+
+    unit, _, byte_range = content_range.strip().partition(' ')
+    if unit.lower() != 'bytes':
+        return None, None
+    first_last, _, total = byte_range.partition('/')
+    total = int(total) if total.strip().isdigit() else None
+    first, _, _ = first_last.partition('-')
+    first = int(first) if first.strip().isdigit() else None
+
+    return first, total
 
 def _autothenticate_request(request, authcfg):
 
@@ -194,3 +283,286 @@ def _autothenticate_request(request, authcfg):
     success_bool = _QgsApplication.authManager().updateNetworkRequest(request, authcfg.strip())
     if not success_bool:
         raise QgistRequestError(tr('Failed to authenticate request'))
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# CLASS: HTTP SESSION
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+class _session_class:
+    """
+    HTTP session shared by all requests (repository refresh, downloads into cache etc)
+
+    - Connections are kept alive and re-used per host. `QgsBlockingNetworkRequest` uses the
+      (per-thread) `QgsNetworkAccessManager`, which pools connections. Each thread re-uses
+      one request object, HTTP/2 is allowed where available.
+    - Compression (gzip, deflate) is negotiated explicitly and decoded here.
+    - Failed requests (network errors, HTTP 5xx and 429) are retried with exponential backoff.
+      A circuit breaker per host fails fast once a host is clearly down.
+    - Permanent redirects (301, 308) are remembered. Known redirects are applied before a request is sent.
+      If only scheme and/or host change, the redirect is remembered for the entire origin.
+
+    Mutable.
+    """
+
+    def __init__(self):
+
+        self._redirects = {} # origin or URL: origin or URL
+        self._breakers = {} # host: breaker
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def __repr__(self):
+
+        return f'<session redirects={len(self._redirects):d}>'
+
+    @property
+    def redirects(self):
+        with self._lock:
+            return self._redirects.copy()
+    @redirects.setter
+    def redirects(self, value):
+        if not isinstance(value, dict):
+            raise QgistTypeError(tr('"redirects" must be a dict'))
+        if not all((isinstance(k, str) and isinstance(v, str) for k, v in value.items())):
+            raise QgistTypeError(tr('All keys and values in "redirects" must be str'))
+        with self._lock:
+            self._redirects.update(value)
+
+    def request(self, url, authcfg, headers, redirection_counter = 1, max_redirect = 4):
+        "Returns tuple of HTTP status code, reply headers (dict, lower case names) and content (bytes, decoded)"
+
+        if not isinstance(url, str):
+            raise QgistTypeError(tr('"url" must be a str'))
+        if not url.lower().startswith('http://') and not url.lower().startswith('https://'):
+            raise QgistValueError(tr('"url" does not look like a URL'))
+        if not isinstance(authcfg, str) and authcfg is not None:
+            raise QgistTypeError(tr('"authcfg" must be a str or None'))
+        if not isinstance(headers, dict):
+            raise QgistTypeError(tr('"headers" must be a dict'))
+        if not all((isinstance(name, str) and isinstance(value, str) for name, value in headers.items())):
+            raise QgistTypeError(tr('All names and values in "headers" must be str'))
+        if not isinstance(redirection_counter, int):
+            raise QgistTypeError(tr('"redirection_counter" must be a int'))
+        if redirection_counter < 1:
+            raise QgistValueError(tr('"redirection_counter" must be greater than zero'))
+        if not isinstance(max_redirect, int):
+            raise QgistTypeError(tr('"max_redirect" must be a int'))
+        if max_redirect < 1:
+            raise QgistValueError(tr('"max_redirect" must be greater than zero'))
+        if redirection_counter > max_redirect:
+            raise QgistValueError(tr('Exceeding maximum redirects'))
+
+        url = self._resolve(url, max_redirect)
+        breaker = self._get_breaker(url)
+
+        for attempt in range(HTTP_RETRIES + 1):
+
+            if not breaker.allow():
+                raise QgistCircuitOpenError(tr('Host is failing, not trying again before cool-down') + f': {url:s}')
+
+            try:
+                status, reply_headers, reply_url, redirection_url, content, error = self._request_once(url, authcfg, headers)
+            except Exception: # e.g. timeout - must not leave breaker half-open forever
+                breaker.failure()
+                raise
+
+            if error is None or not self._is_retryable(status):
+                breaker.success() # host is responding, even if with e.g. 404
+                break
+
+            breaker.failure()
+            if attempt == HTTP_RETRIES:
+                break
+            time.sleep(self._get_backoff(attempt, reply_headers))
+
+        if error is not None:
+            raise QgistRequestError(tr('Request failed') + ':\n\n' + error)
+
+        if status in _PERMANENT_REDIRECTS:
+
+            if redirection_url.isRelative():
+                redirection_url = reply_url.resolved(redirection_url)
+            redirection_url = redirection_url.toString()
+
+            redirection_counter += 1
+            if redirection_counter > max_redirect:
+                raise QgistRequestError(tr('Too many redirections!'))
+
+            self._remember(url, redirection_url)
+
+            return self.request(
+                url = redirection_url, authcfg = authcfg, headers = headers,
+                redirection_counter = redirection_counter, max_redirect = max_redirect,
+                )
+
+        try:
+            return status, reply_headers, self._decode(content, reply_headers.get('content-encoding', ''))
+        except Exception as e:
+            raise QgistRequestError(tr('Unexpected error while processing content') + ':\n\n' + str(e))
+
+    def _request_once(self, url, authcfg, headers):
+        "One attempt - returns status, headers, URL, redirection target, raw content and error string (or None)"
+
+        request = _QNetworkRequest(_QUrl(url))
+        request.setRawHeader(b'Connection', b'keep-alive')
+        request.setRawHeader(b'Accept-Encoding', ( # Qt does not decode if set - and adds (and decodes) gzip if not
+            _ACCEPT_ENCODING_RANGE if any((name.lower() == 'range' for name in headers.keys())) else _ACCEPT_ENCODING
+            ).encode('latin-1'))
+        if hasattr(_QNetworkRequest, 'Http2AllowedAttribute'):
+            request.setAttribute(_QNetworkRequest.Http2AllowedAttribute, True)
+        for name, value in headers.items():
+            request.setRawHeader(name.encode('latin-1'), value.encode('latin-1'))
+        if len(headers) != 0: # keep Qt's own HTTP cache from answering or rewriting conditional requests
+            request.setAttribute(_QNetworkRequest.CacheLoadControlAttribute, _QNetworkRequest.AlwaysNetwork)
+            request.setAttribute(_QNetworkRequest.CacheSaveControlAttribute, False)
+        _autothenticate_request(request, authcfg)
+
+        request_blocking = self._get_blocking_request()
+        _ = request_blocking.get(request) # TODO blocking_error?
+        reply = request_blocking.reply()
+
+        status = reply.attribute(_QNetworkRequest.HttpStatusCodeAttribute)
+        reply_headers = {
+            bytes(name).decode('latin-1').lower(): bytes(reply.rawHeader(name)).decode('latin-1')
+            for name in reply.rawHeaderList()
+            }
+        error = reply.errorString() if reply.error() != _QNetworkReply.NoError else None
+        redirection_url = (
+            reply.attribute(_QNetworkRequest.RedirectionTargetAttribute)
+            if status in _PERMANENT_REDIRECTS else None
+            )
+
+        return status, reply_headers, reply.url(), redirection_url, bytes(reply.content()), error
+
+    def _get_blocking_request(self):
+        "One blocking request object per thread"
+
+        request_blocking = getattr(self._local, 'request_blocking', None)
+        if request_blocking is None:
+            request_blocking = _QgsBlockingNetworkRequest()
+            self._local.request_blocking = request_blocking
+
+        return request_blocking
+
+    def _remember(self, url, redirection_url):
+
+        url_parsed = urllib.parse.urlsplit(url)
+        redirection_url_parsed = urllib.parse.urlsplit(redirection_url)
+
+        with self._lock:
+            if url_parsed[2:] == redirection_url_parsed[2:]: # only origin (scheme and/or host) changed
+                self._redirects[self._get_origin(url_parsed)] = self._get_origin(redirection_url_parsed)
+            else:
+                self._redirects[url] = redirection_url
+
+    def _resolve(self, url, max_redirect):
+        "Apply known permanent redirects - bounded, memo may contain loops"
+
+        with self._lock:
+            for _ in range(max_redirect):
+                if url in self._redirects.keys():
+                    url = self._redirects[url]
+                    continue
+                url_parsed = urllib.parse.urlsplit(url)
+                origin = self._get_origin(url_parsed)
+                if origin in self._redirects.keys():
+                    url = urllib.parse.urlunsplit(urllib.parse.urlsplit(self._redirects[origin])[:2] + url_parsed[2:])
+                    continue
+                break
+
+        return url
+
+    def _get_breaker(self, url):
+        "One circuit breaker per host"
+
+        host = urllib.parse.urlsplit(url).netloc.lower()
+
+        with self._lock:
+            if host not in self._breakers.keys():
+                self._breakers[host] = _breaker_class()
+            return self._breakers[host]
+
+    @staticmethod
+    def _get_backoff(attempt, reply_headers):
+        "Exponential backoff with jitter - honours Retry-After (in seconds) if sent by server"
+
+        retry_after = reply_headers.get('retry-after', '').strip()
+        if retry_after.isdigit():
+            return min(float(retry_after), HTTP_BACKOFF_MAX)
+
+        return min(HTTP_BACKOFF_BASE * (2 ** attempt), HTTP_BACKOFF_MAX) * random.uniform(0.5, 1.0)
+
+    @staticmethod
+    def _is_retryable(status):
+        "Network errors (no status), server errors and rate limiting"
+
+        return status is None or status >= 500 or status == 429
+
+    @staticmethod
+    def _decode(content, content_encoding):
+
+        content_encoding = content_encoding.strip().lower()
+
+        if content_encoding in ('', 'identity'):
+            return content
+        if content_encoding in ('gzip', 'x-gzip'):
+            return zlib.decompress(content, 16 + zlib.MAX_WBITS)
+        if content_encoding == 'deflate':
+            try:
+                return zlib.decompress(content) # zlib wrapper, as per RFC
+            except zlib.error:
+                return zlib.decompress(content, -zlib.MAX_WBITS) # raw deflate, as sent by some servers
+
+        raise QgistRequestError(tr('Unsupported content encoding') + f': "{content_encoding:s}"')
+
+    @staticmethod
+    def _get_origin(url_parsed):
+
+        return f'{url_parsed.scheme:s}://{url_parsed.netloc:s}'
+
+class _breaker_class:
+    """
+    Circuit breaker of one host: Opens after a number of consecutive failures.
+    Once open, requests fail fast until cool-down. Then one trial request is let through (half-open),
+    which either closes the breaker again or re-opens it.
+
+    Mutable.
+    """
+
+    def __init__(self):
+
+        self._failures = 0
+        self._opened = None # time.monotonic() when opened
+        self._trial = False # half-open, one trial request running
+        self._lock = threading.Lock()
+
+    def __repr__(self):
+
+        return f'<breaker failures={self._failures:d} open={"yes" if self._opened is not None else "no":s}>'
+
+    def allow(self):
+
+        with self._lock:
+            if self._opened is None:
+                return True
+            if self._trial or (time.monotonic() - self._opened) < HTTP_BREAKER_COOLDOWN:
+                return False
+            self._trial = True
+            return True
+
+    def failure(self):
+
+        with self._lock:
+            self._failures += 1
+            if self._trial or self._failures >= HTTP_BREAKER_THRESHOLD:
+                self._opened = time.monotonic()
+            self._trial = False
+
+    def success(self):
+
+        with self._lock:
+            self._failures = 0
+            self._opened = None
+            self._trial = False
+
+_session = _session_class()